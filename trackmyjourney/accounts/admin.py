@@ -1,14 +1,33 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, UserProfile
+from .deletion import request_deletion
+from .models import AccountDeletion, User, UserProfile
 
 class UserProfileInline(admin.StackedInline):
     model = UserProfile
     can_delete = False
     verbose_name_plural = 'Profile'
 
+@admin.action(description='Deactivate and delete in the background')
+def delete_accounts_in_background(modeladmin, request, queryset):
+    pending = set(AccountDeletion.objects.exclude(status='done').values_list('user_id', flat=True))
+    users = [user for user in queryset if user.pk not in pending and user != request.user]
+    for user in users:
+        request_deletion(user)
+    modeladmin.message_user(request, f'{len(users)} account(s) deactivated and queued for deletion.')
+
+class AccountDeletionAdmin(admin.ModelAdmin):
+    list_display = ('username', 'user_id', 'status', 'total_deleted', 'requested_at', 'finished_at')
+    list_filter = ('status',)
+    search_fields = ('username',)
+    readonly_fields = [f.name for f in AccountDeletion._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
 class CustomUserAdmin(UserAdmin):
     inlines = (UserProfileInline,)
+    actions = [delete_accounts_in_background]
     list_display = ('username', 'email', 'first_name', 'last_name', 'is_staff', 'date_joined')
     list_filter = ('is_staff', 'is_superuser', 'is_active', 'date_joined')
     search_fields = ('username', 'first_name', 'last_name', 'email')
@@ -20,3 +39,4 @@ class CustomUserAdmin(UserAdmin):
 
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(UserProfile)
+admin.site.register(AccountDeletion, AccountDeletionAdmin)
@@ -0,0 +1,231 @@
+import time
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+# Rows removed per transaction and how long one job run may keep going before it re-queues itself
+PURGE_BATCH_SIZE = getattr(settings, 'ACCOUNT_PURGE_BATCH_SIZE', 500)
+PURGE_TIME_BUDGET = getattr(settings, 'ACCOUNT_PURGE_TIME_BUDGET', 20)
+
+
+def request_deletion(user):
+    """Deactivate ``user`` at once and queue the purge of their data; returns the AccountDeletion."""
+    from .backends import forget_user
+    from .models import AccountDeletion, User
+    from .tasks import purge_account
+
+    with transaction.atomic():
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        # update() sends no post_save; other sessions of this user must not keep a cached active user
+        transaction.on_commit(lambda: forget_user(user.pk))
+        deletion = AccountDeletion.objects.create(user_id=user.pk, username=user.username)
+        purge_account.enqueue(deletion.pk, unique_key=f'deletion:{deletion.pk}')
+    return deletion
+
+
+def _threaded_comment_models():
+    from blog.models import Comment as BlogComment
+    from community.models import Comment as CommunityComment
+    from groups.models import GroupPostComment
+    return [BlogComment, GroupPostComment, CommunityComment]
+
+
+def purge_plan(user_id):
+    """
+    ``(label, queryset)`` steps that together remove everything ``user_id`` owns.
+
+    Children come before their parents so that deleting one batch never
+    cascades into an unbounded number of rows. Replies are removed before
+    the comments they answer for the same reason, and replies by other
+    people are lifted onto the deleted comment's parent instead.
+    """
+    from achievements.models import Achievement, AchievementComment, AchievementLike
+    from blog.models import BlogPost, Comment as BlogComment
+    from books.models import Book, BookRating, ReadingList
+    from community.models import Comment as CommunityComment, Community, CommunityMembership, Post, PostLike
+    from goals.models import Goal, GoalUpdate, Milestone
+    from groups.models import Group, GroupMembership, GroupPost, GroupPostComment
+    from resources.models import Resource, ResourceBookmark, ResourceComment, ResourceLike, ResourceRating
+
+    steps = [
+        ('goal updates', GoalUpdate.objects.filter(Q(user_id=user_id) | Q(goal__user_id=user_id))),
+        ('milestones', Milestone.objects.filter(goal__user_id=user_id)),
+        ('goals', Goal.objects.filter(user_id=user_id)),
+        ('achievement comments', AchievementComment.objects.filter(Q(user_id=user_id) | Q(achievement__user_id=user_id))),
+        ('achievement likes', AchievementLike.objects.filter(Q(user_id=user_id) | Q(achievement__user_id=user_id))),
+        ('achievements', Achievement.objects.filter(user_id=user_id)),
+        ('blog comments', BlogComment.objects.filter(Q(author_id=user_id) | Q(post__author_id=user_id))),
+        ('blog posts', BlogPost.objects.filter(author_id=user_id)),
+        ('book ratings', BookRating.objects.filter(Q(user_id=user_id) | Q(book__uploaded_by_id=user_id))),
+        ('reading lists', ReadingList.objects.filter(Q(user_id=user_id) | Q(book__uploaded_by_id=user_id))),
+        ('books', Book.objects.filter(uploaded_by_id=user_id)),
+        ('resource comments', ResourceComment.objects.filter(Q(user_id=user_id) | Q(resource__uploaded_by_id=user_id))),
+        ('resource ratings', ResourceRating.objects.filter(Q(user_id=user_id) | Q(resource__uploaded_by_id=user_id))),
+        ('resource likes', ResourceLike.objects.filter(Q(user_id=user_id) | Q(resource__uploaded_by_id=user_id))),
+        ('resource bookmarks', ResourceBookmark.objects.filter(Q(user_id=user_id) | Q(resource__uploaded_by_id=user_id))),
+        ('resources', Resource.objects.filter(uploaded_by_id=user_id)),
+        ('group comments', GroupPostComment.objects.filter(
+            Q(author_id=user_id) | Q(post__author_id=user_id) | Q(post__group__creator_id=user_id))),
+        ('group posts', GroupPost.objects.filter(Q(author_id=user_id) | Q(group__creator_id=user_id))),
+        ('group memberships', GroupMembership.objects.filter(Q(user_id=user_id) | Q(group__creator_id=user_id))),
+        ('groups', Group.objects.filter(creator_id=user_id)),
+        ('community comments', CommunityComment.objects.filter(
+            Q(author_id=user_id) | Q(post__author_id=user_id) | Q(post__community__creator_id=user_id))),
+        ('community post likes', PostLike.objects.filter(
+            Q(user_id=user_id) | Q(post__author_id=user_id) | Q(post__community__creator_id=user_id))),
+        ('community posts', Post.objects.filter(Q(author_id=user_id) | Q(community__creator_id=user_id))),
+        ('community memberships', CommunityMembership.objects.filter(
+            Q(user_id=user_id) | Q(community__creator_id=user_id))),
+        ('communities', Community.objects.filter(creator_id=user_id)),
+    ]
+    steps += _remaining_relations(user_id)
+    return steps
+
+
+def _remaining_relations(user_id):
+    """Everything else pointing at the user: likes, bookmarks, exports, profile and so on."""
+    from .models import User
+
+    steps = []
+    for relation in User._meta.related_objects:
+        if relation.many_to_many:
+            through = relation.through
+            field = relation.field.m2m_reverse_field_name()
+            steps.append((through._meta.label_lower, through.objects.filter(**{f'{field}_id': user_id})))
+        elif relation.on_delete is models.CASCADE:
+            model = relation.related_model
+            steps.append((model._meta.label_lower, model._base_manager.filter(
+                **{relation.field.attname: user_id})))
+    return steps
+
+
+def capture_affected(user_id):
+    """Ids of rows outside the purge whose counters the purge will touch."""
+    from blog.models import BlogPost
+    from groups.models import GroupMembership
+
+    affected = {
+        'groups': sorted(set(
+            GroupMembership.objects.filter(user_id=user_id).exclude(group__creator_id=user_id)
+            .values_list('group_id', flat=True)
+        )),
+        'blog_categories': sorted(set(
+            BlogPost.categories.through.objects.filter(blogpost__author_id=user_id)
+            .values_list('category_id', flat=True)
+        )),
+        'comment_parents': {},
+    }
+    for model in _threaded_comment_models():
+        parents = set(
+            model.objects.filter(author_id=user_id, parent__isnull=False).values_list('parent_id', flat=True)
+        )
+        affected['comment_parents'][model._meta.label] = sorted(parents)
+    return affected
+
+
+def delete_batch(queryset, batch_size=PURGE_BATCH_SIZE):
+    """Delete up to ``batch_size`` rows of ``queryset`` in one transaction; returns how many went."""
+    from core.models import ThreadedComment
+    from core.threads import lift_replies
+
+    model = queryset.model
+    threaded = issubclass(model, ThreadedComment)
+    if threaded:
+        # Threaded comments: deepest first, so every reply still there belongs to someone else
+        queryset = queryset.order_by('-depth', 'pk')
+    else:
+        queryset = queryset.order_by('pk')
+
+    pks = list(dict.fromkeys(queryset.values_list('pk', flat=True)[:batch_size]))
+    if not pks:
+        return 0
+
+    # Uploaded files go once the batch commits (core.storage.connect_file_signals)
+    with transaction.atomic():
+        if threaded:
+            # Other people's replies move up a level instead of being cascaded away
+            lift_replies(model, pks)
+        model._base_manager.filter(pk__in=pks).delete()
+    return len(pks)
+
+
+def recheck_counters(affected):
+    """
+    Recount the denormalised counters the purge touched and fix any drift.
+
+    Returns the number of rows that were wrong per counter.
+    """
+    from blog.models import Category
+    from django.apps import apps
+    from groups.models import Group
+
+    result = {}
+
+    wrong = 0
+    groups = Group.objects.filter(pk__in=affected.get('groups', [])).annotate(
+        actual=Count('memberships', filter=Q(memberships__status='active'))
+    )
+    for group in groups:
+        if group.member_count != group.actual:
+            Group.objects.filter(pk=group.pk).update(member_count=group.actual)
+            wrong += 1
+    result['group member_count'] = wrong
+
+    wrong = 0
+    categories = Category.objects.filter(pk__in=affected.get('blog_categories', [])).annotate(
+        actual=Count('posts', filter=Q(posts__status='published'))
+    )
+    for category in categories:
+        if category.post_count != category.actual:
+            Category.objects.filter(pk=category.pk).update(post_count=category.actual)
+            wrong += 1
+    result['blog category post_count'] = wrong
+
+    for label, parent_ids in affected.get('comment_parents', {}).items():
+        model = apps.get_model(label)
+        wrong = 0
+        for comment in model.objects.filter(pk__in=parent_ids).annotate(actual=Count('replies')):
+            if comment.reply_count != comment.actual:
+                model.objects.filter(pk=comment.pk).update(reply_count=comment.actual)
+                wrong += 1
+        result[f'{label} reply_count'] = wrong
+    return result
+
+
+def run_purge(deletion, time_budget=PURGE_TIME_BUDGET, batch_size=PURGE_BATCH_SIZE):
+    """
+    Work through the purge plan for ``deletion`` until done or out of time.
+
+    Progress is saved after every batch, so a crashed or timed-out run picks
+    up where the last one stopped. Returns True once the account is gone.
+    """
+    from .models import User
+
+    deadline = time.monotonic() + time_budget
+    if deletion.status == 'pending':
+        deletion.affected = capture_affected(deletion.user_id)
+        deletion.status = 'running'
+        deletion.save(update_fields=['affected', 'status'])
+
+    steps = purge_plan(deletion.user_id)
+    while deletion.step < len(steps):
+        label, queryset = steps[deletion.step]
+        deleted = delete_batch(queryset, batch_size)
+        if deleted:
+            deletion.progress[label] = deletion.progress.get(label, 0) + deleted
+            deletion.total_deleted += deleted
+        else:
+            deletion.step += 1
+        deletion.save(update_fields=['step', 'progress', 'total_deleted'])
+        if time.monotonic() >= deadline:
+            return False
+
+    # Only small leftovers (permissions, SET_NULL references) remain for Django's own cascade
+    User.objects.filter(pk=deletion.user_id).delete()
+    deletion.check_result = recheck_counters(deletion.affected)
+    deletion.status = 'done'
+    deletion.finished_at = timezone.now()
+    deletion.save(update_fields=['check_result', 'status', 'finished_at'])
+    return True
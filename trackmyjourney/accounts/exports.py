@@ -0,0 +1,130 @@
+import csv
+import io
+import json
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+EXPORT_CHUNK_SIZE = 1000
+# Accounts with more rows than this are exported by a background job
+EXPORT_INLINE_MAX_ROWS = getattr(settings, 'EXPORT_INLINE_MAX_ROWS', 20000)
+FLUSH_BYTES = 64 * 1024
+FORMATS = ('jsonl', 'csv')
+
+
+def export_sets(user):
+    """``(file stem, queryset of dicts)`` for everything a user can download about themselves."""
+    from achievements.models import Achievement
+    from blog.models import BlogPost
+    from books.models import BookRating, ReadingList
+    from goals.models import Goal, GoalUpdate, Milestone
+    from resources.models import ResourceRating
+
+    def values(queryset, exclude=(), extra=()):
+        fields = [f.attname for f in queryset.model._meta.concrete_fields if f.name not in exclude]
+        return queryset.order_by('pk').values(*fields, *extra)
+
+    return [
+        ('goals', values(Goal.objects.filter(user=user), exclude=['user'], extra=['category__name'])),
+        ('milestones', values(Milestone.objects.filter(goal__user=user))),
+        ('goal_updates', values(GoalUpdate.objects.filter(user=user), exclude=['user'])),
+        ('achievements', values(Achievement.objects.filter(user=user), exclude=['user'])),
+        ('blog_posts', values(BlogPost.objects.filter(author=user), exclude=['author'])),
+        ('reading_list', values(ReadingList.objects.filter(user=user), exclude=['user'], extra=['book__title', 'book__author'])),
+        ('book_ratings', values(BookRating.objects.filter(user=user), exclude=['user'], extra=['book__title'])),
+        ('resource_ratings', values(ResourceRating.objects.filter(user=user), exclude=['user'], extra=['resource__title'])),
+    ]
+
+
+def count_rows(user):
+    return sum(queryset.count() for _, queryset in export_sets(user))
+
+
+def _encode_rows(queryset, fmt):
+    """Yield ``(encoded bytes, row count)`` for ``queryset`` while holding at most one DB chunk."""
+    rows = queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    if fmt == 'jsonl':
+        for row in rows:
+            yield (json.dumps(row, cls=DjangoJSONEncoder) + '\n').encode(), 1
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(queryset.query.values_select)
+    pending = 0
+    for row in rows:
+        writer.writerow(['' if value is None else value for value in row.values()])
+        pending += 1
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue().encode(), pending
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode(), pending
+
+
+class _StreamSink:
+    """Write-only file object; ZipFile falls back to streaming mode because it cannot seek."""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+def iter_export_zip(user, fmt='jsonl'):
+    """
+    Yield a ZIP archive with one JSON Lines or CSV file per model, piece by piece.
+
+    Memory use stays flat: rows are read with ``iterator()`` and compressed
+    bytes are handed out as soon as they are produced.
+    """
+    sink = _StreamSink()
+    counts = {}
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for stem, queryset in export_sets(user):
+            counts[stem] = 0
+            with archive.open(f'{stem}.{fmt}', 'w', force_zip64=True) as member:
+                for chunk, rows in _encode_rows(queryset, fmt):
+                    member.write(chunk)
+                    counts[stem] += rows
+                    if sink.size >= FLUSH_BYTES:
+                        yield sink.drain()
+            yield sink.drain()
+        archive.writestr('manifest.json', json.dumps({
+            'user': user.username,
+            'format': fmt,
+            'files': {f'{stem}.{fmt}': count for stem, count in counts.items()},
+        }, indent=2))
+    yield sink.drain()
+
+
+def write_export(export):
+    """Build ``export``'s archive into storage (used by the background job for large accounts)."""
+    export.status = 'running'
+    export.save(update_fields=['status'])
+    with tempfile.TemporaryFile() as tmp:
+        for chunk in iter_export_zip(export.user, export.format):
+            tmp.write(chunk)
+        tmp.seek(0)
+        export.file.save(f'{export.token.hex}.zip', File(tmp), save=False)
+    export.status = 'ready'
+    export.finished_at = timezone.now()
+    export.save(update_fields=['file', 'status', 'finished_at'])
@@ -0,0 +1,37 @@
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import migrations
+
+OLD_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+NEW_BACKEND = 'accounts.backends.CachedModelBackend'
+
+
+def repoint_sessions(apps, old, new):
+    """Sessions name the backend that logged them in; ones naming a backend no longer configured are logged out."""
+    Session = apps.get_model('sessions', 'Session')
+    store = SessionStore()
+    for session in Session.objects.filter(session_data__isnull=False).iterator():
+        data = store.decode(session.session_data)
+        if data.get(BACKEND_SESSION_KEY) == old:
+            data[BACKEND_SESSION_KEY] = new
+            Session.objects.filter(pk=session.pk).update(session_data=store.encode(data))
+
+
+def forwards(apps, schema_editor):
+    repoint_sessions(apps, OLD_BACKEND, NEW_BACKEND)
+
+
+def backwards(apps, schema_editor):
+    repoint_sessions(apps, NEW_BACKEND, OLD_BACKEND)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_account_deletion'),
+        ('sessions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.db.models.signals import post_save
@@ -40,6 +42,65 @@ class UserProfile(models.Model):
             return 0
         return round((self.completed_goals / self.total_goals) * 100, 1)
 
+class DataExport(models.Model):
+    """A ZIP of a user's data built by a background job (accounts/exports.py) for large accounts."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    FORMAT_CHOICES = [
+        ('jsonl', 'JSON Lines'),
+        ('csv', 'CSV'),
+    ]
+
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='data_exports')
+    format = models.CharField(max_length=5, choices=FORMAT_CHOICES, default='jsonl')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    file = models.FileField(upload_to='exports/', blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Export for {self.user} ({self.status})"
+
+class AccountDeletion(models.Model):
+    """
+    Progress of a background account purge (accounts/deletion.py).
+
+    Keeps the id and username rather than a foreign key so the record
+    outlives the user it describes.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    user_id = models.PositiveIntegerField(db_index=True)
+    username = models.CharField(max_length=150)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    step = models.PositiveSmallIntegerField(default=0, help_text="Index of the purge step in progress")
+    progress = models.JSONField(default=dict, blank=True, help_text="Rows deleted per step")
+    affected = models.JSONField(default=dict, blank=True, help_text="Counters to recheck once the purge is done")
+    total_deleted = models.PositiveIntegerField(default=0)
+    check_result = models.JSONField(default=dict, blank=True)
+    last_error = models.TextField(blank=True)
+    requested_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-requested_at']
+
+    def __str__(self):
+        return f"Deletion of {self.username} ({self.status})"
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
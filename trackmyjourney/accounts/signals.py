@@ -1,6 +1,8 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
+from .backends import forget_user
 from .models import UserProfile
 
 User = get_user_model()
@@ -9,3 +11,10 @@ User = get_user_model()
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         UserProfile.objects.get_or_create(user=instance)
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    # Now for this process, and again once the change is visible to everyone else
+    forget_user(instance.pk)
+    transaction.on_commit(lambda: forget_user(instance.pk))
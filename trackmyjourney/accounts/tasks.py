@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from jobs.registry import periodic_task, task
+from .deletion import run_purge
+from .exports import write_export
+from .models import AccountDeletion, DataExport
+
+
+@task(queue='exports', max_attempts=2)
+def build_data_export(export_id):
+    export = DataExport.objects.select_related('user').filter(pk=export_id).first()
+    if export is None:
+        return
+    try:
+        write_export(export)
+    except Exception:
+        DataExport.objects.filter(pk=export_id).update(status='failed')
+        raise
+
+
+@periodic_task(every=timedelta(hours=6), priority=-10)
+def purge_old_exports():
+    """Delete export archives older than EXPORT_KEEP (default 7 days)."""
+    keep = getattr(settings, 'EXPORT_KEEP', timedelta(days=7))
+    for export in DataExport.objects.filter(created_at__lt=timezone.now() - keep).iterator(chunk_size=100):
+        if export.file:
+            export.file.delete(save=False)
+        export.delete()
+
+
+@task(queue='maintenance', max_attempts=10)
+def purge_account(deletion_id):
+    """Delete a deactivated account's data in batches, re-queueing itself until done."""
+    deletion = AccountDeletion.objects.filter(pk=deletion_id).first()
+    if deletion is None or deletion.status in ('done', 'failed'):
+        return
+    try:
+        finished = run_purge(deletion)
+    except Exception as exc:
+        AccountDeletion.objects.filter(pk=deletion_id).update(last_error=str(exc))
+        raise
+    if not finished:
+        purge_account.enqueue(deletion_id, unique_key=f'deletion:{deletion_id}')
@@ -1,3 +1,253 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from blog.models import BlogPost, Category, Comment
+from books.models import Book
+from core.models import StoredFile
+from core.threads import load_thread, rebuild_thread_paths
+from goals.models import Goal, Milestone
+from groups.models import Group, GroupMembership
+from jobs.models import Job
+from .backends import CachedModelBackend, user_cache_key
+from .deletion import request_deletion, run_purge
+from .models import AccountDeletion, DataExport, User
+
+
+class AccountPurgeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('leaving', 'leaving@example.com', 'x')
+        cls.other = User.objects.create_user('staying', 'staying@example.com', 'x')
+        cls.category = Category.objects.create(name='Notes', slug='notes')
+
+        cls.kept_post = BlogPost.objects.create(
+            author=cls.other, title='Kept', content='c', excerpt='e', status='published',
+        )
+        cls.kept_comment = Comment.objects.create(post=cls.kept_post, author=cls.other, content='question')
+        for n in range(4):
+            Comment.objects.create(post=cls.kept_post, author=cls.user, content=f'reply {n}', parent=cls.kept_comment)
+        for n in range(3):
+            post = BlogPost.objects.create(
+                author=cls.user, title=f'Gone {n}', content='c', excerpt='e', status='published',
+            )
+            post.categories.add(cls.category)
+            Comment.objects.create(post=post, author=cls.other, content='on a post that goes')
+
+        cls.group = Group.objects.create(name='Readers', description='d', creator=cls.other)
+        GroupMembership.objects.create(group=cls.group, user=cls.other)
+        GroupMembership.objects.create(group=cls.group, user=cls.user)
+        cls.group.update_member_count()
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def add_book(self, owner, title):
+        book = Book(title=title, author='A', description='d', uploaded_by=owner)
+        book.file.save(f'{title}.pdf', ContentFile(title.encode()), save=False)
+        book.save()
+        return book
+
+    def purge(self, **kwargs):
+        deletion = request_deletion(self.user)
+        runs = 0
+        with self.captureOnCommitCallbacks(execute=True):
+            while not run_purge(AccountDeletion.objects.get(pk=deletion.pk), **kwargs):
+                runs += 1
+        deletion.refresh_from_db()
+        return deletion, runs
+
+    def test_request_deactivates_and_queues_the_purge(self):
+        deletion = request_deletion(self.user)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertEqual(deletion.status, 'pending')
+        job = Job.objects.get(name='accounts.tasks.purge_account')
+        self.assertEqual(job.args, [deletion.pk])
+
+    def test_purge_removes_only_the_users_data(self):
+        kept_book = self.add_book(self.other, 'kept')
+        self.add_book(self.user, 'gone')
+
+        deletion, _ = self.purge()
+        self.assertEqual(deletion.status, 'done')
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(list(BlogPost.objects.values_list('pk', flat=True)), [self.kept_post.pk])
+        self.assertEqual(list(Comment.objects.values_list('pk', flat=True)), [self.kept_comment.pk])
+        self.assertEqual(list(Book.objects.values_list('pk', flat=True)), [kept_book.pk])
+        self.assertEqual(list(StoredFile.objects.values_list('name', flat=True)), [kept_book.file.name])
+
+    def test_counters_the_purge_touched_are_right_afterwards(self):
+        self.purge()
+        self.kept_comment.refresh_from_db()
+        self.group.refresh_from_db()
+        self.category.refresh_from_db()
+        self.assertEqual(self.kept_comment.reply_count, 0)
+        self.assertEqual(self.group.member_count, 1)
+        self.assertEqual(self.category.post_count, 0)
+
+    def test_batches_are_bounded_and_progress_survives_each_run(self):
+        # No time budget: every run deletes one batch and stops
+        deletion, runs = self.purge(batch_size=2, time_budget=0)
+
+        self.assertEqual(deletion.status, 'done')
+        self.assertGreater(runs, 5)
+        self.assertEqual(deletion.progress['blog comments'], 7)
+        self.assertEqual(deletion.progress['blog posts'], 3)
+        self.assertEqual(deletion.total_deleted, sum(deletion.progress.values()))
+        # Memberships are deleted in bulk without touching member_count; the final recheck repairs it
+        self.assertEqual(deletion.check_result['group member_count'], 1)
+
+    def test_other_peoples_replies_outlive_the_comments_they_answer(self):
+        # other's question <- user's answer <- user's follow-up <- other's reply <- other's reply
+        answer = Comment.objects.create(post=self.kept_post, author=self.user, content='answer', parent=self.kept_comment)
+        follow_up = Comment.objects.create(post=self.kept_post, author=self.user, content='more', parent=answer)
+        reply = Comment.objects.create(post=self.kept_post, author=self.other, content='thanks', parent=follow_up)
+        nested = Comment.objects.create(post=self.kept_post, author=self.other, content='also', parent=reply)
+        top = Comment.objects.create(post=self.kept_post, author=self.user, content='top')
+        under_top = Comment.objects.create(post=self.kept_post, author=self.other, content='agreed', parent=top)
+
+        deletion, _ = self.purge(batch_size=2, time_budget=0)
+
+        self.assertEqual(deletion.status, 'done')
+        self.assertEqual(
+            set(Comment.objects.values_list('pk', flat=True)),
+            {self.kept_comment.pk, reply.pk, nested.pk, under_top.pk},
+        )
+        roots = load_thread(Comment.objects.filter(post=self.kept_post))
+        self.assertEqual([root.pk for root in roots], [self.kept_comment.pk, under_top.pk])
+        self.assertEqual([c.pk for c in roots[0].thread_replies], [reply.pk])
+        self.assertEqual([c.pk for c in roots[0].thread_replies[0].thread_replies], [nested.pk])
+        depths = dict(Comment.objects.values_list('pk', 'depth'))
+        self.assertEqual((depths[reply.pk], depths[nested.pk], depths[under_top.pk]), (1, 2, 0))
+        self.kept_comment.refresh_from_db()
+        self.assertEqual(self.kept_comment.reply_count, 1)
+
+        lifted = list(Comment.objects.order_by('pk').values_list('path', 'depth', 'reply_count'))
+        rebuild_thread_paths(Comment)
+        self.assertEqual(list(Comment.objects.order_by('pk').values_list('path', 'depth', 'reply_count')), lifted)
+
+
+class DataExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('exporter', 'exporter@example.com', 'x')
+        cls.other = User.objects.create_user('bystander', 'bystander@example.com', 'x')
+        for n in range(3):
+            goal = Goal.objects.create(user=cls.user, title=f'Goal {n}')
+            Milestone.objects.create(goal=goal, title=f'Step {n}')
+        Goal.objects.create(user=cls.other, title='Not mine')
+        BlogPost.objects.create(author=cls.user, title='Diary', content='c', excerpt='e')
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client.force_login(self.user)
+
+    def request_export(self, fmt):
+        return self.client.post(reverse('accounts:data_export'), {'format': fmt})
+
+    def test_small_accounts_stream_the_archive(self):
+        response = self.request_export('jsonl')
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment;', response['Content-Disposition'])
+
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            manifest = json.loads(archive.read('manifest.json'))
+            goals = [json.loads(line) for line in archive.read('goals.jsonl').decode().splitlines()]
+        self.assertEqual(manifest['user'], 'exporter')
+        self.assertEqual(
+            {name: count for name, count in manifest['files'].items() if count},
+            {'goals.jsonl': 3, 'milestones.jsonl': 3, 'blog_posts.jsonl': 1},
+        )
+        self.assertEqual([goal['title'] for goal in goals], ['Goal 0', 'Goal 1', 'Goal 2'])
+        self.assertNotIn('user_id', goals[0])
+        self.assertFalse(DataExport.objects.exists())
+
+    def test_csv_files_have_a_header_row(self):
+        response = self.request_export('csv')
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            rows = list(csv.reader(io.StringIO(archive.read('milestones.csv').decode())))
+        self.assertEqual(rows[0][:3], ['id', 'goal_id', 'title'])
+        self.assertEqual([row[2] for row in rows[1:]], ['Step 0', 'Step 1', 'Step 2'])
+
+    def test_large_accounts_are_exported_in_the_background(self):
+        from .tasks import build_data_export
+
+        with mock.patch('accounts.views.EXPORT_INLINE_MAX_ROWS', 5):
+            response = self.request_export('csv')
+        self.assertRedirects(response, reverse('accounts:data_export'))
+        export = DataExport.objects.get()
+        self.assertEqual((export.user, export.format, export.status), (self.user, 'csv', 'pending'))
+        self.assertEqual(Job.objects.get(name='accounts.tasks.build_data_export').args, [export.pk])
+
+        download = reverse('accounts:data_export_download', args=[export.token])
+        self.assertEqual(self.client.get(download).status_code, 404)
+
+        build_data_export.func(export.pk)
+        export.refresh_from_db()
+        self.assertEqual(export.status, 'ready')
+        response = self.client.get(download)
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            self.assertEqual(json.loads(archive.read('manifest.json'))['files']['goals.csv'], 3)
+
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(download).status_code, 404)
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'core.cache.LocMemCache'},
+    'shared': {'BACKEND': 'core.cache.LocMemCache', 'LOCATION': 'accounts-tests'},
+})
+class CachedAuthTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('regular', 'regular@example.com', 'old password')
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.addCleanup(caches['shared'].clear)
+        self.url = reverse('accounts:data_export')
+        self.client.force_login(self.user)
+        # The first request fills the caches
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_logged_in_requests_skip_the_session_and_user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        tables = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('"django_session"', tables)
+        self.assertNotIn(f'FROM "{User._meta.db_table}"', tables)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(CachedModelBackend().get_user(self.user.pk), self.user)
+
+    def test_a_password_change_ends_other_sessions_at_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('new password')
+            self.user.save()
+        self.assertIsNone(caches['shared'].get(user_cache_key(self.user.pk)))
+        self.assertRedirects(self.client.get(self.url), f"{reverse('accounts:login')}?next={self.url}")
+
+    def test_deactivation_through_update_is_seen_at_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            request_deletion(self.user)
+        self.assertRedirects(self.client.get(self.url), f"{reverse('accounts:login')}?next={self.url}")
@@ -19,6 +19,9 @@ urlpatterns = [
     path('profile/', views.profile_view, name='profile'),
     path('edit-profile/', views.edit_profile, name='edit_profile'),
     path('onboarding/', views.onboarding_view, name='onboarding'),
+    path('export/', views.data_export_view, name='data_export'),
+    path('export/<uuid:token>/', views.data_export_download, name='data_export_download'),
+    path('delete/', views.delete_account_view, name='delete_account'),
     
     # Password reset URLs
     path('password-reset/', auth_views.PasswordResetView.as_view(
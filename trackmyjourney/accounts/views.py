@@ -1,5 +1,7 @@
-from django.shortcuts import render, redirect
-from django.contrib.auth import login
+from django.shortcuts import render, redirect, get_object_or_404
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.utils import timezone
+from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import LoginView
 from django.contrib import messages
@@ -7,7 +9,9 @@ from django.views.generic import TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db import transaction
 from .forms import CustomUserCreationForm, CustomAuthenticationForm, UserUpdateForm
-from .models import UserProfile
+from .deletion import request_deletion
+from .exports import EXPORT_INLINE_MAX_ROWS, FORMATS, count_rows, iter_export_zip
+from .models import DataExport, UserProfile
 
 def signup_view(request):
     if request.user.is_authenticated:
@@ -179,4 +183,51 @@ def profile(request):
 
 def edit_profile(request):
     # Your view logic here
-    return render(request, 'accounts/edit_profile.html')
\ No newline at end of file
+    return render(request, 'accounts/edit_profile.html')
+
+@login_required
+def data_export_view(request):
+    """Download everything as a ZIP; large accounts get it prepared by a background job."""
+    if request.method == 'POST':
+        fmt = request.POST.get('format')
+        if fmt not in FORMATS:
+            fmt = 'jsonl'
+        if count_rows(request.user) <= EXPORT_INLINE_MAX_ROWS:
+            filename = f"trackmyjourney-{request.user.username}-{timezone.now():%Y%m%d}.zip"
+            response = StreamingHttpResponse(iter_export_zip(request.user, fmt), content_type='application/zip')
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
+
+        from .tasks import build_data_export
+        with transaction.atomic():
+            export = DataExport.objects.create(user=request.user, format=fmt)
+            build_data_export.enqueue(export.pk)
+        messages.info(request, 'Your account has a lot of data, so we are preparing the export in the background. '
+                               'It will appear below when it is ready.')
+        return redirect('accounts:data_export')
+
+    exports = DataExport.objects.filter(user=request.user)[:10]
+    return render(request, 'accounts/data_export.html', {'exports': exports, 'formats': DataExport.FORMAT_CHOICES})
+
+@login_required
+def data_export_download(request, token):
+    export = get_object_or_404(DataExport, token=token, user=request.user)
+    if export.status != 'ready' or not export.file:
+        raise Http404("This export is not ready yet.")
+    return FileResponse(export.file.open('rb'), as_attachment=True,
+                        filename=f"trackmyjourney-{request.user.username}-{export.created_at:%Y%m%d}.zip")
+
+@login_required
+def delete_account_view(request):
+    """Deactivate the account straight away and purge its data in the background."""
+    if request.method == 'POST':
+        if not request.user.check_password(request.POST.get('password', '')):
+            messages.error(request, 'The password you entered is incorrect.')
+            return render(request, 'accounts/delete_account.html')
+
+        request_deletion(request.user)
+        logout(request)
+        messages.info(request, 'Your account has been deactivated and your data is being deleted.')
+        return redirect('homepage:home')
+
+    return render(request, 'accounts/delete_account.html')
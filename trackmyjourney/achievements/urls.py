@@ -1,11 +1,12 @@
 from django.urls import path
+from core.asyncviews import served
 from . import views
 
 app_name = 'achievements'
 
 urlpatterns = [
     # Specific paths first
-    path('public/', views.PublicAchievementListView.as_view(), name='public'),
+    path('public/', served(views.PublicAchievementListView.as_view(), views.AsyncPublicAchievementListView.as_view()), name='public'),
     path('create/', views.AchievementCreateView.as_view(), name='create'),
     
     # Generic pk patterns (after specific patterns)
@@ -5,7 +5,9 @@ from django.views.generic import ListView, DetailView, CreateView, UpdateView, D
 from django.contrib import messages
 from django.urls import reverse_lazy
 from django.http import JsonResponse
-from django.db.models import Q
+from django.db.models import Max, Q
+from core.asyncviews import alist, apaginate, aresolve_user, page_context
+from core.conditional import ConditionalDetailMixin, related_aggregate
 from .models import Achievement, AchievementComment, AchievementLike
 from .forms import AchievementForm, CommentForm
 
@@ -69,7 +71,22 @@ class PublicAchievementListView(ListView):
             ach.liked_by = ach.is_liked_by(user) if user.is_authenticated else False
         return context
 
-class AchievementDetailView(DetailView):
+class AsyncPublicAchievementListView(PublicAchievementListView):
+    async def get(self, request, *args, **kwargs):
+        user = await aresolve_user(request)
+        page = await apaginate(self.get_queryset(), self.paginate_by, request.GET.get('page'), strict=True)
+        liked = set()
+        if user.is_authenticated:
+            liked = set(await alist(
+                AchievementLike.objects.filter(user=user, achievement__in=page.object_list)
+                .values_list('achievement_id', flat=True)
+            ))
+        for ach in page.object_list:
+            ach.liked_by = ach.pk in liked
+        self.object_list = page.object_list
+        return self.render_to_response({**page_context(page, self.context_object_name), 'view': self})
+
+class AchievementDetailView(ConditionalDetailMixin, DetailView):
     model = Achievement
     template_name = 'achievements/achievement_detail.html'
     context_object_name = 'achievement'
@@ -86,6 +103,13 @@ class AchievementDetailView(DetailView):
             )
         return queryset
 
+    def get_versions(self):
+        return {
+            'comments': related_aggregate(AchievementComment.objects.all(), 'achievement'),
+            'comment_updated': related_aggregate(AchievementComment.objects.all(), 'achievement', Max('updated_at')),
+            'likes': related_aggregate(AchievementLike.objects.all(), 'achievement'),
+        }
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['comment_form'] = CommentForm()
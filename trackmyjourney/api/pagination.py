@@ -0,0 +1,74 @@
+import base64
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _column(name):
+    return name.lstrip('-')
+
+
+def encode_cursor(obj, ordering):
+    values = [getattr(obj, _column(name)) for name in ordering]
+    # Full precision: DjangoJSONEncoder rounds times to milliseconds, which would skip rows on ties
+    values = [value.isoformat() if isinstance(value, datetime.datetime) else value for value in values]
+    raw = json.dumps(values, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        raise InvalidCursor('Malformed cursor')
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise InvalidCursor('Malformed cursor')
+    fields = [model._meta.pk if _column(name) == 'pk' else model._meta.get_field(_column(name)) for name in ordering]
+    try:
+        return [field.to_python(value) for field, value in zip(fields, values)]
+    except Exception:
+        raise InvalidCursor('Malformed cursor')
+
+
+def keyset_filter(ordering, values):
+    """
+    Rows strictly after ``values`` in ``ordering`` (a row-value comparison spelt out with Q objects).
+
+    The last ordering column must be unique (the primary key), so pages
+    never overlap or skip rows even when earlier columns tie.
+    """
+    condition = Q()
+    equal = {}
+    for name, value in zip(ordering, values):
+        column = _column(name)
+        operator = 'lt' if name.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{column}__{operator}': value})
+        equal[column] = value
+    return condition
+
+
+def paginate(queryset, ordering, cursor=None, limit=DEFAULT_LIMIT):
+    """
+    Return ``(objects, next_cursor)`` for one page.
+
+    Keyset pagination: the cost of a page does not depend on how deep into
+    the list it is, unlike OFFSET, and inserts don't shift page boundaries.
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        queryset = queryset.filter(keyset_filter(ordering, decode_cursor(cursor, queryset.model, ordering)))
+    objects = list(queryset[:limit + 1])
+    if len(objects) > limit:
+        objects = objects[:limit]
+        return objects, encode_cursor(objects[-1], ordering)
+    return objects, None
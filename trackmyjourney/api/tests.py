@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from books.models import Book
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, paginate
+
+User = get_user_model()
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', password='x')
+        start = timezone.now() - timedelta(days=1)
+        cls.books = []
+        for n in range(25):
+            book = Book.objects.create(title=f'Book {n}', author='A', description='d', uploaded_by=cls.user)
+            cls.books.append(book)
+        # Groups of five share an upload time, so pages have to break ties on the primary key
+        for n, book in enumerate(cls.books):
+            Book.objects.filter(pk=book.pk).update(uploaded_at=start + timedelta(minutes=n // 5))
+        cls.expected = list(Book.objects.order_by('-uploaded_at', '-pk').values_list('pk', flat=True))
+
+    def walk(self, url):
+        pks = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            pks += [item['id'] for item in response.json()['data']]
+            url = response.json()['links']['next']
+        return pks
+
+    def test_pages_cover_every_row_once_in_order(self):
+        self.assertEqual(self.walk('/api/v1/books/?limit=7&fields=title'), self.expected)
+
+    def test_rows_added_after_the_first_page_do_not_shift_later_pages(self):
+        first = self.client.get('/api/v1/books/?limit=10&fields=title').json()
+        Book.objects.create(title='Newest', author='A', description='d', uploaded_by=self.user)
+
+        rest = self.walk(first['links']['next'])
+        self.assertEqual([item['id'] for item in first['data']] + rest, self.expected)
+
+    def test_last_page_has_no_next_link(self):
+        response = self.client.get('/api/v1/books/?limit=25&fields=title').json()
+        self.assertEqual(len(response['data']), 25)
+        self.assertIsNone(response['links']['next'])
+
+    def test_malformed_cursors_are_a_bad_request(self):
+        for cursor in ('not-base64!', 'WzFd', 'e30'):
+            response = self.client.get(f'/api/v1/books/?cursor={cursor}')
+            self.assertEqual(response.status_code, 400, cursor)
+
+    def test_cursor_round_trips_full_precision_times(self):
+        ordering = ('-uploaded_at', '-pk')
+        book = Book.objects.get(pk=self.expected[3])
+        values = decode_cursor(encode_cursor(book, ordering), Book, ordering)
+        self.assertEqual(values, [book.uploaded_at, book.pk])
+        with self.assertRaises(InvalidCursor):
+            decode_cursor(encode_cursor(book, ('-pk',)), Book, ordering)
+
+    def test_each_page_costs_one_query(self):
+        queryset = Book.objects.only('pk', 'uploaded_at')
+        _, cursor = paginate(queryset, ('-uploaded_at', '-pk'), limit=10)
+        with self.assertNumQueries(1):
+            page, _ = paginate(queryset, ('-uploaded_at', '-pk'), cursor, limit=10)
+        self.assertEqual([book.pk for book in page], self.expected[10:20])
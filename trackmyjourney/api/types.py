@@ -0,0 +1,530 @@
+import operator
+
+from django.db.models import Count, Prefetch, Q
+from django.db.models.fields.files import FieldFile, ImageFieldFile
+
+from accounts.models import User
+from achievements.models import Achievement, AchievementLike
+from blog.models import BlogPost, Category as BlogCategory
+from books.models import Book, BookCategory, BookRating, ReadingList
+from community.models import Community, CommunityMembership
+from core.images import get_renditions, prefetch_renditions
+from goals.models import Category as GoalCategory, Goal, Milestone
+from groups.models import Group, GroupMembership
+from resources.models import Resource, ResourceBookmark, ResourceLike, ResourceRating
+
+TYPES = {}
+
+
+def register(cls):
+    TYPES[cls.name] = cls()
+    return cls
+
+
+class Include:
+    """A related object (``many=False``) or list of objects that can be embedded with ``include=``."""
+
+    def __init__(self, type_name, path, many=False):
+        self.type_name = type_name
+        self.path = path
+        self.many = many
+
+    @property
+    def type(self):
+        return TYPES[self.type_name]
+
+
+class ApiType:
+    """
+    How one model is exposed by the API.
+
+    ``fields`` maps output names to a dotted attribute path or a callable
+    taking the object. ``annotations`` are aggregates added to the query
+    only when requested. ``heavy_fields`` are deferred unless requested.
+    """
+    name = ''
+    model = None
+    lookup = 'pk'
+    endpoint = True
+    fields = {}
+    default_fields = None
+    annotations = {}
+    includes = {}
+    heavy_fields = ()
+    select_related = ()
+    ordering = ('-created_at', '-pk')
+    filters = {}
+
+    def all_fields(self):
+        names = list(self.fields) + list(self.annotations)
+        return names + ['viewer'] if self.has_viewer_state else names
+
+    def list_fields(self):
+        if self.default_fields is None:
+            return [name for name in self.all_fields() if name not in self.heavy_fields]
+        return list(self.default_fields) + (['viewer'] if self.has_viewer_state else [])
+
+    @property
+    def has_viewer_state(self):
+        return type(self).viewer_state is not ApiType.viewer_state
+
+    def get_queryset(self, user):
+        return self.model._default_manager.all()
+
+    def viewer_state(self, user, objects):
+        """``{pk: {...}}`` describing the signed-in user's relation to ``objects``, in a few queries."""
+        return {}
+
+    def build_queryset(self, queryset, fields, includes=(), include_fields=None):
+        include_fields = include_fields or {}
+        for name in fields:
+            if name in self.annotations:
+                queryset = queryset.annotate(**{f'api_{name}': self.annotations[name]})
+        deferred = [name for name in self.heavy_fields if name not in fields]
+        if deferred:
+            queryset = queryset.defer(*deferred)
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        for name in includes:
+            include = self.includes[name]
+            related = include.type
+            if include.many:
+                related_qs = related.build_queryset(
+                    related.model._default_manager.all(), include_fields.get(related.name, related.list_fields())
+                )
+                queryset = queryset.prefetch_related(Prefetch(include.path, queryset=related_qs))
+            else:
+                queryset = queryset.select_related(include.path, *(
+                    f'{include.path}__{path}' for path in related.select_related
+                ))
+        return queryset
+
+    def value(self, obj, name):
+        if name in self.annotations:
+            return getattr(obj, f'api_{name}')
+        source = self.fields[name]
+        if callable(source):
+            return source(obj)
+        return operator.attrgetter(source)(obj)
+
+    def serialize(self, objects, fields, user=None, includes=(), include_fields=None):
+        """Plain dicts for ``objects`` with only ``fields`` and the requested ``includes`` embedded."""
+        include_fields = include_fields or {}
+        viewer = {}
+        if 'viewer' in fields and user is not None and user.is_authenticated and objects:
+            viewer = self.viewer_state(user, objects)
+
+        rows = []
+        for obj in objects:
+            row = {'id': obj.pk}
+            for name in fields:
+                if name == 'viewer':
+                    row['viewer'] = viewer.get(obj.pk) if viewer else None
+                else:
+                    row[name] = self.value(obj, name)
+            for name in includes:
+                include = self.includes[name]
+                related = include.type
+                nested_fields = include_fields.get(related.name, related.list_fields())
+                nested_fields = [field for field in nested_fields if field != 'viewer']
+                target = operator.attrgetter(include.path.replace('__', '.'))(obj)
+                if include.many:
+                    row[name] = related.serialize(list(target.all()), nested_fields)
+                else:
+                    row[name] = related.serialize([target], nested_fields)[0] if target is not None else None
+            rows.append(row)
+        return _resolve_files(rows)
+
+
+def _collect_images(value, names):
+    if isinstance(value, ImageFieldFile):
+        names.append(value.name)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _collect_images(item, names)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_images(item, names)
+
+
+def _file_payload(value):
+    if isinstance(value, FieldFile):
+        if not value:
+            return None
+        if isinstance(value, ImageFieldFile):
+            from django.core.files.storage import default_storage
+            renditions = {
+                rendition: {
+                    'width': entry['width'],
+                    'height': entry['height'],
+                    **{key: default_storage.url(entry[key]) for key in ('webp', 'fallback') if key in entry},
+                }
+                for rendition, entry in get_renditions(value.name).items()
+            }
+            return {'url': value.url, 'renditions': renditions}
+        return {'url': value.url}
+    if isinstance(value, dict):
+        return {key: _file_payload(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_file_payload(item) for item in value]
+    return value
+
+
+def _resolve_files(rows):
+    # One manifest lookup for every image on the page instead of one per image
+    names = []
+    _collect_images(rows, names)
+    if names:
+        prefetch_renditions(names)
+    return _file_payload(rows)
+
+
+def _pks_in(queryset, column):
+    return set(queryset.values_list(column, flat=True))
+
+
+@register
+class UserType(ApiType):
+    name = 'users'
+    model = User
+    endpoint = False
+    fields = {
+        'username': 'username',
+        'full_name': lambda user: user.get_full_name(),
+        'avatar': 'avatar',
+    }
+
+
+@register
+class GoalCategoryType(ApiType):
+    name = 'goal-categories'
+    model = GoalCategory
+    endpoint = False
+    fields = {'name': 'name'}
+
+
+@register
+class MilestoneType(ApiType):
+    name = 'milestones'
+    model = Milestone
+    endpoint = False
+    fields = {
+        'title': 'title',
+        'target_date': 'target_date',
+        'is_completed': 'is_completed',
+        'completed_at': 'completed_at',
+    }
+
+
+@register
+class GoalType(ApiType):
+    name = 'goals'
+    model = Goal
+    fields = {
+        'title': 'title',
+        'description': 'description',
+        'category': 'category.name',
+        'priority': 'priority',
+        'status': 'status',
+        'progress': 'progress',
+        'target_date': 'target_date',
+        'is_public': 'is_public',
+        'created_at': 'created_at',
+        'completed_at': 'completed_at',
+        'url': lambda goal: goal.get_absolute_url(),
+    }
+    annotations = {'milestone_count': Count('milestones', distinct=True)}
+    heavy_fields = ('description',)
+    select_related = ('category',)
+    includes = {
+        'user': Include('users', 'user'),
+        'milestones': Include('milestones', 'milestones', many=True),
+    }
+    filters = {'status': 'status', 'category': 'category__name', 'user': 'user__username'}
+
+    def get_queryset(self, user):
+        visible = Q(is_public=True)
+        if user.is_authenticated:
+            visible |= Q(user=user)
+        return self.model._default_manager.filter(visible)
+
+    def viewer_state(self, user, objects):
+        return {goal.pk: {'is_owner': goal.user_id == user.pk} for goal in objects}
+
+
+@register
+class AchievementType(ApiType):
+    name = 'achievements'
+    model = Achievement
+    ordering = ('-date_achieved', '-pk')
+    fields = {
+        'title': 'title',
+        'description': 'description',
+        'category': 'category',
+        'badge_icon': 'badge_icon',
+        'date_achieved': 'date_achieved',
+        'image': 'image',
+        'created_at': 'created_at',
+        'url': lambda achievement: achievement.get_absolute_url(),
+    }
+    annotations = {
+        'like_count': Count('likes', distinct=True),
+        'comment_count': Count('comments', distinct=True),
+    }
+    heavy_fields = ('description',)
+    includes = {'user': Include('users', 'user')}
+    filters = {'category': 'category', 'user': 'user__username'}
+
+    def get_queryset(self, user):
+        visible = Q(is_public=True)
+        if user.is_authenticated:
+            visible |= Q(user=user)
+        return self.model._default_manager.filter(visible)
+
+    def viewer_state(self, user, objects):
+        liked = _pks_in(AchievementLike.objects.filter(user=user, achievement__in=objects), 'achievement_id')
+        return {
+            achievement.pk: {'is_owner': achievement.user_id == user.pk, 'liked': achievement.pk in liked}
+            for achievement in objects
+        }
+
+
+@register
+class BlogCategoryType(ApiType):
+    name = 'blog-categories'
+    model = BlogCategory
+    endpoint = False
+    fields = {'name': 'name', 'slug': 'slug', 'icon': 'icon', 'post_count': 'post_count'}
+
+
+@register
+class BlogPostType(ApiType):
+    name = 'blog-posts'
+    model = BlogPost
+    lookup = 'slug'
+    fields = {
+        'title': 'title',
+        'slug': 'slug',
+        'excerpt': 'excerpt',
+        'content': 'content',
+        'featured_image': 'featured_image',
+        'tags': 'tags',
+        'is_featured': 'is_featured',
+        'views': 'views',
+        'reading_time': 'reading_time',
+        'published_at': 'published_at',
+        'created_at': 'created_at',
+        'url': lambda post: post.get_absolute_url(),
+    }
+    annotations = {
+        'like_count': Count('likes', distinct=True),
+        'comment_count': Count('comments', filter=Q(comments__is_approved=True), distinct=True),
+    }
+    heavy_fields = ('content',)
+    includes = {
+        'author': Include('users', 'author'),
+        'categories': Include('blog-categories', 'categories', many=True),
+    }
+    filters = {'category': 'categories__slug', 'author': 'author__username', 'featured': 'is_featured'}
+
+    def get_queryset(self, user):
+        return self.model._default_manager.filter(status='published')
+
+    def viewer_state(self, user, objects):
+        through_likes = self.model.likes.through.objects.filter(user=user, blogpost__in=objects)
+        through_bookmarks = self.model.bookmarks.through.objects.filter(user=user, blogpost__in=objects)
+        liked = _pks_in(through_likes, 'blogpost_id')
+        bookmarked = _pks_in(through_bookmarks, 'blogpost_id')
+        return {
+            post.pk: {
+                'is_author': post.author_id == user.pk,
+                'liked': post.pk in liked,
+                'bookmarked': post.pk in bookmarked,
+            }
+            for post in objects
+        }
+
+
+@register
+class BookCategoryType(ApiType):
+    name = 'book-categories'
+    model = BookCategory
+    endpoint = False
+    fields = {'name': 'name', 'slug': 'slug'}
+
+
+@register
+class BookType(ApiType):
+    name = 'books'
+    model = Book
+    lookup = 'slug'
+    ordering = ('-uploaded_at', '-pk')
+    fields = {
+        'title': 'title',
+        'slug': 'slug',
+        'author': 'author',
+        'isbn': 'isbn',
+        'description': 'description',
+        'cover_image': 'cover_image',
+        'format': 'format',
+        'language': 'language',
+        'pages': 'pages',
+        'file_size': 'file_size',
+        'publisher': 'publisher',
+        'publication_date': 'publication_date',
+        'tags': 'tags',
+        'is_featured': 'is_featured',
+        'allow_download': 'allow_download',
+        'downloads': 'downloads',
+        'views': 'views',
+        'uploaded_at': 'uploaded_at',
+        'url': lambda book: book.get_absolute_url(),
+    }
+    annotations = {
+        'like_count': Count('likes', distinct=True),
+        'rating_count': Count('ratings', distinct=True),
+    }
+    heavy_fields = ('description',)
+    includes = {
+        'uploaded_by': Include('users', 'uploaded_by'),
+        'categories': Include('book-categories', 'categories', many=True),
+    }
+    filters = {'category': 'categories__slug', 'language': 'language', 'format': 'format'}
+
+    def get_queryset(self, user):
+        return self.model._default_manager.filter(is_public=True)
+
+    def viewer_state(self, user, objects):
+        liked = _pks_in(self.model.likes.through.objects.filter(user=user, book__in=objects), 'book_id')
+        bookmarked = _pks_in(self.model.bookmarks.through.objects.filter(user=user, book__in=objects), 'book_id')
+        reading = dict(ReadingList.objects.filter(user=user, book__in=objects).values_list('book_id', 'status'))
+        ratings = dict(BookRating.objects.filter(user=user, book__in=objects).values_list('book_id', 'rating'))
+        return {
+            book.pk: {
+                'liked': book.pk in liked,
+                'bookmarked': book.pk in bookmarked,
+                'reading_status': reading.get(book.pk),
+                'rating': ratings.get(book.pk),
+            }
+            for book in objects
+        }
+
+
+@register
+class ResourceType(ApiType):
+    name = 'resources'
+    model = Resource
+    ordering = ('-uploaded_at', '-pk')
+    fields = {
+        'title': 'title',
+        'description': 'description',
+        'category': 'category',
+        'resource_type': 'resource_type',
+        'file': 'file',
+        'external_url': 'url',
+        'thumbnail': 'thumbnail',
+        'tags': 'tags',
+        'views': 'views',
+        'downloads': 'downloads',
+        'uploaded_at': 'uploaded_at',
+        'url': lambda resource: resource.get_absolute_url(),
+    }
+    annotations = {
+        'like_count': Count('resourcelike', distinct=True),
+        'comment_count': Count('comments', distinct=True),
+    }
+    heavy_fields = ('description',)
+    includes = {'uploaded_by': Include('users', 'uploaded_by')}
+    filters = {'category': 'category', 'type': 'resource_type'}
+
+    def get_queryset(self, user):
+        return self.model._default_manager.filter(is_public=True)
+
+    def viewer_state(self, user, objects):
+        liked = _pks_in(ResourceLike.objects.filter(user=user, resource__in=objects), 'resource_id')
+        bookmarked = _pks_in(ResourceBookmark.objects.filter(user=user, resource__in=objects), 'resource_id')
+        ratings = dict(ResourceRating.objects.filter(user=user, resource__in=objects).values_list('resource_id', 'rating'))
+        return {
+            resource.pk: {
+                'liked': resource.pk in liked,
+                'bookmarked': resource.pk in bookmarked,
+                'rating': ratings.get(resource.pk),
+            }
+            for resource in objects
+        }
+
+
+@register
+class GroupType(ApiType):
+    name = 'groups'
+    model = Group
+    lookup = 'slug'
+    fields = {
+        'name': 'name',
+        'slug': 'slug',
+        'description': 'description',
+        'category': 'category',
+        'privacy': 'privacy',
+        'cover_image': 'cover_image',
+        'logo': 'logo',
+        'rules': 'rules',
+        'tags': 'tags',
+        'is_featured': 'is_featured',
+        'member_count': 'member_count',
+        'created_at': 'created_at',
+        'url': lambda group: group.get_absolute_url(),
+    }
+    heavy_fields = ('description', 'rules')
+    includes = {'creator': Include('users', 'creator')}
+    filters = {'category': 'category', 'privacy': 'privacy', 'featured': 'is_featured'}
+
+    def get_queryset(self, user):
+        return self.model._default_manager.filter(is_active=True)
+
+    def viewer_state(self, user, objects):
+        memberships = {
+            group_id: {'role': role, 'status': status}
+            for group_id, role, status in GroupMembership.objects.filter(user=user, group__in=objects)
+            .values_list('group_id', 'role', 'status')
+        }
+        return {
+            group.pk: {'is_creator': group.creator_id == user.pk, 'membership': memberships.get(group.pk)}
+            for group in objects
+        }
+
+
+@register
+class CommunityType(ApiType):
+    name = 'communities'
+    model = Community
+    fields = {
+        'name': 'name',
+        'description': 'description',
+        'category': 'category',
+        'banner': 'banner',
+        'logo': 'logo',
+        'rules': 'rules_list',
+        'is_featured': 'is_featured',
+        'created_at': 'created_at',
+        'url': lambda community: community.get_absolute_url(),
+    }
+    annotations = {
+        'member_count': Count('members', distinct=True),
+        'post_count': Count('posts', distinct=True),
+    }
+    heavy_fields = ('description', 'rules')
+    includes = {'creator': Include('users', 'creator')}
+    filters = {'category': 'category', 'featured': 'is_featured'}
+
+    def viewer_state(self, user, objects):
+        joined = _pks_in(CommunityMembership.objects.filter(user=user, community__in=objects), 'community_id')
+        moderated = _pks_in(
+            self.model.moderators.through.objects.filter(user=user, community__in=objects), 'community_id'
+        )
+        return {
+            community.pk: {
+                'is_member': community.pk in joined,
+                'is_moderator': community.pk in moderated or community.creator_id == user.pk,
+            }
+            for community in objects
+        }
@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('v1/', views.index, name='index'),
+    path('v1/<slug:type_name>/', views.object_list, name='list'),
+    path('v1/<slug:type_name>/<str:lookup>/', views.object_detail, name='detail'),
+]
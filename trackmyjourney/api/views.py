@@ -0,0 +1,155 @@
+import hashlib
+import json
+import re
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.views.decorators.http import require_safe
+
+from .pagination import DEFAULT_LIMIT, MAX_LIMIT, InvalidCursor, paginate
+from .types import TYPES
+
+FIELDS_PARAM_RE = re.compile(r'^fields\[([\w-]+)\]$')
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def _split(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def _parse_selection(request, api_type, detail=False):
+    """
+    Read ``fields``, ``fields[<type>]`` and ``include`` from the query string.
+
+    Returns ``(fields, includes, include_fields)``; unknown names are a 400
+    rather than being ignored so typos in the front-end show up at once.
+    """
+    includes = _split(request.GET.get('include', ''))
+    unknown = [name for name in includes if name not in api_type.includes]
+    if unknown:
+        raise BadRequest(f'Unknown include for {api_type.name}: {", ".join(unknown)}')
+
+    requested = {}
+    for key, value in request.GET.items():
+        match = FIELDS_PARAM_RE.match(key)
+        if match:
+            requested[match.group(1)] = _split(value)
+    if 'fields' in request.GET:
+        requested[api_type.name] = _split(request.GET['fields'])
+
+    for type_name, names in requested.items():
+        if type_name not in TYPES:
+            raise BadRequest(f'Unknown type in fields[]: {type_name}')
+        unknown = [name for name in names if name not in TYPES[type_name].all_fields()]
+        if unknown:
+            raise BadRequest(f'Unknown fields for {type_name}: {", ".join(unknown)}')
+
+    default = api_type.all_fields() if detail else api_type.list_fields()
+    fields = requested.pop(api_type.name, default)
+    return fields, includes, requested
+
+
+def _apply_filters(request, api_type, queryset):
+    for param, lookup in api_type.filters.items():
+        value = request.GET.get(param)
+        if value is None or value == '':
+            continue
+        if lookup.startswith('is_'):
+            value = value.lower() in ('1', 'true', 'yes')
+        queryset = queryset.filter(**{lookup: value})
+    return queryset
+
+
+def _respond(request, payload):
+    """JSON response with an ETag over the body; a matching If-None-Match gets a bodiless 304."""
+    body = json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+    etag = '"%s"' % hashlib.sha1(body).hexdigest()
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    # Viewer flags differ per user, so shared caches must not reuse the body
+    patch_vary_headers(response, ['Cookie'])
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _get_type(type_name):
+    api_type = TYPES.get(type_name)
+    if api_type is None or not api_type.endpoint:
+        return None
+    return api_type
+
+
+@require_safe
+def index(request):
+    return _respond(request, {
+        'types': {
+            api_type.name: {
+                'url': request.build_absolute_uri(reverse('api:list', args=[api_type.name])),
+                'fields': api_type.all_fields(),
+                'default_fields': api_type.list_fields(),
+                'includes': {name: include.type_name for name, include in api_type.includes.items()},
+                'filters': list(api_type.filters),
+            }
+            for api_type in TYPES.values() if api_type.endpoint
+        },
+    })
+
+
+@require_safe
+def object_list(request, type_name):
+    api_type = _get_type(type_name)
+    if api_type is None:
+        return _error(f'Unknown type: {type_name}', status=404)
+    try:
+        fields, includes, include_fields = _parse_selection(request, api_type)
+        limit = min(max(int(request.GET.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+    except BadRequest as exc:
+        return _error(str(exc))
+    except ValueError:
+        return _error('limit must be a number')
+
+    queryset = _apply_filters(request, api_type, api_type.get_queryset(request.user))
+    queryset = api_type.build_queryset(queryset, fields, includes, include_fields)
+    try:
+        objects, next_cursor = paginate(queryset, api_type.ordering, request.GET.get('cursor'), limit)
+    except InvalidCursor as exc:
+        return _error(str(exc))
+
+    next_url = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_url = request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+    data = api_type.serialize(objects, fields, request.user, includes, include_fields)
+    return _respond(request, {'data': data, 'links': {'next': next_url}})
+
+
+@require_safe
+def object_detail(request, type_name, lookup):
+    api_type = _get_type(type_name)
+    if api_type is None:
+        return _error(f'Unknown type: {type_name}', status=404)
+    try:
+        fields, includes, include_fields = _parse_selection(request, api_type, detail=True)
+    except BadRequest as exc:
+        return _error(str(exc))
+
+    if api_type.lookup == 'pk' and not lookup.isdigit():
+        return _error('Not found', status=404)
+    queryset = api_type.build_queryset(api_type.get_queryset(request.user), fields, includes, include_fields)
+    obj = queryset.filter(**{api_type.lookup: lookup}).first()
+    if obj is None:
+        return _error('Not found', status=404)
+    data = api_type.serialize([obj], fields, request.user, includes, include_fields)[0]
+    return _respond(request, {'data': data})
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from blog.related import refresh_related_posts
+
+class Command(BaseCommand):
+    help = 'Rebuild the precomputed related-posts index for all published blog posts'
+
+    def handle(self, *args, **options):
+        written = refresh_related_posts()
+        self.stdout.write(
+            self.style.SUCCESS(f'Related posts computed for {written} published posts')
+        )
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_threaded_comment_paths'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedFeatures',
+            fields=[
+                ('post_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('terms', models.JSONField(default=list, help_text='Every distinct term, for document frequency deltas')),
+                ('vector', models.JSONField(default=dict, help_text='Unit TF-IDF weights of the strongest terms')),
+                ('categories', models.JSONField(default=list)),
+                ('tags', models.JSONField(default=list)),
+            ],
+            options={
+                'verbose_name_plural': 'Related features',
+            },
+        ),
+        migrations.CreateModel(
+            name='RelatedTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100, unique=True)),
+                ('documents', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RelatedKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=110)),
+                ('post_id', models.IntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['post_id'], name='blog_relate_post_id_636556_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='relatedkey',
+            constraint=models.UniqueConstraint(fields=('key', 'post_id'), name='blog_relatedkey_key_post'),
+        ),
+    ]
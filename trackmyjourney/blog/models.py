@@ -1,8 +1,12 @@
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.utils.text import slugify
 from django.utils import timezone
+from core.models import ThreadedComment
+from core.slugs import save_with_unique_slug
 
 User = get_user_model()
 
@@ -56,6 +60,15 @@ class Category(models.Model):
         self.post_count = self.posts.filter(status='published').count()
         self.save(update_fields=['post_count'])
 
+    @classmethod
+    def adjust_post_counts(cls, category_ids, delta):
+        """Add ``delta`` to the published-post count of the given categories in one UPDATE."""
+        if not category_ids or not delta:
+            return
+        cls.objects.filter(pk__in=category_ids).update(
+            post_count=Greatest(F('post_count') + delta, Value(0))
+        )
+
 class BlogPost(models.Model):
     STATUS_CHOICES = [
         ('draft', 'Draft'),
@@ -96,15 +109,6 @@ class BlogPost(models.Model):
         return reverse('blog:detail', kwargs={'slug': self.slug})
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.title)
-            # Ensure unique slug
-            original_slug = self.slug
-            counter = 1
-            while BlogPost.objects.filter(slug=self.slug).exists():
-                self.slug = f"{original_slug}-{counter}"
-                counter += 1
-        
         if not self.excerpt and self.content:
             # Create excerpt from content
             words = self.content.split()[:50]
@@ -118,12 +122,19 @@ class BlogPost(models.Model):
         # Set published_at when status changes to published
         if self.status == 'published' and not self.published_at:
             self.published_at = timezone.now()
-        
-        super().save(*args, **kwargs)
-        
-        # Update category post counts
-        for category in self.categories.all():
-            category.update_post_count()
+
+        if self.slug:
+            super().save(*args, **kwargs)
+        else:
+            save_with_unique_slug(self, self.title, super().save, *args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so signals can count publish/unpublish transitions
+        if 'status' in field_names:
+            instance._loaded_status = values[field_names.index('status')]
+        return instance
 
     @property
     def total_likes(self):
@@ -137,7 +148,18 @@ class BlogPost(models.Model):
     def total_comments(self):
         return self.comments.count()
 
-class Comment(models.Model):
+    def get_related_posts(self, limit=3):
+        """Ranked related posts from the precomputed index, fetched with one pk-in query."""
+        try:
+            related_ids = self.related_index.post_ids[:limit]
+        except RelatedPosts.DoesNotExist:
+            return []
+        if not related_ids:
+            return []
+        posts = BlogPost.objects.filter(pk__in=related_ids, status='published').in_bulk()
+        return [posts[pk] for pk in related_ids if pk in posts]
+
+class Comment(ThreadedComment):
     post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies')
@@ -149,6 +171,9 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['post', 'path']),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author.username} on {self.post.title}"
@@ -156,3 +181,58 @@ class Comment(models.Model):
     @property
     def total_likes(self):
         return self.likes.count()
+
+class RelatedPosts(models.Model):
+    """Precomputed, ranked related-post ids for a published post (see blog/related.py)."""
+    post = models.OneToOneField(BlogPost, on_delete=models.CASCADE, primary_key=True, related_name='related_index')
+    post_ids = models.JSONField(default=list)
+    scores = models.JSONField(default=list)
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = 'Related posts'
+
+    def __str__(self):
+        return f"Related posts for {self.post_id}"
+
+
+class RelatedFeatures(models.Model):
+    """
+    What the related-posts ranking compares for one published post (see blog/related.py).
+
+    Keyed by a plain post id rather than a foreign key, so a deleted post's
+    terms are still here when its refresh takes them out of RelatedTerm.
+    """
+    post_id = models.IntegerField(primary_key=True)
+    terms = models.JSONField(default=list, help_text="Every distinct term, for document frequency deltas")
+    vector = models.JSONField(default=dict, help_text="Unit TF-IDF weights of the strongest terms")
+    categories = models.JSONField(default=list)
+    tags = models.JSONField(default=list)
+
+    class Meta:
+        verbose_name_plural = 'Related features'
+
+    def __str__(self):
+        return f"Related features for {self.post_id}"
+
+
+class RelatedKey(models.Model):
+    """Inverted index: posts sharing a key (``w:term``, ``c:category id``, ``t:tag``) are ranking candidates."""
+    key = models.CharField(max_length=110)
+    post_id = models.IntegerField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['key', 'post_id'], name='blog_relatedkey_key_post')]
+        indexes = [models.Index(fields=['post_id'])]
+
+    def __str__(self):
+        return f"{self.key} -> {self.post_id}"
+
+
+class RelatedTerm(models.Model):
+    """Number of published posts using a term, kept by deltas as posts change."""
+    term = models.CharField(max_length=100, unique=True)
+    documents = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.term} ({self.documents})"
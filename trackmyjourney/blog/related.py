@@ -0,0 +1,311 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+# How many related ids are stored per post and how the three signals are weighted
+RELATED_POSTS_STORED = getattr(settings, 'RELATED_POSTS_STORED', 6)
+CATEGORY_WEIGHT = 0.4
+TAG_WEIGHT = 0.3
+TEXT_WEIGHT = 0.3
+
+# Only the strongest terms of each post take part in the text comparison
+MAX_TERMS_PER_POST = 40
+MAX_CONTENT_WORDS = 1500
+# Terms and index keys are cut to fit RelatedTerm.term and RelatedKey.key
+MAX_TERM_LENGTH = 100
+MAX_KEY_LENGTH = 110
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#\-]{2,}")
+STOPWORDS = frozenset("""
+    about above after again against all also and any are because been before being below between both but
+    can could did does doing down during each few for from further had has have having her here hers him his
+    how into its itself just more most much must not now off once only other our ours out over own same she
+    should some such than that the their theirs them then there these they this those through too under until
+    very was were what when where which while who whom why will with would you your yours
+""".split())
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def parse_tags(tags):
+    return {tag.strip().lower() for tag in (tags or '').split(',') if tag.strip()}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def term_counts(title, excerpt, content):
+    words = ' '.join((content or '').split()[:MAX_CONTENT_WORDS])
+    # Titles are short but descriptive, so count their terms twice
+    terms = tokenize(title) * 2 + tokenize(excerpt or '') + tokenize(words)
+    return Counter(term[:MAX_TERM_LENGTH] for term in terms)
+
+
+def weigh(counts, doc_freq, total):
+    """Unit TF-IDF vector over the MAX_TERMS_PER_POST strongest of ``counts``."""
+    weights = {
+        term: (1 + math.log(count)) * math.log((1 + total) / (1 + doc_freq.get(term, 0)))
+        for term, count in counts.items()
+    }
+    top = sorted(weights.items(), key=lambda item: item[1], reverse=True)[:MAX_TERMS_PER_POST]
+    norm = math.sqrt(sum(w * w for _, w in top)) or 1.0
+    return {term: w / norm for term, w in top if w > 0}
+
+
+def index_keys(vector, categories, tags):
+    keys = ['w:' + term for term in vector]
+    keys += ['c:%s' % category_id for category_id in categories]
+    keys += ['t:' + tag for tag in tags]
+    return [key[:MAX_KEY_LENGTH] for key in keys]
+
+
+class RelatedIndex:
+    """
+    TF-IDF / overlap index over a set of published posts.
+
+    ``features`` maps a post id to its ``(vector, category ids, tags)``.
+    """
+
+    def __init__(self, features):
+        self.vectors = {}
+        self.categories = {}
+        self.tags = {}
+        self.postings = defaultdict(set)
+        for post_id, (vector, categories, tags) in features.items():
+            self.vectors[post_id] = vector
+            self.categories[post_id] = set(categories)
+            self.tags[post_id] = set(tags)
+            for key in index_keys(vector, categories, tags):
+                self.postings[key].add(post_id)
+
+    def __contains__(self, post_id):
+        return post_id in self.vectors
+
+    def candidates(self, post_id):
+        found = set()
+        for key in index_keys(self.vectors[post_id], self.categories[post_id], self.tags[post_id]):
+            found |= self.postings[key]
+        found.discard(post_id)
+        return found
+
+    def score(self, a, b):
+        va, vb = self.vectors[a], self.vectors[b]
+        if len(vb) < len(va):
+            va, vb = vb, va
+        cosine = sum(weight * vb.get(term, 0.0) for term, weight in va.items())
+        return (
+            CATEGORY_WEIGHT * jaccard(self.categories[a], self.categories[b])
+            + TAG_WEIGHT * jaccard(self.tags[a], self.tags[b])
+            + TEXT_WEIGHT * cosine
+        )
+
+    def ranked(self, post_id, limit=RELATED_POSTS_STORED):
+        scored = [(self.score(post_id, other), other) for other in self.candidates(post_id)]
+        scored = [(round(score, 4), other) for score, other in scored if score > 0]
+        scored.sort(key=lambda item: (-item[0], -item[1]))
+        return scored[:limit]
+
+
+def read_posts(queryset):
+    """``{post id: (term counts, category ids, tags)}`` for the posts in ``queryset``."""
+    from .models import BlogPost
+
+    post_categories = defaultdict(set)
+    through = BlogPost.categories.through.objects.filter(blogpost__in=queryset)
+    for post_id, category_id in through.values_list('blogpost_id', 'category_id').iterator(chunk_size=2000):
+        post_categories[post_id].add(category_id)
+    rows = queryset.values_list('id', 'title', 'excerpt', 'content', 'tags').iterator(chunk_size=500)
+    return {
+        post_id: (term_counts(title, excerpt, content), post_categories[post_id], parse_tags(tags))
+        for post_id, title, excerpt, content, tags in rows
+    }
+
+
+def _chunks(items, size=500):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _related_row(post_id, ranked, now):
+    from .models import RelatedPosts
+
+    return RelatedPosts(
+        post_id=post_id, post_ids=[other for _, other in ranked], scores=[score for score, _ in ranked], computed_at=now,
+    )
+
+
+def _write_rankings(rows):
+    from .models import RelatedPosts
+
+    RelatedPosts.objects.bulk_create(
+        rows,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['post'],
+        update_fields=['post_ids', 'scores', 'computed_at'],
+    )
+
+
+def _write_features(posts, features):
+    from .models import RelatedFeatures, RelatedKey
+
+    RelatedFeatures.objects.bulk_create(
+        [
+            RelatedFeatures(
+                post_id=post_id, terms=sorted(posts[post_id][0]), vector=vector, categories=categories, tags=tags,
+            )
+            for post_id, (vector, categories, tags) in features.items()
+        ],
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['post_id'],
+        update_fields=['terms', 'vector', 'categories', 'tags'],
+    )
+    RelatedKey.objects.bulk_create(
+        [
+            RelatedKey(key=key, post_id=post_id)
+            for post_id, feature in features.items() for key in set(index_keys(*feature))
+        ],
+        batch_size=500,
+    )
+
+
+def _features(posts, doc_freq, total):
+    return {
+        post_id: (weigh(counts, doc_freq, total), sorted(categories), sorted(tags))
+        for post_id, (counts, categories, tags) in posts.items()
+    }
+
+
+def rebuild_related_posts():
+    """Recompute the stored index and every ranking from scratch; returns the number of posts ranked."""
+    from .models import BlogPost, RelatedFeatures, RelatedKey, RelatedPosts, RelatedTerm
+
+    posts = read_posts(BlogPost.objects.filter(status='published'))
+    doc_freq = Counter()
+    for counts, _, _ in posts.values():
+        doc_freq.update(counts.keys())
+    features = _features(posts, doc_freq, len(posts) or 1)
+    index = RelatedIndex(features)
+
+    now = timezone.now()
+    with transaction.atomic():
+        RelatedTerm.objects.all().delete()
+        RelatedTerm.objects.bulk_create(
+            [RelatedTerm(term=term, documents=count) for term, count in doc_freq.items()], batch_size=1000,
+        )
+        RelatedFeatures.objects.all().delete()
+        RelatedKey.objects.all().delete()
+        _write_features(posts, features)
+        RelatedPosts.objects.exclude(post__status='published').delete()
+        _write_rankings([_related_row(post_id, index.ranked(post_id), now) for post_id in features])
+    return len(features)
+
+
+def _apply_doc_freq(delta):
+    """Move RelatedTerm counts by ``{term: +n/-n}``."""
+    from .models import RelatedTerm
+
+    gained = [term for term, change in delta.items() if change > 0]
+    for terms in _chunks(gained):
+        RelatedTerm.objects.bulk_create([RelatedTerm(term=term) for term in terms], ignore_conflicts=True)
+    by_change = defaultdict(list)
+    for term, change in delta.items():
+        if change:
+            by_change[change].append(term)
+    for change, terms in by_change.items():
+        for chunk in _chunks(terms):
+            RelatedTerm.objects.filter(term__in=chunk).update(documents=F('documents') + change)
+    lost = [term for term, change in delta.items() if change < 0]
+    for terms in _chunks(lost):
+        RelatedTerm.objects.filter(term__in=terms, documents__lte=0).delete()
+
+
+def refresh_related_posts(post_ids=None):
+    """
+    Recompute stored related-post rankings.
+
+    With ``post_ids=None`` the whole index is rebuilt. Otherwise only the
+    changed posts are re-read: document frequencies move by the terms they
+    gained or lost, they are ranked against the stored features of the posts
+    sharing a key with them, and those neighbours have the changed posts
+    merged into (or dropped from) their stored lists. Neighbours keep their
+    own vectors, and a list that loses a post stays one short, until the
+    periodic rebuild. Returns the number of rows written.
+    """
+    from .models import BlogPost, RelatedFeatures, RelatedKey, RelatedPosts, RelatedTerm
+
+    if post_ids is None or not RelatedFeatures.objects.exists():
+        return rebuild_related_posts()
+
+    changed = set(post_ids)
+    now = timezone.now()
+    with transaction.atomic():
+        posts = read_posts(BlogPost.objects.filter(status='published', pk__in=changed))
+        stored_terms = dict(RelatedFeatures.objects.filter(post_id__in=changed).values_list('post_id', 'terms'))
+        delta = Counter()
+        for post_id in changed:
+            old = set(stored_terms.get(post_id, ()))
+            new = set(posts[post_id][0]) if post_id in posts else set()
+            for term in new - old:
+                delta[term] += 1
+            for term in old - new:
+                delta[term] -= 1
+        _apply_doc_freq(delta)
+
+        terms = {term for counts, _, _ in posts.values() for term in counts}
+        doc_freq = {}
+        for chunk in _chunks(terms):
+            doc_freq.update(RelatedTerm.objects.filter(term__in=chunk).values_list('term', 'documents'))
+        features = _features(posts, doc_freq, BlogPost.objects.filter(status='published').count() or 1)
+
+        # Posts sharing an old key may list a changed post that no longer overlaps with them
+        keys = set(RelatedKey.objects.filter(post_id__in=changed).values_list('key', flat=True))
+        RelatedKey.objects.filter(post_id__in=changed).delete()
+        RelatedFeatures.objects.filter(post_id__in=changed - set(posts)).delete()
+        _write_features(posts, features)
+        for feature in features.values():
+            keys.update(index_keys(*feature))
+
+        neighbour_ids = set()
+        for chunk in _chunks(keys):
+            neighbour_ids.update(RelatedKey.objects.filter(key__in=chunk).values_list('post_id', flat=True))
+        neighbour_ids -= changed
+        neighbours = {}
+        for chunk in _chunks(neighbour_ids):
+            stored = RelatedFeatures.objects.filter(post_id__in=chunk).values_list('post_id', 'vector', 'categories', 'tags')
+            neighbours.update((post_id, feature) for post_id, *feature in stored)
+        index = RelatedIndex({**neighbours, **features})
+
+        rows = [_related_row(post_id, index.ranked(post_id), now) for post_id in features]
+        for chunk in _chunks(neighbours):
+            stored = RelatedPosts.objects.filter(post_id__in=chunk).values_list('post_id', 'post_ids', 'scores')
+            for post_id, related_ids, scores in stored:
+                ranked = [(score, other) for score, other in zip(scores, related_ids) if other not in changed]
+                for other in features:
+                    score = round(index.score(post_id, other), 4)
+                    if score > 0:
+                        ranked.append((score, other))
+                ranked.sort(key=lambda item: (-item[0], -item[1]))
+                rows.append(_related_row(post_id, ranked[:RELATED_POSTS_STORED], now))
+
+        RelatedPosts.objects.filter(post_id__in=changed - set(posts)).delete()
+        _write_rankings(rows)
+    return len(rows)
+
+
+def schedule_related_refresh(post_id):
+    """Queue a background refresh for ``post_id``; the job commits with the caller's transaction."""
+    from .tasks import refresh_related
+    refresh_related.enqueue([post_id], unique_key=f'post:{post_id}')
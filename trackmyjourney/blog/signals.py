@@ -0,0 +1,83 @@
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from .models import BlogPost, Category
+from .related import schedule_related_refresh
+
+# Saves that only touch these fields never change what a post is related to
+RELATED_IRRELEVANT_FIELDS = {'views', 'reading_time', 'is_featured', 'allow_comments'}
+
+def _category_ids(post):
+    return list(BlogPost.categories.through.objects.filter(blogpost_id=post.pk).values_list('category_id', flat=True))
+
+@receiver(post_save, sender=BlogPost)
+def refresh_related_on_save(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and set(update_fields) <= RELATED_IRRELEVANT_FIELDS:
+        return
+    schedule_related_refresh(instance.pk)
+
+@receiver(post_save, sender=BlogPost)
+def count_status_transition(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    """Move the post in or out of its categories' published counts when its status flips."""
+    if raw or (update_fields is not None and 'status' not in update_fields):
+        return
+
+    was_published = getattr(instance, '_loaded_status', None) == 'published'
+    is_published = instance.status == 'published'
+    instance._loaded_status = instance.status
+    if created or was_published == is_published:
+        # New posts have no categories yet; they are counted as they are added
+        return
+    Category.adjust_post_counts(_category_ids(instance), 1 if is_published else -1)
+
+@receiver(m2m_changed, sender=BlogPost.categories.through)
+def count_category_changes(sender, instance, action, reverse, pk_set, **kwargs):
+    """Apply +1/-1 deltas as published posts gain or lose categories."""
+    if action == 'pre_clear':
+        # The cleared rows are gone by post_clear, so remember them now
+        if reverse:
+            instance._cleared_post_ids = list(instance.posts.filter(status='published').values_list('pk', flat=True))
+        elif instance.status == 'published':
+            instance._cleared_category_ids = _category_ids(instance)
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    delta = -1 if action in ('post_remove', 'post_clear') else 1
+    if reverse:
+        # category.posts.add/remove/clear(): one category, many posts
+        if action == 'post_clear':
+            published = len(instance.__dict__.pop('_cleared_post_ids', []))
+        else:
+            published = BlogPost.objects.filter(pk__in=pk_set, status='published').count()
+        Category.adjust_post_counts([instance.pk], delta * published)
+    elif action == 'post_clear':
+        Category.adjust_post_counts(instance.__dict__.pop('_cleared_category_ids', []), delta)
+    elif instance.status == 'published':
+        Category.adjust_post_counts(pk_set, delta)
+
+@receiver(m2m_changed, sender=BlogPost.categories.through)
+def refresh_related_on_categories_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # Category side of the relation: refresh every affected post
+        for post_id in pk_set or ():
+            schedule_related_refresh(post_id)
+    else:
+        schedule_related_refresh(instance.pk)
+
+@receiver(pre_delete, sender=BlogPost)
+def remember_categories_before_delete(sender, instance, **kwargs):
+    # Category links are cascaded away without m2m_changed, so capture them first
+    if instance.status == 'published':
+        instance._deleted_category_ids = _category_ids(instance)
+
+@receiver(post_delete, sender=BlogPost)
+def count_deleted_post(sender, instance, **kwargs):
+    Category.adjust_post_counts(instance.__dict__.pop('_deleted_category_ids', []), -1)
+
+@receiver(post_delete, sender=BlogPost)
+def refresh_related_on_delete(sender, instance, **kwargs):
+    schedule_related_refresh(instance.pk)
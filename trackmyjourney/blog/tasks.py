@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from jobs.registry import periodic_task, task
+from .models import BlogPost, Category
+from .related import rebuild_related_posts, refresh_related_posts
+
+
+@task
+def refresh_related(post_ids=None):
+    refresh_related_posts(post_ids)
+
+
+@periodic_task(every=timedelta(days=1), priority=-10)
+def rebuild_related():
+    """Recompute every vector against current document frequencies; per-post refreshes only patch around edits."""
+    rebuild_related_posts()
+
+
+@periodic_task(every=timedelta(hours=6), priority=-5)
+def reconcile_category_post_counts():
+    """Safety net for the delta-maintained Category.post_count: recount all categories in one UPDATE."""
+    published = (
+        BlogPost.categories.through.objects
+        .filter(category_id=OuterRef('pk'), blogpost__status='published')
+        .values('category_id')
+        .annotate(total=Count('blogpost_id'))
+        .values('total')
+    )
+    Category.objects.update(post_count=Coalesce(Subquery(published), 0))
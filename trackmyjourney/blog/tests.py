@@ -1,3 +1,263 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+
+from core import counters
+from core.models import MAX_THREAD_DEPTH, PATH_MAX_LENGTH
+from core.threads import load_thread, paginate_threads
+from .models import BlogPost, Category, Comment, RelatedFeatures, RelatedPosts, RelatedTerm
+from .related import refresh_related_posts
+
+User = get_user_model()
+
+
+class RelatedPostsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('writer', password='x')
+        cls.security = Category.objects.create(name='Security', slug='security')
+        cls.cooking = Category.objects.create(name='Cooking', slug='cooking')
+
+    def post(self, title, content, categories=(), tags='', status='published'):
+        post = BlogPost.objects.create(
+            author=self.author, title=title, content=content, excerpt=content[:40], tags=tags, status=status,
+        )
+        post.categories.set(categories)
+        return post
+
+    def related(self, post):
+        return RelatedPosts.objects.get(post=post).post_ids
+
+    def test_category_tags_and_text_rank_together(self):
+        subject = self.post('Hardening nginx', 'nginx tls ciphers hardening headers', [self.security], 'nginx, tls')
+        close = self.post('Nginx tls setup', 'nginx tls certificates ciphers', [self.security], 'nginx, tls')
+        textual = self.post('Nginx caching', 'nginx caching headers proxy', tags='caching')
+        unrelated = self.post('Sourdough', 'flour water starter bread', [self.cooking], 'bread')
+
+        self.assertEqual(refresh_related_posts(), 4)
+        self.assertEqual(self.related(subject), [close.pk, textual.pk])
+        self.assertNotIn(unrelated.pk, self.related(close))
+        self.assertEqual(self.related(unrelated), [])
+
+    def test_an_edit_only_touches_the_posts_sharing_keys(self):
+        first = self.post('Threat models', 'threat modelling attackers assets', [self.security])
+        second = self.post('Attack trees', 'attack trees attackers goals', [self.security])
+        bread = self.post('Rye bread', 'rye flour bread crumb', [self.cooking])
+        refresh_related_posts()
+        untouched = RelatedPosts.objects.get(post=bread).computed_at
+
+        first.title = 'Threat models for bakers'
+        first.save()
+        self.assertEqual(refresh_related_posts([first.pk]), 2)
+
+        self.assertEqual(RelatedPosts.objects.get(post=bread).computed_at, untouched)
+        self.assertEqual(self.related(second), [first.pk])
+        self.assertEqual(RelatedTerm.objects.get(term='bakers').documents, 1)
+
+    def test_new_posts_join_their_neighbours_lists(self):
+        first = self.post('Password managers', 'passwords vaults managers', [self.security])
+        refresh_related_posts()
+        second = self.post('Password reuse', 'passwords reuse breaches', [self.security])
+
+        refresh_related_posts([second.pk])
+        self.assertEqual(self.related(first), [second.pk])
+        self.assertEqual(self.related(second), [first.pk])
+        self.assertEqual(RelatedTerm.objects.get(term='passwords').documents, 2)
+
+    def test_unpublished_and_deleted_posts_leave_the_index(self):
+        kept = self.post('Phishing drills', 'phishing drills staff', [self.security])
+        hidden = self.post('Phishing kits', 'phishing kits lures', [self.security])
+        deleted = self.post('Phishing reports', 'phishing reports triage', [self.security])
+        refresh_related_posts()
+
+        hidden.status = 'draft'
+        hidden.save()
+        deleted_pk = deleted.pk
+        deleted.delete()
+        refresh_related_posts([hidden.pk, deleted_pk])
+
+        self.assertEqual(self.related(kept), [])
+        self.assertFalse(RelatedPosts.objects.filter(post=hidden).exists())
+        self.assertEqual(set(RelatedFeatures.objects.values_list('post_id', flat=True)), {kept.pk})
+        self.assertEqual(RelatedTerm.objects.get(term='phishing').documents, 1)
+        self.assertFalse(RelatedTerm.objects.filter(term='kits').exists())
+
+
+class CommentThreadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('writer', password='x')
+        cls.post = BlogPost.objects.create(author=cls.author, title='Threads', content='c', excerpt='e')
+
+    def comment(self, content, parent=None):
+        return Comment.objects.create(post=self.post, author=self.author, content=content, parent=parent)
+
+    def flatten(self, comments, depth=0):
+        for comment in comments:
+            yield depth, comment.content
+            yield from self.flatten(comment.thread_replies, depth + 1)
+
+    def test_threads_load_depth_first_with_oldest_replies_first(self):
+        first = self.comment('first')
+        second = self.comment('second')
+        a = self.comment('a', first)
+        self.comment('b', second)
+        self.comment('a1', a)
+        self.comment('c', first)
+
+        with self.assertNumQueries(1):
+            roots = load_thread(Comment.objects.filter(post=self.post))
+        self.assertEqual(list(self.flatten(roots)), [
+            (0, 'first'), (1, 'a'), (2, 'a1'), (1, 'c'), (0, 'second'), (1, 'b'),
+        ])
+
+    def test_pages_hold_whole_threads(self):
+        roots = [self.comment(f'root {n}') for n in range(3)]
+        for root in roots:
+            self.comment(f'reply to {root.content}', self.comment(f'under {root.content}', root))
+
+        with self.assertNumQueries(3):
+            page = paginate_threads(Comment.objects.filter(post=self.post), 2, per_page=2)
+            flattened = list(self.flatten(page.object_list))
+        self.assertEqual(page.paginator.count, 3)
+        self.assertEqual(flattened, [(0, 'root 2'), (1, 'under root 2'), (2, 'reply to root 2')])
+
+    def test_reply_counts_follow_replies(self):
+        root = self.comment('root')
+        replies = [self.comment(f'reply {n}', root) for n in range(3)]
+        root.refresh_from_db()
+        self.assertEqual(root.reply_count, 3)
+
+        replies[0].delete()
+        root.refresh_from_db()
+        self.assertEqual(root.reply_count, 2)
+
+    def test_replies_past_the_depth_cap_join_their_parent(self):
+        comment = self.comment('level 0')
+        for depth in range(1, MAX_THREAD_DEPTH):
+            comment = self.comment(f'level {depth}', comment)
+        self.assertEqual(comment.depth, MAX_THREAD_DEPTH - 1)
+
+        too_deep = self.comment('one more', comment)
+        self.assertEqual(too_deep.parent_id, comment.parent_id)
+        self.assertEqual(too_deep.depth, comment.depth)
+        self.assertLessEqual(len(too_deep.path), PATH_MAX_LENGTH)
+        deepest = list(self.flatten(load_thread(Comment.objects.filter(post=self.post))))[-2:]
+        self.assertEqual(deepest, [(MAX_THREAD_DEPTH - 1, comment.content), (MAX_THREAD_DEPTH - 1, 'one more')])
+
+
+class CategoryPostCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('writer', password='x')
+        cls.news = Category.objects.create(name='News', slug='news')
+        cls.guides = Category.objects.create(name='Guides', slug='guides')
+
+    def counts(self):
+        return dict(Category.objects.values_list('slug', 'post_count'))
+
+    def post(self, status='published', categories=()):
+        post = BlogPost.objects.create(author=self.author, title='Post', content='c', excerpt='e', status=status)
+        post.categories.add(*categories)
+        return post
+
+    def test_publishing_and_unpublishing_move_the_counts(self):
+        post = self.post('draft', [self.news, self.guides])
+        self.assertEqual(self.counts(), {'news': 0, 'guides': 0})
+
+        post = BlogPost.objects.get(pk=post.pk)
+        post.status = 'published'
+        post.save()
+        self.assertEqual(self.counts(), {'news': 1, 'guides': 1})
+
+        post.title = 'Edited'
+        post.save()
+        self.assertEqual(self.counts(), {'news': 1, 'guides': 1})
+
+        post.status = 'archived'
+        post.save(update_fields=['status'])
+        self.assertEqual(self.counts(), {'news': 0, 'guides': 0})
+
+    def test_category_changes_move_the_counts(self):
+        post = self.post(categories=[self.news])
+        post.categories.set([self.guides])
+        self.assertEqual(self.counts(), {'news': 0, 'guides': 1})
+
+        self.news.posts.add(post, self.post('draft'))
+        self.assertEqual(self.counts(), {'news': 1, 'guides': 1})
+
+        post.categories.clear()
+        self.assertEqual(self.counts(), {'news': 0, 'guides': 0})
+
+        self.post(categories=[self.guides])
+        self.guides.posts.clear()
+        self.assertEqual(self.counts(), {'news': 0, 'guides': 0})
+
+    def test_deleting_a_post_takes_it_out_of_the_counts(self):
+        self.post(categories=[self.news, self.guides])
+        self.post('draft', [self.news]).delete()
+        self.post(categories=[self.news]).delete()
+        self.assertEqual(self.counts(), {'news': 1, 'guides': 1})
+
+    def test_counts_match_a_recount(self):
+        from .tasks import reconcile_category_post_counts
+
+        self.post(categories=[self.news, self.guides])
+        self.post('draft', [self.news])
+        Category.objects.update(post_count=7)
+
+        reconcile_category_post_counts.func()
+        self.assertEqual(self.counts(), {'news': 1, 'guides': 1})
+
+
+@mock.patch.object(counters.threading, 'Timer')
+class ConditionalDetailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('writer', 'writer@example.com', 'x')
+        cls.reader = User.objects.create_user('reader', 'reader@example.com', 'x')
+        cls.post = BlogPost.objects.create(
+            author=cls.author, title='Cached', slug='cached', content='c', excerpt='e', status='published',
+        )
+        cls.url = reverse('blog:detail', args=['cached'])
+
+    def setUp(self):
+        counters._pending.clear()
+        self.addCleanup(counters._pending.clear)
+        self.client.force_login(self.reader)
+
+    def etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_matching_validators_get_a_304_without_rendering(self, Timer):
+        response = self.client.get(self.url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertIn('private', response['Cache-Control'])
+
+        with self.assertTemplateNotUsed('blog/blog_detail.html'):
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        # Views are still counted when the page is not re-sent
+        self.assertEqual(counters._pending[('blog.BlogPost', self.post.pk, 'views')], 3)
+
+    def test_comments_and_likes_change_the_etag(self, Timer):
+        etag = self.etag()
+        Comment.objects.create(post=self.post, author=self.author, content='new')
+        after_comment = self.etag()
+        self.assertNotEqual(after_comment, etag)
+
+        self.post.likes.add(self.author)
+        after_like = self.etag()
+        self.assertNotEqual(after_like, after_comment)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=after_comment).status_code, 200)
 
-# Create your tests here.
+    def test_each_viewer_gets_their_own_etag(self, Timer):
+        etag = self.etag()
+        self.client.force_login(self.author)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
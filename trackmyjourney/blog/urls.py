@@ -1,4 +1,5 @@
 from django.urls import path
+from core.asyncviews import served
 from . import views
 
 app_name = 'blog'
@@ -15,8 +16,8 @@ urlpatterns = [
     path('<slug:slug>/like/', views.like_post, name='like'),
     path('<slug:slug>/bookmark/', views.bookmark_post, name='bookmark'),
     path('<slug:slug>/comment/', views.add_comment, name='add_comment'),
-    path('<slug:slug>/', views.BlogDetailView.as_view(), name='detail'),
+    path('<slug:slug>/', served(views.BlogDetailView.as_view(), views.AsyncBlogDetailView.as_view()), name='detail'),
     
     # Root path last
-    path('', views.BlogListView.as_view(), name='list'),
+    path('', served(views.BlogListView.as_view(), views.AsyncBlogListView.as_view()), name='list'),
 ]
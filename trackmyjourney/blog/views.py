@@ -1,13 +1,22 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.contrib import messages
 from django.urls import reverse_lazy
-from django.http import JsonResponse
-from django.db.models import Q
+from django.http import JsonResponse, Http404
+from django.db import transaction
+from django.db.models import F, Max, Q
 from django.utils import timezone
 from django.core.paginator import Paginator
+from core.asyncviews import alist, apaginate, aresolve_user, page_context
+from core.conditional import AsyncConditionalDetailMixin, ConditionalDetailMixin, related_aggregate
+from core.counters import bump
+from core.images import prefetch_renditions
+from core.threads import paginate_threads
 from .models import BlogPost, Category, Comment
 from .forms import BlogPostForm, CommentForm
 
@@ -39,30 +48,103 @@ class BlogListView(ListView):
         context['featured_posts'] = BlogPost.objects.filter(
             status='published', is_featured=True
         ).order_by('-published_at')[:3]
+        prefetch_renditions(
+            [post.featured_image.name for post in context['posts']]
+            + [post.featured_image.name for post in context['featured_posts']]
+        )
         return context
 
-class BlogDetailView(DetailView):
+class BlogDetailView(ConditionalDetailMixin, DetailView):
     model = BlogPost
     template_name = 'blog/blog_detail.html'
     context_object_name = 'post'
 
+    def get_queryset(self):
+        return BlogPost.objects.select_related('author', 'related_index')
+
     def get_object(self):
-        obj = get_object_or_404(BlogPost, slug=self.kwargs['slug'], status='published')
-        # Increment view count
-        obj.views += 1
-        obj.save(update_fields=['views'])
+        return self.check_visible(get_object_or_404(self.get_queryset(), slug=self.kwargs['slug']))
+
+    def check_visible(self, obj):
+        # Published posts are public; drafts and archived posts are only visible to their author
+        if obj.status != 'published':
+            if not (self.request.user.is_authenticated and obj.author == self.request.user):
+                raise Http404("No BlogPost matches the given query.")
         return obj
 
+    def get_versions(self):
+        comments = Comment.objects.filter(is_approved=True)
+        return {
+            'comments': related_aggregate(comments, 'post'),
+            'comment_updated': related_aggregate(comments, 'post', Max('updated_at')),
+            'likes': related_aggregate(BlogPost.likes.through.objects.all(), 'blogpost'),
+            'bookmarks': related_aggregate(BlogPost.bookmarks.through.objects.all(), 'blogpost'),
+            'related': F('related_index__computed_at'),
+        }
+
+    def count_view(self):
+        if self.object.status == 'published':
+            bump(self.object, 'views')
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['comment_form'] = CommentForm()
-        context['comments'] = self.object.comments.filter(is_approved=True, parent=None)
-        context['related_posts'] = BlogPost.objects.filter(
-            categories__in=self.object.categories.all(),
-            status='published'
-        ).exclude(pk=self.object.pk).distinct()[:3]
+        context['comments'] = paginate_threads(
+            self.object.comments.filter(is_approved=True).select_related('author'),
+            self.request.GET.get('comments_page'),
+            per_page=20
+        )
+        context['related_posts'] = self.object.get_related_posts(limit=3)
         return context
 
+
+class AsyncBlogListView(BlogListView):
+    async def get(self, request, *args, **kwargs):
+        await aresolve_user(request)
+        page, categories, featured_posts = await asyncio.gather(
+            apaginate(self.get_queryset(), self.paginate_by, request.GET.get('page'), strict=True),
+            alist(Category.objects.all()),
+            alist(BlogPost.objects.filter(status='published', is_featured=True).order_by('-published_at')[:3]),
+        )
+        await sync_to_async(prefetch_renditions)(
+            [post.featured_image.name for post in page.object_list]
+            + [post.featured_image.name for post in featured_posts]
+        )
+        self.object_list = page.object_list
+        return self.render_to_response({
+            **page_context(page, self.context_object_name),
+            'view': self,
+            'categories': categories,
+            'featured_posts': featured_posts,
+        })
+
+
+class AsyncBlogDetailView(AsyncConditionalDetailMixin, BlogDetailView):
+    async def aget_object(self):
+        try:
+            obj = await self.get_queryset().aget(slug=self.kwargs['slug'])
+        except BlogPost.DoesNotExist:
+            raise Http404("No BlogPost matches the given query.")
+        return self.check_visible(obj)
+
+    async def aget_context_data(self, **kwargs):
+        comments, related_posts = await asyncio.gather(
+            sync_to_async(paginate_threads)(
+                self.object.comments.filter(is_approved=True).select_related('author'),
+                self.request.GET.get('comments_page'),
+                per_page=20
+            ),
+            sync_to_async(self.object.get_related_posts)(limit=3),
+        )
+        return {
+            'view': self,
+            'object': self.object,
+            self.context_object_name: self.object,
+            'comment_form': CommentForm(),
+            'comments': comments,
+            'related_posts': related_posts,
+        }
+
 class MyBlogListView(LoginRequiredMixin, ListView):
     model = BlogPost
     template_name = 'blog/my_blog_list.html'
@@ -82,13 +164,9 @@ class BlogCreateView(LoginRequiredMixin, CreateView):
         if form.instance.status == 'published':
             form.instance.published_at = timezone.now()
         
-        # Save the post first
-        response = super().form_valid(form)
-        
-        # Update category post counts
-        for category in self.object.categories.all():
-            category.update_post_count()
-        
+        # Post row, category links and category counts commit together
+        with transaction.atomic():
+            response = super().form_valid(form)
         messages.success(self.request, 'Blog post created successfully!')
         return response
 
@@ -104,12 +182,9 @@ class BlogUpdateView(LoginRequiredMixin, UpdateView):
         if form.instance.status == 'published' and not form.instance.published_at:
             form.instance.published_at = timezone.now()
         
-        response = super().form_valid(form)
-        
-        # Update category post counts
-        for category in self.object.categories.all():
-            category.update_post_count()
-        
+        # Post row, category links and category counts commit together
+        with transaction.atomic():
+            response = super().form_valid(form)
         messages.success(self.request, 'Blog post updated successfully!')
         return response
 
@@ -121,13 +196,10 @@ class BlogDeleteView(LoginRequiredMixin, DeleteView):
     def get_queryset(self):
         return BlogPost.objects.filter(author=self.request.user)
 
-    def delete(self, request, *args, **kwargs):
-        # Update category post counts before deletion
-        for category in self.get_object().categories.all():
-            category.update_post_count()
-        
-        messages.success(request, 'Blog post deleted successfully!')
-        return super().delete(request, *args, **kwargs)
+    def form_valid(self, form):
+        # Category post counts are adjusted by the post_delete signal
+        messages.success(self.request, 'Blog post deleted successfully!')
+        return super().form_valid(form)
 
 @login_required
 def like_post(request, slug):
@@ -205,37 +277,3 @@ def like_comment(request, pk):
     
     return redirect('blog:detail', slug=comment.post.slug)
 
-
-from django.shortcuts import render
-from django.views.generic import ListView, DetailView
-from .models import BlogPost
-from django.http import Http404
-
-
-
-
-class BlogDetailView(DetailView):
-    model = BlogPost
-    template_name = 'blog/blog_detail.html'
-    context_object_name = 'post'
-
-    def get_object(self):
-        slug = self.kwargs['slug']
-        try:
-            obj = BlogPost.objects.get(slug=slug)
-        except BlogPost.DoesNotExist:
-            raise Http404("No BlogPost matches the given query.")
-
-        # Check permissions:
-        # 1. If the post is published, it's publicly accessible.
-        # 2. If the user is authenticated AND is the author of the post, they can view it regardless of status.
-        if obj.status == 'published' or (self.request.user.is_authenticated and obj.author == self.request.user):
-            # Increment view count only if it's a published post being viewed (publicly or by author)
-            # or if it's a public user viewing any post (though the first condition handles published for public)
-            if obj.status == 'published': # Only increment views for published posts
-                obj.views += 1
-                obj.save(update_fields=['views'])
-            return obj
-        else:
-            # If not published and not the author, raise 404
-            raise Http404("No BlogPost matches the given query.")
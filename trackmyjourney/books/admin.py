@@ -1,6 +1,49 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
+from .importer import BookImporter, read_rows
 from .models import Book, BookCategory, ReadingList, BookRating
 
+class BookImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV with a header row, or JSON Lines (.jsonl) with one book per line")
+    create_categories = forms.BooleanField(required=False, help_text="Create categories that do not exist yet")
+
+class BookImportMixin:
+    """Adds an "Import books" page to the Book changelist (see books/importer.py)."""
+    change_list_template = 'admin/books/book/change_list.html'
+
+    def get_urls(self):
+        urls = [path('import/', self.admin_site.admin_view(self.import_view), name='books_book_import')]
+        return urls + super().get_urls()
+
+    def import_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        form = BookImportForm(request.POST or None, request.FILES or None)
+        result = None
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            fmt = 'csv' if upload.name.lower().endswith('.csv') else 'jsonl'
+            importer = BookImporter(request.user, create_categories=form.cleaned_data['create_categories'])
+            result = importer.run(read_rows(upload, fmt))
+            level = messages.WARNING if result.error_count else messages.SUCCESS
+            self.message_user(request, (
+                f"Imported {result.created} books from {result.rows} rows "
+                f"({result.duplicates} duplicate ISBNs skipped, {result.error_count} errors)."
+            ), level)
+
+        request.current_app = self.admin_site.name
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Import books',
+            'opts': self.model._meta,
+            'form': form,
+            'result': result,
+        }
+        return TemplateResponse(request, 'admin/books/book/import.html', context)
+
 @admin.register(BookCategory)
 class BookCategoryAdmin(admin.ModelAdmin):
     list_display = ('name', 'slug')
@@ -11,12 +54,13 @@ class BookRatingInline(admin.TabularInline):
     extra = 0
 
 @admin.register(Book)
-class BookAdmin(admin.ModelAdmin):
+class BookAdmin(BookImportMixin, admin.ModelAdmin):
     list_display = ('title', 'author', 'uploaded_by', 'format', 'language', 'is_public', 'downloads', 'views')
     list_filter = ('format', 'language', 'is_public', 'is_featured', 'uploaded_at')
     search_fields = ('title', 'author', 'isbn', 'uploaded_by__username')
     date_hierarchy = 'uploaded_at'
     inlines = [BookRatingInline]
+    readonly_fields = ('file_size', 'title_hint', 'author_hint', 'metadata_extracted_at')
     
     fieldsets = (
         ('Book Information', {
@@ -25,6 +69,10 @@ class BookAdmin(admin.ModelAdmin):
         ('File Information', {
             'fields': ('file', 'cover_image', 'format', 'language', 'pages')
         }),
+        ('Extracted Metadata', {
+            'fields': ('file_size', 'title_hint', 'author_hint', 'metadata_extracted_at'),
+            'classes': ('collapse',)
+        }),
         ('Publication Details', {
             'fields': ('publisher', 'publication_date', 'categories')
         }),
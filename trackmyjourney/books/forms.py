@@ -1,9 +1,10 @@
 from django import forms
 from .models import Book, BookCategory, BookRating, ReadingList
 from crispy_forms.helper import FormHelper
+from uploads.forms import ChunkedUploadFormMixin
 from crispy_forms.layout import Layout, Submit, Row, Column
 
-class BookForm(forms.ModelForm):
+class BookForm(ChunkedUploadFormMixin, forms.ModelForm):
     categories = forms.ModelMultipleChoiceField(
         queryset=BookCategory.objects.all(),
         widget=forms.CheckboxSelectMultiple,
@@ -0,0 +1,213 @@
+import codecs
+import csv
+import json
+import re
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils.text import slugify
+
+from core.slugs import allocate_slugs
+from .models import Book, BookCategory
+
+BATCH_SIZE = 500
+MAX_ERRORS_KEPT = 1000
+
+IMPORT_FIELDS = [
+    'title', 'author', 'isbn', 'description', 'format', 'language', 'pages',
+    'publisher', 'publication_date', 'tags', 'is_public', 'allow_download',
+]
+BOOLEAN_FIELDS = {'is_public', 'allow_download'}
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'off', ''}
+CATEGORY_SEPARATORS = re.compile(r'[;|]')
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.duplicates = 0
+        self.errors = []
+        self.error_count = 0
+
+    def error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS_KEPT:
+            self.errors.append((line, message))
+
+    @property
+    def rows(self):
+        return self.created + self.duplicates + self.error_count
+
+
+def normalize_isbn(value):
+    isbn = re.sub(r'[\s-]', '', str(value or '')).upper()
+    if isbn and not re.fullmatch(r'\d{9}[\dX]|\d{13}', isbn):
+        raise ValidationError(f'"{value}" is not a valid ISBN-10 or ISBN-13')
+    return isbn or None
+
+
+def read_rows(fileobj, fmt):
+    """
+    Yield ``(line_number, row)`` from a binary CSV or JSON Lines file one row at a time.
+
+    Rows that cannot be parsed are yielded as ``(line_number, exception)``.
+    """
+    text = codecs.getreader('utf-8-sig')(fileobj, errors='replace')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield number, ValidationError(f'Invalid JSON: {exc}')
+            continue
+        if not isinstance(row, dict):
+            yield number, ValidationError('Each line must be a JSON object')
+            continue
+        yield number, row
+
+
+class BookImporter:
+    """
+    Validate catalogue rows and insert them with ``bulk_create`` in batches.
+
+    Rows whose ISBN is already in the catalogue (or earlier in the file) are
+    skipped as duplicates. Invalid rows are reported and never stop the load.
+    """
+
+    def __init__(self, uploaded_by, create_categories=False, batch_size=BATCH_SIZE, dry_run=False):
+        self.uploaded_by = uploaded_by
+        self.create_categories = create_categories
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.categories = {}
+        for category in BookCategory.objects.all():
+            self.categories[category.name.lower()] = category
+            self.categories[category.slug] = category
+        self.seen_isbns = set()
+        self.result = ImportResult()
+
+    def run(self, rows):
+        batch = []
+        for line, row in rows:
+            if isinstance(row, Exception):
+                self.result.error(line, '; '.join(getattr(row, 'messages', [str(row)])))
+                continue
+            try:
+                book, category_names = self.build(row)
+            except ValidationError as exc:
+                self.result.error(line, '; '.join(
+                    f'{field}: {" ".join(messages)}' for field, messages in exc.message_dict.items()
+                ) if hasattr(exc, 'error_dict') else '; '.join(exc.messages))
+                continue
+            batch.append((line, book, category_names))
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        if batch:
+            self.flush(batch)
+        return self.result
+
+    def build(self, row):
+        values = {}
+        errors = {}
+        for field in IMPORT_FIELDS:
+            value = row.get(field)
+            if value is None or value == '':
+                continue
+            if field in BOOLEAN_FIELDS and not isinstance(value, bool):
+                lowered = str(value).strip().lower()
+                if lowered not in TRUE_VALUES | FALSE_VALUES:
+                    errors[field] = [f'"{value}" is not a boolean']
+                    continue
+                value = lowered in TRUE_VALUES
+            values[field] = value.strip() if isinstance(value, str) else value
+        try:
+            values['isbn'] = normalize_isbn(values.get('isbn'))
+        except ValidationError as exc:
+            errors['isbn'] = exc.messages
+            values.pop('isbn')
+
+        book = Book(uploaded_by=self.uploaded_by, **values)
+        try:
+            book.clean_fields(exclude=['slug', 'uploaded_by', *errors])
+        except ValidationError as exc:
+            errors.update(exc.message_dict)
+
+        raw = row.get('categories') or []
+        names = raw if isinstance(raw, list) else CATEGORY_SEPARATORS.split(str(raw))
+        names = [str(name).strip() for name in names if str(name).strip()]
+        unknown = [name for name in names if name.lower() not in self.categories and slugify(name) not in self.categories]
+        if unknown and not self.create_categories:
+            errors['categories'] = [f'Unknown categories: {", ".join(unknown)}']
+        if errors:
+            raise ValidationError(errors)
+        return book, names
+
+    def resolve_categories(self, names):
+        resolved = []
+        for name in names:
+            category = self.categories.get(name.lower()) or self.categories.get(slugify(name))
+            if category is None:
+                category, _ = BookCategory.objects.get_or_create(slug=slugify(name), defaults={'name': name})
+                self.categories[name.lower()] = self.categories[category.slug] = category
+            resolved.append(category)
+        return resolved
+
+    def flush(self, batch):
+        isbns = [book.isbn for _, book, _ in batch if book.isbn]
+        existing = set(Book.objects.filter(isbn__in=isbns).values_list('isbn', flat=True)) if isbns else set()
+        fresh = []
+        for line, book, names in batch:
+            if book.isbn and (book.isbn in existing or book.isbn in self.seen_isbns):
+                self.result.duplicates += 1
+                continue
+            if book.isbn:
+                self.seen_isbns.add(book.isbn)
+            fresh.append((line, book, names))
+        if not fresh:
+            return
+        if self.dry_run:
+            self.result.created += len(fresh)
+            return
+
+        slugs = allocate_slugs(Book, [f'{book.title}-{book.author}' for _, book, _ in fresh])
+        for (_, book, _), slug in zip(fresh, slugs):
+            book.slug = slug
+        try:
+            with transaction.atomic():
+                created = Book.objects.bulk_create([book for _, book, _ in fresh])
+                if any(book.pk is None for book in created):
+                    # Backends without RETURNING don't set primary keys on bulk inserts
+                    pks = dict(Book.objects.filter(slug__in=slugs).values_list('slug', 'pk'))
+                    for book in created:
+                        book.pk = pks[book.slug]
+                self.link_categories(zip(created, [names for _, _, names in fresh]))
+            self.result.created += len(created)
+        except IntegrityError:
+            # Something raced us for a slug or ISBN; insert row by row to find the culprit
+            for line, book, names in fresh:
+                book.pk = None
+                book.slug = ''
+                book._state.adding = True
+                try:
+                    with transaction.atomic():
+                        book.save()
+                        self.link_categories([(book, names)])
+                    self.result.created += 1
+                except IntegrityError as exc:
+                    self.result.error(line, str(exc))
+
+    def link_categories(self, books_and_names):
+        Through = Book.categories.through
+        rows = []
+        for book, names in books_and_names:
+            for category in {c.pk: c for c in self.resolve_categories(names)}.values():
+                rows.append(Through(book_id=book.pk, bookcategory_id=category.pk))
+        Through.objects.bulk_create(rows, batch_size=self.batch_size)
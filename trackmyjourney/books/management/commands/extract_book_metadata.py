@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from books.metadata import update_book_metadata
+from books.models import Book
+from books.tasks import extract_book_metadata
+
+
+class Command(BaseCommand):
+    help = 'Extract pages, format, size, title/author hints and covers from uploaded book files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-extract books that were already processed')
+        parser.add_argument('--enqueue', action='store_true', help='Queue background jobs instead of extracting inline')
+
+    def handle(self, *args, **options):
+        books = Book.objects.all() if options['all'] else Book.objects.filter(metadata_extracted_at__isnull=True)
+        done = failed = 0
+        for book in books.iterator(chunk_size=200):
+            if options['enqueue']:
+                extract_book_metadata.enqueue(book.pk, unique_key=f'book:{book.pk}')
+                done += 1
+                continue
+            try:
+                update_book_metadata(book)
+                done += 1
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f'{book.slug}: {exc}')
+
+        verb = 'Queued' if options['enqueue'] else 'Extracted metadata for'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {done} books ({failed} failed)'))
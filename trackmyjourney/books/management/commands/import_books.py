@@ -0,0 +1,47 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from books.importer import BATCH_SIZE, BookImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Import books from a CSV or JSON Lines file, skipping duplicate ISBNs and reporting bad rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (with a header row) or .jsonl file')
+        parser.add_argument('--user', required=True, help='Username recorded as the uploader')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension')
+        parser.add_argument('--create-categories', action='store_true', help='Create categories that do not exist yet')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Validate and count without writing')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['user']!r}")
+        fmt = options['format'] or ('csv' if options['path'].lower().endswith('.csv') else 'jsonl')
+        if not os.path.exists(options['path']):
+            raise CommandError(f"{options['path']} does not exist")
+
+        importer = BookImporter(
+            user,
+            create_categories=options['create_categories'],
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        with open(options['path'], 'rb') as fileobj:
+            result = importer.run(read_rows(fileobj, fmt))
+
+        for line, message in result.errors:
+            self.stderr.write(f'line {line}: {message}')
+        if result.error_count > len(result.errors):
+            self.stderr.write(f'... and {result.error_count - len(result.errors)} more errors')
+        verb = 'Would import' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {result.created} books from {result.rows} rows '
+            f'({result.duplicates} duplicate ISBNs skipped, {result.error_count} errors)'
+        ))
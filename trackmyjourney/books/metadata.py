@@ -0,0 +1,278 @@
+import math
+import posixpath
+import re
+import zipfile
+import zlib
+from io import BytesIO
+from xml.etree import ElementTree
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+# Whole files up to this size are scanned; larger PDFs only have their head and tail read
+MAX_SCAN_BYTES = 32 * 1024 * 1024
+PARTIAL_SCAN_BYTES = 8 * 1024 * 1024
+# Page estimates for formats without fixed pages
+WORDS_PER_PAGE = 300
+CHARS_PER_PAGE = 1800
+MIN_COVER_WIDTH = 150
+
+PDF_PAGES_RE = re.compile(rb'/Type\s*/Pages\b[^>]*?/Count\s+(\d+)|/Count\s+(\d+)[^>]*?/Type\s*/Pages\b', re.S)
+PDF_OBJSTM_RE = re.compile(rb'<<([^<>]{0,400}/Type\s*/ObjStm[^<>]{0,400})>>\s*stream\r?\n', re.S)
+PDF_IMAGE_RE = re.compile(rb'<<([^<>]{0,600}/Subtype\s*/Image[^<>]{0,600})>>\s*stream\r?\n', re.S)
+PDF_LENGTH_RE = re.compile(rb'/Length\s+(\d+)(?!\s+\d+\s+R)')
+PDF_STRING = rb'(\((?:\\.|[^\\)])*\)|<[0-9A-Fa-f\s]*>)'
+PDF_INFO_REF_RE = re.compile(rb'/Info\s+(\d+)\s+(\d+)\s+R')
+XMP_RE = {
+    'title': re.compile(rb'<dc:title>.*?<rdf:li[^>]*>(.*?)</rdf:li>', re.S),
+    'author': re.compile(rb'<dc:creator>.*?<rdf:li[^>]*>(.*?)</rdf:li>', re.S),
+}
+TXT_HEADER_RE = re.compile(r'^\s*(title|author)\s*:\s*(.+?)\s*$', re.I | re.M)
+
+EPUB_NS = {
+    'container': 'urn:oasis:names:tc:opendocument:xmlns:container',
+    'opf': 'http://www.idpf.org/2007/opf',
+    'dc': 'http://purl.org/dc/elements/1.1/',
+}
+TAG_RE = re.compile(r'<[^>]+>')
+
+
+def detect_format(head):
+    """Guess a Book.FORMAT_CHOICES value from the first few KB of a file."""
+    if b'%PDF-' in head[:1024]:
+        return 'pdf'
+    if head.startswith(b'PK\x03\x04'):
+        if b'mimetypeapplication/epub+zip' in head[:100]:
+            return 'epub'
+        if b'word/' in head:
+            return 'doc'
+        return 'other'
+    if head[60:68] == b'BOOKMOBI':
+        return 'mobi'
+    if head.startswith(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'):
+        return 'doc'
+    sample = head[:4096]
+    if sample and b'\x00' not in sample:
+        try:
+            sample.decode('utf-8')
+        except UnicodeDecodeError as exc:
+            # A multi-byte character cut off at the end of the sample is still text
+            if exc.start < len(sample) - 4:
+                return 'other'
+        return 'txt'
+    return 'other'
+
+
+def _pdf_string(raw):
+    if raw.startswith(b'<'):
+        data = bytes.fromhex(re.sub(rb'\s', b'', raw[1:-1]).decode())
+    else:
+        data = re.sub(
+            rb'\\([nrtbf()\\]|[0-7]{1,3})',
+            lambda m: {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f'}.get(
+                m.group(1), bytes([int(m.group(1), 8) & 0xFF]) if m.group(1)[:1].isdigit() else m.group(1)
+            ),
+            raw[1:-1],
+        )
+    if data.startswith(b'\xfe\xff'):
+        return data[2:].decode('utf-16-be', 'replace').strip()
+    return data.decode('latin-1').strip()
+
+
+def _pdf_object_streams(data):
+    """Decompressed object streams, where PDF 1.5+ files keep their /Pages tree."""
+    for match in PDF_OBJSTM_RE.finditer(data):
+        length = PDF_LENGTH_RE.search(match.group(1))
+        if not length or b'/FlateDecode' not in match.group(1):
+            continue
+        start = match.end()
+        try:
+            yield zlib.decompress(data[start:start + int(length.group(1))])
+        except zlib.error:
+            continue
+
+
+def _pdf_cover(data):
+    """The first reasonably large embedded JPEG, usually the cover scan of an ebook."""
+    from PIL import Image
+
+    for match in PDF_IMAGE_RE.finditer(data):
+        header = match.group(1)
+        length = PDF_LENGTH_RE.search(header)
+        if b'/DCTDecode' not in header or not length:
+            continue
+        start = match.end()
+        jpeg = data[start:start + int(length.group(1))]
+        if not jpeg.startswith(b'\xff\xd8'):
+            continue
+        try:
+            width, _ = Image.open(BytesIO(jpeg)).size
+        except Exception:
+            continue
+        if width >= MIN_COVER_WIDTH:
+            return jpeg
+    return None
+
+
+def extract_pdf(data):
+    counts = [int(a or b) for a, b in PDF_PAGES_RE.findall(data)]
+    if not counts:
+        for stream in _pdf_object_streams(data):
+            counts += [int(a or b) for a, b in PDF_PAGES_RE.findall(stream)]
+
+    # Only the trailer's /Info dictionary; outline entries also carry /Title
+    info = b''
+    refs = PDF_INFO_REF_RE.findall(data)
+    if refs:
+        number, generation = refs[-1]
+        start = data.rfind(b'\n' + number + b' ' + generation + b' obj')
+        if start != -1:
+            end = data.find(b'endobj', start)
+            info = data[start:end if end != -1 else start + 4096]
+
+    hints = {}
+    for key, name in (('title', b'Title'), ('author', b'Author')):
+        match = re.search(rb'/' + name + rb'\s*' + PDF_STRING, info)
+        if match:
+            hints[key] = _pdf_string(match.group(1))
+        if not hints.get(key):
+            xmp = XMP_RE[key].search(data)
+            if xmp:
+                hints[key] = xmp.group(1).decode('utf-8', 'replace').strip()
+
+    return {
+        'pages': max(counts) if counts else None,
+        'title': hints.get('title', ''),
+        'author': hints.get('author', ''),
+        'cover': _pdf_cover(data),
+    }
+
+
+def extract_epub(fileobj):
+    with zipfile.ZipFile(fileobj) as archive:
+        container = ElementTree.fromstring(archive.read('META-INF/container.xml'))
+        rootfile = container.find('.//container:rootfile', EPUB_NS).get('full-path')
+        package = ElementTree.fromstring(archive.read(rootfile))
+        base = posixpath.dirname(rootfile)
+
+        def text(tag):
+            element = package.find(f'.//dc:{tag}', EPUB_NS)
+            return (element.text or '').strip() if element is not None else ''
+
+        items = {
+            item.get('id'): item for item in package.findall('.//opf:manifest/opf:item', EPUB_NS)
+        }
+        cover_item = next(
+            (item for item in items.values() if 'cover-image' in (item.get('properties') or '').split()), None
+        )
+        if cover_item is None:
+            meta = package.find(".//opf:metadata/opf:meta[@name='cover']", EPUB_NS)
+            cover_item = items.get(meta.get('content')) if meta is not None else None
+        cover = None
+        if cover_item is not None and (cover_item.get('media-type') or '').startswith('image/'):
+            try:
+                cover = archive.read(posixpath.join(base, cover_item.get('href')))
+            except KeyError:
+                pass
+
+        characters = 0
+        for itemref in package.findall('.//opf:spine/opf:itemref', EPUB_NS):
+            item = items.get(itemref.get('idref'))
+            if item is None:
+                continue
+            try:
+                content = archive.read(posixpath.join(base, item.get('href')))
+            except KeyError:
+                continue
+            characters += len(' '.join(TAG_RE.sub(' ', content.decode('utf-8', 'replace')).split()))
+
+    return {
+        'pages': math.ceil(characters / CHARS_PER_PAGE) or None,
+        'title': text('title'),
+        'author': text('creator'),
+        'cover': cover,
+    }
+
+
+def extract_txt(data):
+    text = data.decode('utf-8', 'replace')
+    hints = {}
+    # Project Gutenberg style "Title:" / "Author:" headers near the top
+    for key, value in TXT_HEADER_RE.findall(text[:5000]):
+        hints.setdefault(key.lower(), value)
+    if 'title' not in hints:
+        hints['title'] = next((line.strip() for line in text.splitlines() if line.strip()), '')
+    words = len(text.split())
+    return {
+        'pages': math.ceil(words / WORDS_PER_PAGE) or None,
+        'title': hints.get('title', ''),
+        'author': hints.get('author', ''),
+        'cover': None,
+    }
+
+
+def extract_metadata(fileobj, size):
+    """
+    Read what can be learnt offline from a book file.
+
+    Returns ``format``, ``size``, ``pages`` and ``title``/``author`` hints
+    (empty when unknown) and ``cover`` image bytes or None.
+    """
+    head = fileobj.read(8192)
+    fileobj.seek(0)
+    result = {'format': detect_format(head), 'size': size, 'pages': None, 'title': '', 'author': '', 'cover': None}
+
+    if result['format'] == 'epub':
+        try:
+            result.update(extract_epub(fileobj))
+        except (zipfile.BadZipFile, KeyError, AttributeError, ElementTree.ParseError):
+            pass
+    elif result['format'] in ('pdf', 'txt'):
+        if size <= MAX_SCAN_BYTES:
+            data = fileobj.read()
+        else:
+            data = fileobj.read(PARTIAL_SCAN_BYTES)
+            fileobj.seek(size - PARTIAL_SCAN_BYTES)
+            data += fileobj.read()
+        extracted = extract_pdf(data) if result['format'] == 'pdf' else extract_txt(data)
+        if result['format'] == 'txt' and size > MAX_SCAN_BYTES:
+            extracted['pages'] = None
+        result.update(extracted)
+    return result
+
+
+def update_book_metadata(book):
+    """Extract metadata from ``book.file`` and store it, without overwriting pages or a cover set by hand."""
+    from PIL import Image
+
+    fields = ['file_size', 'title_hint', 'author_hint', 'metadata_extracted_at']
+    book.metadata_extracted_at = timezone.now()
+    if not book.file:
+        book.file_size = 0
+        book.title_hint = book.author_hint = ''
+        book.save(update_fields=fields)
+        return
+
+    size = book.file.size
+    with book.file.open('rb') as fileobj:
+        meta = extract_metadata(fileobj, size)
+
+    book.file_size = meta['size']
+    book.title_hint = meta['title'][:255]
+    book.author_hint = meta['author'][:255]
+    if meta['format'] != 'other':
+        book.format = meta['format']
+        fields.append('format')
+    if meta['pages'] and not book.pages:
+        book.pages = meta['pages']
+        fields.append('pages')
+    if meta['cover'] and not book.cover_image:
+        try:
+            kind = Image.open(BytesIO(meta['cover'])).format
+        except Exception:
+            kind = None
+        if kind in ('JPEG', 'PNG', 'GIF', 'WEBP'):
+            extension = 'jpg' if kind == 'JPEG' else kind.lower()
+            book.cover_image.save(f'{book.slug}.{extension}', ContentFile(meta['cover']), save=False)
+            fields.append('cover_image')
+    book.save(update_fields=fields)
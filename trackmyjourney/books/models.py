@@ -1,7 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from django.utils.text import slugify
+from core.counters import bump
+from core.slugs import save_with_unique_slug
 import os
 
 User = get_user_model()
@@ -60,6 +61,12 @@ class Book(models.Model):
     format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='pdf')
     language = models.CharField(max_length=10, choices=LANGUAGE_CHOICES, default='en')
     pages = models.PositiveIntegerField(blank=True, null=True)
+
+    # Filled in the background by books/metadata.py after each upload
+    file_size = models.PositiveBigIntegerField(default=0, editable=False)
+    title_hint = models.CharField(max_length=255, blank=True, editable=False)
+    author_hint = models.CharField(max_length=255, blank=True, editable=False)
+    metadata_extracted_at = models.DateTimeField(blank=True, null=True, editable=False)
     
     # Metadata
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='uploaded_books')
@@ -92,20 +99,18 @@ class Book(models.Model):
         return reverse('books:detail', kwargs={'slug': self.slug})
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(f"{self.title}-{self.author}")
-            original_slug = self.slug
-            counter = 1
-            while Book.objects.filter(slug=self.slug).exists():
-                self.slug = f"{original_slug}-{counter}"
-                counter += 1
-        super().save(*args, **kwargs)
-
-    @property
-    def file_size(self):
-        if self.file:
-            return self.file.size
-        return 0
+        if self.slug:
+            super().save(*args, **kwargs)
+        else:
+            save_with_unique_slug(self, f"{self.title}-{self.author}", super().save, *args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored file so signals only re-extract metadata when it changes
+        if 'file' in field_names:
+            instance._loaded_file = values[field_names.index('file')]
+        return instance
 
     @property
     def total_likes(self):
@@ -121,12 +126,12 @@ class Book(models.Model):
         if not ratings:
             return 0
         return sum(r.rating for r in ratings) / len(ratings)
-        self.downloads += 1
-        self.save(update_fields=['downloads'])
+
+    def increment_downloads(self):
+        bump(self, 'downloads')
 
     def increment_views(self):
-        self.views += 1
-        self.save(update_fields=['views'])
+        bump(self, 'views')
 
 class ReadingList(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reading_lists')
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import Book
+
+@receiver(post_save, sender=Book)
+def extract_metadata_on_upload(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and 'file' not in update_fields):
+        return
+    current = instance.file.name or ''
+    if not created and getattr(instance, '_loaded_file', None) == current:
+        return
+    instance._loaded_file = current
+
+    from .tasks import extract_book_metadata
+    extract_book_metadata.enqueue(instance.pk, unique_key=f'book:{instance.pk}')
@@ -0,0 +1,10 @@
+from jobs.registry import task
+from .metadata import update_book_metadata
+from .models import Book
+
+
+@task(queue='media', max_attempts=3)
+def extract_book_metadata(book_id):
+    book = Book.objects.filter(pk=book_id).first()
+    if book is not None:
+        update_book_metadata(book)
@@ -1,3 +1,199 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from core.slugs import allocate_slugs
+from jobs.models import Job
+from .importer import BookImporter, read_rows
+from .metadata import extract_metadata, update_book_metadata
+from .models import Book
+
+User = get_user_model()
+
+
+class AllocateSlugsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('importer', password='x')
+
+    def test_batch_slugs_are_unique_among_themselves_and_existing_rows(self):
+        Book.objects.create(title='Dune', author='Frank Herbert', description='', uploaded_by=self.user)
+        slugs = allocate_slugs(Book, ['Dune-Frank Herbert', 'Dune-Frank Herbert', 'Dune 1-Frank Herbert'])
+        self.assertEqual(slugs, ['dune-frank-herbert-1', 'dune-frank-herbert-2', 'dune-1-frank-herbert'])
+
+    def test_base_that_looks_like_a_suffix_is_skipped(self):
+        slugs = allocate_slugs(Book, ['Foo 1', 'Foo', 'Foo'])
+        self.assertEqual(slugs, ['foo-1', 'foo', 'foo-2'])
+
+    def test_long_bases_sharing_a_stem_get_distinct_suffixes(self):
+        max_length = Book._meta.get_field('slug').max_length
+        sources = ['x' * max_length] * 3 + ['x' * (max_length - 1) + 'y'] * 3
+        slugs = allocate_slugs(Book, sources)
+        self.assertEqual(len(set(slugs)), len(slugs))
+        self.assertTrue(all(len(slug) <= max_length for slug in slugs))
+
+
+class BookImporterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('importer', password='x')
+
+    def run_import(self, text, **kwargs):
+        rows = read_rows(io.BytesIO(text.encode()), 'csv')
+        return BookImporter(self.user, **kwargs).run(rows)
+
+    def test_identical_long_rows_import_in_batches(self):
+        title, author = 'T' * 200, 'A' * 200
+        csv = 'title,author,description\n' + f'{title},{author},same\n' * 12
+        # Every batch must go in with bulk_create, not the row-by-row fallback for slug races
+        with mock.patch.object(Book, 'save', side_effect=AssertionError('fell back to save()')):
+            result = self.run_import(csv, batch_size=5)
+
+        self.assertEqual((result.created, result.error_count), (12, 0))
+        slugs = list(Book.objects.values_list('slug', flat=True))
+        self.assertEqual(len(set(slugs)), 12)
+        self.assertTrue(all(len(slug) <= 200 for slug in slugs))
+
+    def test_duplicate_isbns_and_invalid_rows_are_reported(self):
+        csv = (
+            'title,author,description,isbn,is_public\n'
+            'One,Ann,d,9780306406157,yes\n'
+            'Two,Ann,d,978-0-306-40615-7,yes\n'
+            'Three,Ann,d,not-an-isbn,yes\n'
+            'Four,Ann,d,,maybe\n'
+        )
+        result = self.run_import(csv)
+        self.assertEqual((result.created, result.duplicates, result.error_count), (1, 1, 2))
+        self.assertEqual([line for line, message in result.errors], [4, 5])
+
+
+def jpeg_bytes(size):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 80, 40)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def pdf_bytes(pages, cover=None):
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [] /Count %d >>' % pages,
+        # An outline entry's /Title must not be taken for the book's
+        b'<< /Title (Chapter One) /Parent 5 0 R >>',
+        b'<< /Title <FEFF00C9006C00E9006D0065006E00740073> /Author (Ada \\(A.\\) Lovelace) >>',
+    ]
+    if cover is not None:
+        objects.append(
+            b'<< /Type /XObject /Subtype /Image /Filter /DCTDecode /Length %d >>\nstream\n' % len(cover)
+            + cover + b'\nendstream'
+        )
+    body = b''.join(b'%d 0 obj\n%s\nendobj\n' % (number, obj) for number, obj in enumerate(objects, 1))
+    return b'%PDF-1.4\n' + body + b'trailer\n<< /Root 1 0 R /Info 4 0 R >>\n%%EOF\n'
+
+
+def epub_bytes(characters, cover=None):
+    manifest = '<item id="ch1" href="text/ch1.xhtml" media-type="application/xhtml+xml"/>'
+    if cover is not None:
+        manifest += '<item id="cov" href="images/cover.jpg" media-type="image/jpeg" properties="cover-image"/>'
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('mimetype', 'application/epub+zip', compress_type=zipfile.ZIP_STORED)
+        archive.writestr('META-INF/container.xml', (
+            '<container xmlns="urn:oasis:names:tc:opendocument:xmlns:container" version="1.0"><rootfiles>'
+            '<rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>'
+            '</rootfiles></container>'
+        ))
+        archive.writestr('OEBPS/content.opf', (
+            '<package xmlns="http://www.idpf.org/2007/opf" version="3.0">'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            '<dc:title>The Epub</dc:title><dc:creator>E. Author</dc:creator></metadata>'
+            f'<manifest>{manifest}</manifest><spine><itemref idref="ch1"/></spine></package>'
+        ))
+        archive.writestr('OEBPS/text/ch1.xhtml', f'<html><body><p>{"x" * characters}</p></body></html>')
+        if cover is not None:
+            archive.writestr('OEBPS/images/cover.jpg', cover)
+    return buffer.getvalue()
+
+
+class BookMetadataTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('uploader', password='x')
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def extract(self, data):
+        return extract_metadata(io.BytesIO(data), len(data))
+
+    def book(self, data, name, **fields):
+        book = Book(title='Uploaded', author='Someone', description='d', uploaded_by=self.user, **fields)
+        book.file.save(name, ContentFile(data))
+        return book
+
+    def test_pdf_pages_info_and_cover(self):
+        cover = jpeg_bytes((300, 450))
+        meta = self.extract(pdf_bytes(212, cover))
+        self.assertEqual(
+            (meta['format'], meta['pages'], meta['title'], meta['author']),
+            ('pdf', 212, 'Éléments', 'Ada (A.) Lovelace'),
+        )
+        self.assertEqual(meta['cover'], cover)
+        self.assertIsNone(self.extract(pdf_bytes(3, jpeg_bytes((40, 60))))['cover'])
+
+    def test_epub_metadata_cover_and_page_estimate(self):
+        cover = jpeg_bytes((300, 450))
+        meta = self.extract(epub_bytes(3 * 1800 + 1, cover))
+        self.assertEqual(
+            (meta['format'], meta['pages'], meta['title'], meta['author']),
+            ('epub', 4, 'The Epub', 'E. Author'),
+        )
+        self.assertEqual(meta['cover'], cover)
+
+    def test_text_headers_and_word_count(self):
+        text = 'Title: Plain Words\nAuthor: T. Writer\n\n' + 'word ' * 301
+        meta = self.extract(text.encode())
+        self.assertEqual(
+            (meta['format'], meta['pages'], meta['title'], meta['author']),
+            ('txt', 2, 'Plain Words', 'T. Writer'),
+        )
+        self.assertEqual(self.extract(b'First line\nrest')['title'], 'First line')
+
+    def test_unknown_files_yield_no_hints(self):
+        meta = self.extract(b'\x00\x01binary' * 100)
+        self.assertEqual((meta['format'], meta['pages'], meta['title'], meta['cover']), ('other', None, '', None))
+
+    def test_extraction_fills_the_book_without_overwriting_manual_values(self):
+        book = self.book(pdf_bytes(212, jpeg_bytes((300, 450))), 'scan.pdf', pages=180)
+        book.save()
+        update_book_metadata(book)
+
+        book.refresh_from_db()
+        self.assertEqual((book.format, book.pages), ('pdf', 180))
+        self.assertEqual((book.title_hint, book.author_hint), ('Éléments', 'Ada (A.) Lovelace'))
+        self.assertTrue(book.cover_image.name.endswith('.jpg'))
+        self.assertIsNotNone(book.metadata_extracted_at)
+
+    def test_a_new_file_queues_one_extraction(self):
+        book = self.book(b'Title: Queued\n', 'queued.txt')
+        book.save()
+        book.save()
+        book.description = 'edited'
+        book.save()
+        jobs = Job.objects.filter(name='books.tasks.extract_book_metadata')
+        self.assertEqual(list(jobs.values_list('args', 'unique_key')), [([book.pk], f'book:{book.pk}')])
+
+        jobs.update(status='done')
+        book.file.save('replaced.txt', ContentFile(b'Title: Replaced\n'))
+        self.assertEqual(jobs.filter(status='queued').count(), 1)
@@ -1,4 +1,5 @@
 from django.urls import path
+from core.asyncviews import served
 from . import views
 
 app_name = 'books'
@@ -22,5 +23,5 @@ urlpatterns = [
     path('<slug:slug>/', views.BookDetailView.as_view(), name='detail'),
     
     # Root path last
-    path('', views.BookListView.as_view(), name='list'),
+    path('', served(views.BookListView.as_view(), views.AsyncBookListView.as_view()), name='list'),
 ]
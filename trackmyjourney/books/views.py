@@ -1,11 +1,16 @@
+import asyncio
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
-from django.http import HttpResponse, Http404, JsonResponse
-from django.db.models import Q
+from django.http import FileResponse, Http404, JsonResponse
+from django.db.models import Max, Q, Sum
+from core.asyncviews import alist, apaginate, aresolve_user, page_context
+from core.conditional import ConditionalDetailMixin, related_aggregate
+from core.metrics import DOWNLOAD_BYTES
 from .models import Book, BookCategory, ReadingList, BookRating
 from .forms import BookForm, BookRatingForm
 
@@ -49,6 +54,24 @@ class BookListView(ListView):
         context['search_query'] = self.request.GET.get('search', '')
         return context
 
+class AsyncBookListView(BookListView):
+    async def get(self, request, *args, **kwargs):
+        await aresolve_user(request)
+        page, categories = await asyncio.gather(
+            apaginate(self.get_queryset(), self.paginate_by, request.GET.get('page'), strict=True),
+            alist(BookCategory.objects.all()),
+        )
+        self.object_list = page.object_list
+        return self.render_to_response({
+            **page_context(page, self.context_object_name),
+            'view': self,
+            'categories': categories,
+            'formats': Book.FORMAT_CHOICES,
+            'current_category': request.GET.get('category', ''),
+            'current_format': request.GET.get('format', ''),
+            'search_query': request.GET.get('search', ''),
+        })
+
 class BookCategoryListView(ListView):
     model = BookCategory
     template_name = 'books/category_list.html'
@@ -64,15 +87,26 @@ class BookCategoryDetailView(DetailView):
         context['books'] = self.object.books.filter(is_public=True)
         return context
 
-class BookDetailView(DetailView):
+class BookDetailView(ConditionalDetailMixin, DetailView):
     model = Book
     template_name = 'books/book_detail.html'
     context_object_name = 'book'
 
-    def get_object(self):
-        obj = super().get_object()
-        obj.increment_views()
-        return obj
+    def get_versions(self):
+        versions = {
+            'ratings': related_aggregate(BookRating.objects.all(), 'book'),
+            'rating_total': related_aggregate(BookRating.objects.all(), 'book', Sum('rating')),
+            'likes': related_aggregate(Book.likes.through.objects.all(), 'book'),
+            'bookmarks': related_aggregate(Book.bookmarks.through.objects.all(), 'book'),
+        }
+        if self.request.user.is_authenticated:
+            versions['reading_list'] = related_aggregate(
+                ReadingList.objects.filter(user=self.request.user), 'book', Max('updated_at')
+            )
+        return versions
+
+    def count_view(self):
+        self.object.increment_views()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -91,6 +125,11 @@ class BookCreateView(LoginRequiredMixin, CreateView):
     form_class = BookForm
     template_name = 'books/book_form.html'
 
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+
     def form_valid(self, form):
         form.instance.uploaded_by = self.request.user
         messages.success(self.request, 'Book uploaded successfully!')
@@ -101,6 +140,11 @@ class BookUpdateView(LoginRequiredMixin, UpdateView):
     form_class = BookForm
     template_name = 'books/book_form.html'
 
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+
     def get_queryset(self):
         return Book.objects.filter(uploaded_by=self.request.user)
 
@@ -149,7 +193,8 @@ def download_book(request, slug):
     
     if book.file:
         book.increment_downloads()
-        response = HttpResponse(book.file.read(), content_type='application/octet-stream')
+        DOWNLOAD_BYTES.inc(book.file.size, kind='book')
+        response = FileResponse(book.file.open('rb'), content_type='application/octet-stream')
         response['Content-Disposition'] = f'attachment; filename="{book.file.name}"'
         return response
     else:
@@ -2,6 +2,7 @@ from django.db import models
 from django.conf import settings
 from django.urls import reverse
 from django.utils import timezone
+from core.models import ThreadedComment
 
 class Community(models.Model):
     CATEGORY_CHOICES = [
@@ -104,7 +105,7 @@ class PostLike(models.Model):
     class Meta:
         unique_together = ('user', 'post')
 
-class Comment(models.Model):
+class Comment(ThreadedComment):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='community_comments')
     content = models.TextField()
@@ -113,6 +114,9 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['post', 'path']),
+        ]
     
     def __str__(self):
         return f'Comment by {self.author.username} on {self.post.title}'
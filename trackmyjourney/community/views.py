@@ -1,12 +1,18 @@
+import asyncio
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse
+from django.template.response import TemplateResponse
 from django.views.decorators.http import require_POST
 from django.db.models import Q, Count
 from django.core.paginator import Paginator
 from django.views.generic import ListView, DetailView
+from core.asyncviews import alist, apaginate, aresolve_user
 from .models import Community, Post, CommunityMembership, PostLike
+# ``Post`` is rebound to the blog's model below
+from .models import Post as CommunityPost
 from .forms import PostForm, CommunityForm
 from blog.models import BlogPost as Post
   # Assuming you have a blog app
@@ -66,7 +72,7 @@ def community_detail(request, pk):
     posts_page = paginator.get_page(page_number)
     
     # Get recent members
-    recent_members = community.members.order_by('-communitymembership__joined_at')[:10]
+    recent_members = community.members.order_by('-community_memberships__joined_at')[:10]
     
     # Add user interaction data to posts
     if request.user.is_authenticated:
@@ -86,6 +92,60 @@ def community_detail(request, pk):
     
     return render(request, 'community/community_detail.html', context)
 
+async def community_detail_async(request, pk):
+    """``community_detail`` for ASGI: independent queries run through the async ORM together."""
+    try:
+        community = await Community.objects.aget(pk=pk)
+    except Community.DoesNotExist:
+        raise Http404('No Community matches the given query.')
+    user = await aresolve_user(request)
+
+    search_query = request.GET.get('search', '')
+    posts = community.posts.select_related('author').prefetch_related('likes', 'comments')
+    if search_query:
+        posts = posts.filter(
+            Q(title__icontains=search_query) | Q(content__icontains=search_query)
+        )
+
+    membership = None
+    lookups = [
+        apaginate(posts, 10, request.GET.get('page')),
+        alist(community.members.order_by('-community_memberships__joined_at')[:10]),
+    ]
+    if user.is_authenticated:
+        lookups.append(CommunityMembership.objects.filter(user=user, community=community).afirst())
+        posts_page, recent_members, membership = await asyncio.gather(*lookups)
+    else:
+        posts_page, recent_members = await asyncio.gather(*lookups)
+
+    # One query each for the viewer's likes and bookmarks on the page, not two per post
+    if user.is_authenticated:
+        page_posts = posts_page.object_list
+        liked, bookmarked = await asyncio.gather(
+            alist(PostLike.objects.filter(user=user, post__in=page_posts).values_list('post_id', flat=True)),
+            alist(
+                CommunityPost.bookmarks.through.objects.filter(user=user, post__in=page_posts)
+                .values_list('post_id', flat=True)
+            ),
+        )
+        liked, bookmarked = set(liked), set(bookmarked)
+        for post in page_posts:
+            post.is_liked = post.pk in liked
+            post.is_bookmarked = post.pk in bookmarked
+
+    is_member = membership is not None
+    context = {
+        'community': community,
+        'posts': posts_page,
+        'recent_members': recent_members,
+        'is_member': is_member,
+        'is_moderator': membership.is_moderator if membership else False,
+        'search_query': search_query,
+        'post_form': PostForm() if is_member else None,
+    }
+
+    return TemplateResponse(request, 'community/community_detail.html', context)
+
 @login_required
 @require_POST
 def join_community(request, pk):
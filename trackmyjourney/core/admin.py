@@ -0,0 +1,68 @@
+from django.contrib import admin
+from django.forms.models import BaseInlineFormSet
+
+from .models import Blob, ImageDerivatives, SlowQuery
+from .paginator import EstimatedCountPaginator
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist for tables too big to count: estimated page count and no second COUNT(*) for the unfiltered total."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class LatestInlineFormSet(BaseInlineFormSet):
+    max_shown = 20
+
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            self._queryset = super().get_queryset().order_by('-pk')[:self.max_shown]
+        return self._queryset
+
+
+class LatestInline(admin.TabularInline):
+    """
+    Inline that edits only the newest ``max_shown`` related rows.
+
+    A post with thousands of comments would otherwise render thousands of
+    forms; older rows stay reachable from their own changelist.
+    """
+    formset = LatestInlineFormSet
+    max_shown = 20
+    extra = 0
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.max_shown = self.max_shown
+        return formset
+
+@admin.register(ImageDerivatives)
+class ImageDerivativesAdmin(admin.ModelAdmin):
+    list_display = ('source', 'digest', 'created_at')
+    search_fields = ('source',)
+    readonly_fields = ('source', 'digest', 'renditions', 'created_at')
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ('digest', 'size', 'refcount', 'created_at')
+    search_fields = ('digest', 'files__name')
+    readonly_fields = ('digest', 'size', 'refcount', 'created_at')
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    """The query shapes costing the database the most time, worst first."""
+    list_display = ('__str__', 'calls', 'total_ms', 'mean', 'max_ms', 'view', 'call_site', 'template', 'last_seen')
+    list_filter = ('view',)
+    search_fields = ('fingerprint', 'view', 'call_site', 'template')
+    ordering = ('-total_ms',)
+    readonly_fields = [f.name for f in SlowQuery._meta.fields]
+
+    @admin.display(description='Mean ms', ordering='total_ms')
+    def mean(self, obj):
+        return f'{obj.mean_ms:.1f}'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
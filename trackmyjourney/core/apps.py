@@ -0,0 +1,22 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core'
+
+    def ready(self):
+        from django.core.signals import request_finished
+        from django.db.backends.signals import connection_created
+
+        from . import metrics, querylog
+        from .images import connect_image_signals
+        from .storage import connect_file_signals
+        from .threads import connect_thread_signals
+        connect_thread_signals()
+        connect_image_signals()
+        connect_file_signals()
+        connection_created.connect(querylog.install, dispatch_uid='slow_query_log')
+        request_finished.connect(querylog.maybe_flush, dispatch_uid='slow_query_log_flush')
+        connection_created.connect(metrics.install, dispatch_uid='metrics_query_count')
+        request_finished.connect(metrics.maybe_dump, dispatch_uid='metrics_dump')
@@ -0,0 +1,56 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import InvalidPage, Paginator
+from django.http import Http404
+
+
+def served(sync_view, async_view):
+    """The view to route to: ``async_view`` when the project runs under ASGI (ASYNC_VIEWS), else ``sync_view``."""
+    return async_view if settings.ASYNC_VIEWS else sync_view
+
+
+async def alist(queryset):
+    """Evaluate ``queryset`` through the async ORM."""
+    return [obj async for obj in queryset]
+
+
+async def aresolve_user(request):
+    """
+    Load ``request.user`` (a session and a user query) off the event loop.
+
+    It is lazy and would otherwise be loaded on first use, which raises
+    SynchronousOnlyOperation inside an async view.
+    """
+    await sync_to_async(lambda: request.user.is_authenticated)()
+    return request.user
+
+
+async def apaginate(queryset, per_page, page_number, strict=False):
+    """
+    Async ``Paginator.get_page``: the COUNT and the page's rows go through the async ORM.
+
+    With ``strict`` a bad page number is a 404, as in ListView, rather than
+    falling back to the first or last page.
+    """
+    paginator = Paginator(queryset, per_page)
+    paginator.count = await queryset.acount()
+    if strict:
+        try:
+            page = paginator.page(paginator.num_pages if page_number == 'last' else page_number or 1)
+        except InvalidPage as e:
+            raise Http404(f'Invalid page ({page_number}): {e}')
+    else:
+        page = paginator.get_page(page_number)
+    page.object_list = await alist(page.object_list)
+    return page
+
+
+def page_context(page, context_object_name):
+    """The pagination entries a ListView adds to its context."""
+    return {
+        'paginator': page.paginator,
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
+        'object_list': page.object_list,
+        context_object_name: page.object_list,
+    }
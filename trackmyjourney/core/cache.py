@@ -0,0 +1,29 @@
+from django.core.cache.backends import filebased, locmem
+
+from .metrics import CACHE_REQUESTS
+
+_MISSING = object()
+
+
+def namespace(key):
+    """The part of a cache key naming what is cached, for metric labels ("auth", "image-derivatives", "sessions")."""
+    if key.startswith('django.contrib.sessions'):
+        return 'sessions'
+    return key.split(':', 1)[0] if ':' in key else 'other'
+
+
+class HitCountingMixin:
+    """Counts every ``get`` (``get_many`` goes through it) as a hit or a miss in cache_requests_total."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        CACHE_REQUESTS.inc(namespace=namespace(key), result='miss' if value is _MISSING else 'hit')
+        return default if value is _MISSING else value
+
+
+class LocMemCache(HitCountingMixin, locmem.LocMemCache):
+    pass
+
+
+class FileBasedCache(HitCountingMixin, filebased.FileBasedCache):
+    pass
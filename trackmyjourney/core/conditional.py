@@ -0,0 +1,143 @@
+import datetime
+import functools
+import hashlib
+import os
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db.models import Count, OuterRef, Subquery
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .asyncviews import aresolve_user
+
+
+def related_aggregate(queryset, parent_field, aggregate=None):
+    """
+    Subquery computing ``aggregate`` (default: a row count) over the rows of
+    ``queryset`` that belong to the outer object through ``parent_field``.
+    """
+    aggregate = aggregate or Count('pk')
+    rows = queryset.filter(**{parent_field: OuterRef('pk')}).order_by().values(parent_field)
+    return Subquery(rows.annotate(value=aggregate).values('value')[:1])
+
+
+@functools.lru_cache(maxsize=None)
+def templates_version():
+    """Newest template mtime, so a deploy that changes markup also changes every ETag."""
+    from django.template.utils import get_app_template_dirs
+
+    directories = [d for engine in settings.TEMPLATES for d in engine.get('DIRS', [])]
+    directories += get_app_template_dirs('templates')
+    newest = 0
+    for directory in directories:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                newest = max(newest, os.path.getmtime(os.path.join(root, name)))
+    return newest
+
+
+class ConditionalDetailMixin:
+    """
+    Answer ``If-None-Match`` / ``If-Modified-Since`` on a DetailView with a 304 before rendering.
+
+    The validators come from the object's ``updated_at`` plus whatever
+    ``get_versions()`` returns: expressions (usually ``related_aggregate``
+    counts and timestamps) evaluated on the object's row in one query.
+    The viewer and their CSRF secret are part of the ETag because the page
+    differs per user.
+    """
+    updated_field = 'updated_at'
+
+    def get_versions(self):
+        return {}
+
+    def count_view(self):
+        pass
+
+    def get_versions_query(self):
+        """The one-row query evaluating ``get_versions()`` for the object, or None if there are none."""
+        versions = self.get_versions()
+        if not versions:
+            return None
+        return (
+            type(self.object)._default_manager.filter(pk=self.object.pk)
+            .annotate(**{f'version_{name}': expression for name, expression in versions.items()})
+            .values(*(f'version_{name}' for name in versions))
+        )
+
+    def get_validators(self):
+        query = self.get_versions_query()
+        return self.make_validators((query.first() if query is not None else None) or {})
+
+    def make_validators(self, row):
+        obj = self.object
+        updated = getattr(obj, self.updated_field)
+        last_modified = max([updated] + [value for value in row.values() if isinstance(value, datetime.datetime)])
+        user = self.request.user
+        # Forms on the page embed a token derived from the CSRF secret; get_token() creates it if missing
+        get_token(self.request)
+        parts = [
+            obj._meta.label, obj.pk, updated.isoformat(), sorted(row.items()),
+            user.pk if user.is_authenticated else None,
+            self.request.META['CSRF_COOKIE'],
+            templates_version(),
+        ]
+        etag = '"%s"' % hashlib.md5(repr(parts).encode()).hexdigest()
+        return etag, last_modified
+
+    def get_not_modified(self, etag, last_modified):
+        """A 304 if the client's copy is current, else None."""
+        # Flash messages are shown once, so a page carrying them is always rendered
+        if len(get_messages(self.request)):
+            return None
+        return get_conditional_response(self.request, etag=etag, last_modified=int(last_modified.timestamp()))
+
+    def finalize_response(self, response, etag, last_modified):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+        patch_vary_headers(response, ['Cookie'])
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        etag, last_modified = self.get_validators()
+        self.count_view()
+
+        response = self.get_not_modified(etag, last_modified)
+        if response is None:
+            context = self.get_context_data(object=self.object)
+            response = self.render_to_response(context)
+        return self.finalize_response(response, etag, last_modified)
+
+
+class AsyncConditionalDetailMixin(ConditionalDetailMixin):
+    """
+    ``ConditionalDetailMixin`` as an async view, for ASGI.
+
+    The validators row goes through the async ORM. Subclasses override
+    ``aget_object`` and ``aget_context_data`` to load their data the same
+    way. The template is rendered by the handler, in a worker thread.
+    """
+
+    async def aget_object(self):
+        return await sync_to_async(self.get_object)()
+
+    async def aget_context_data(self, **kwargs):
+        return await sync_to_async(self.get_context_data)(**kwargs)
+
+    async def get(self, request, *args, **kwargs):
+        await aresolve_user(request)
+        self.object = await self.aget_object()
+        query = self.get_versions_query()
+        etag, last_modified = self.make_validators((await query.afirst() if query is not None else None) or {})
+        await sync_to_async(self.count_view)()
+
+        response = await sync_to_async(self.get_not_modified)(etag, last_modified)
+        if response is None:
+            context = await self.aget_context_data(object=self.object)
+            response = self.render_to_response(context)
+        return self.finalize_response(response, etag, last_modified)
@@ -0,0 +1,104 @@
+import atexit
+import logging
+import threading
+from collections import Counter
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+# Buffered increments are written this many seconds after the first one comes in
+# (by a background timer, so quiet processes don't sit on them), or sooner once
+# this many rows are pending
+FLUSH_INTERVAL = getattr(settings, 'COUNTER_FLUSH_INTERVAL', 10)
+FLUSH_MAX_PENDING = getattr(settings, 'COUNTER_FLUSH_MAX_PENDING', 500)
+
+_pending = Counter()
+_lock = threading.Lock()
+_timer = None
+
+
+def bump(instance, field, amount=1):
+    """
+    Count ``amount`` more ``field`` (e.g. views) for ``instance`` without writing on every request.
+
+    Increments are summed in memory and applied with one ``F()`` UPDATE per
+    row when the buffer is flushed. ``updated_at`` is left alone, so page
+    validators don't change just because someone looked at the page.
+    """
+    with _lock:
+        _pending[(instance._meta.label, instance.pk, field)] += amount
+        _schedule_flush()
+        due = len(_pending) >= FLUSH_MAX_PENDING
+    if due:
+        try:
+            flush()
+        except DatabaseError:
+            # The increments stay buffered for the next flush; the page being served must not break
+            logger.exception('Could not flush buffered counters')
+
+
+def _schedule_flush():
+    """Start the timer that flushes the buffer FLUSH_INTERVAL from now; call with ``_lock`` held."""
+    global _timer
+    if _timer is None:
+        _timer = threading.Timer(FLUSH_INTERVAL, _flush_in_background)
+        _timer.daemon = True
+        _timer.start()
+
+
+def _flush_in_background():
+    global _timer
+    with _lock:
+        _timer = None
+    try:
+        if _pending:
+            flush()
+    except DatabaseError:
+        logger.exception('Could not flush buffered counters')
+    finally:
+        # The timer thread's connection would otherwise stay open until the process exits
+        connections.close_all()
+
+
+def _restore(groups):
+    """Put the increments of ``groups`` that were not written back in the buffer, to go with the next flush."""
+    with _lock:
+        for (label, field, amount), pks in groups:
+            for pk in pks:
+                _pending[(label, pk, field)] += amount
+        _schedule_flush()
+
+
+def discard():
+    """Forget every buffered increment, e.g. those counted by requests that were rolled back."""
+    with _lock:
+        _pending.clear()
+
+
+def flush():
+    """Write every buffered increment; returns the number of rows updated."""
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+
+    # Rows with the same increment share one UPDATE
+    grouped = {}
+    for (label, pk, field), amount in pending.items():
+        grouped.setdefault((label, field, amount), []).append(pk)
+    groups = list(grouped.items())
+    updated = 0
+    for done, ((label, field, amount), pks) in enumerate(groups):
+        model = apps.get_model(label)
+        try:
+            updated += model._default_manager.filter(pk__in=pks).update(**{field: F(field) + amount})
+        except DatabaseError:
+            _restore(groups[done:])
+            raise
+    return updated
+
+
+atexit.register(flush)
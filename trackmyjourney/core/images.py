@@ -0,0 +1,177 @@
+import hashlib
+import os
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+# Every upload gets each rendition as WebP plus a JPEG (or PNG when the
+# image has transparency) fallback for browsers without WebP.
+RENDITIONS = {
+    'thumb': {'width': 160, 'crop': True},
+    'card': {'width': 480, 'crop': False},
+    'full': {'width': 1280, 'crop': False},
+}
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+# (app_label.Model, field) pairs whose uploads get derivatives
+IMAGE_FIELDS = [
+    ('accounts.User', 'avatar'),
+    ('books.Book', 'cover_image'),
+    ('blog.BlogPost', 'featured_image'),
+    ('resources.Resource', 'thumbnail'),
+    ('groups.Group', 'cover_image'),
+    ('groups.Group', 'logo'),
+    ('groups.GroupPost', 'image'),
+    ('community.Community', 'banner'),
+    ('community.Community', 'logo'),
+    ('achievements.Achievement', 'image'),
+]
+
+MANIFEST_CACHE_TIMEOUT = 60 * 60
+MISSING_CACHE_TIMEOUT = 60
+
+
+def _resize(image, spec):
+    from PIL import Image, ImageOps
+
+    width = spec['width']
+    if spec['crop']:
+        side = min(width, image.width, image.height)
+        return ImageOps.fit(image, (side, side), Image.LANCZOS)
+    if image.width <= width:
+        return image.copy()
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def _encode(image, fmt):
+    buffer = BytesIO()
+    if fmt == 'WEBP':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    elif fmt == 'PNG':
+        image.save(buffer, 'PNG', optimize=True)
+    else:
+        image.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def generate_derivatives(name, storage=default_storage):
+    """
+    Build every rendition of the stored image ``name`` and record them.
+
+    Files are named ``<stem>.<digest>.<rendition>.<ext>`` beside the
+    original, so regenerating unchanged content is a no-op and the URLs
+    can be cached forever.
+    """
+    from PIL import Image, ImageOps, features
+    from .models import ImageDerivatives
+
+    with storage.open(name, 'rb') as source:
+        data = source.read()
+    digest = hashlib.sha256(data).hexdigest()
+    manifest = ImageDerivatives.objects.filter(source=name).first()
+    if manifest is not None and manifest.digest == digest:
+        return manifest
+
+    image = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+    fallback = 'PNG' if has_alpha else 'JPEG'
+    formats = (['WEBP'] if features.check('webp') else []) + [fallback]
+
+    stem = os.path.splitext(name)[0]
+    renditions = {}
+    for rendition, spec in RENDITIONS.items():
+        resized = _resize(image, spec)
+        entry = {'width': resized.width, 'height': resized.height}
+        for fmt in formats:
+            ext = {'WEBP': 'webp', 'PNG': 'png', 'JPEG': 'jpg'}[fmt]
+            derived = f'{stem}.{digest[:12]}.{rendition}.{ext}'
+            if not storage.exists(derived):
+                derived = storage.save(derived, ContentFile(_encode(resized, fmt)))
+            entry['webp' if fmt == 'WEBP' else 'fallback'] = derived
+        renditions[rendition] = entry
+
+    manifest, _ = ImageDerivatives.objects.update_or_create(
+        source=name, defaults={'digest': digest, 'renditions': renditions}
+    )
+    cache.delete(_cache_key(name))
+    return manifest
+
+
+def release_derivatives(name, storage=default_storage):
+    """Delete the renditions generated for ``name`` and their manifest, once the source itself is gone."""
+    from .models import ImageDerivatives
+
+    manifest = ImageDerivatives.objects.filter(source=name).first()
+    if manifest is None:
+        return
+    for entry in manifest.renditions.values():
+        for derived in (entry.get('webp'), entry.get('fallback')):
+            if derived:
+                storage.delete(derived)
+    manifest.delete()
+    cache.delete(_cache_key(name))
+
+
+def _cache_key(name):
+    return 'image-derivatives:' + hashlib.md5(name.encode()).hexdigest()
+
+
+def get_renditions(name):
+    """Rendition map for a stored image, or ``{}`` while derivatives are not generated yet."""
+    if not name:
+        return {}
+    key = _cache_key(name)
+    renditions = cache.get(key)
+    if renditions is None:
+        from .models import ImageDerivatives
+        renditions = (
+            ImageDerivatives.objects.filter(source=name).values_list('renditions', flat=True).first() or {}
+        )
+        cache.set(key, renditions, MANIFEST_CACHE_TIMEOUT if renditions else MISSING_CACHE_TIMEOUT)
+    return renditions
+
+
+def prefetch_renditions(names):
+    """Warm the manifest cache for many images with one query (for list pages)."""
+    from .models import ImageDerivatives
+
+    keys = {_cache_key(name): name for name in names if name}
+    cached = cache.get_many(list(keys))
+    missing = [name for key, name in keys.items() if key not in cached]
+    if not missing:
+        return
+    found = dict(ImageDerivatives.objects.filter(source__in=missing).values_list('source', 'renditions'))
+    cache.set_many({_cache_key(name): found[name] for name in found}, MANIFEST_CACHE_TIMEOUT)
+    cache.set_many({_cache_key(name): {} for name in missing if name not in found}, MISSING_CACHE_TIMEOUT)
+
+
+def _queue_derivatives(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    for field_name in sender._image_derivative_fields:
+        if update_fields is not None and field_name not in update_fields:
+            continue
+        name = getattr(instance, field_name).name
+        if not name:
+            continue
+        from .models import ImageDerivatives
+        if ImageDerivatives.objects.filter(source=name).exists():
+            continue
+        from .tasks import build_image_derivatives
+        build_image_derivatives.enqueue(name, unique_key=name[:200])
+
+
+def connect_image_signals():
+    from django.apps import apps
+    from django.db.models.signals import post_save
+
+    for label, field_name in IMAGE_FIELDS:
+        model = apps.get_model(label)
+        fields = model.__dict__.get('_image_derivative_fields', ())
+        model._image_derivative_fields = tuple(fields) + (field_name,)
+        post_save.connect(_queue_derivatives, sender=model, dispatch_uid=f'image_derivatives_{label}')
@@ -0,0 +1,134 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from blog.models import BlogPost
+from community.models import Community
+
+WARMUP_REQUESTS = 5
+
+
+def benchmark_pages():
+    pages = [
+        ('home', reverse('homepage:home')),
+        ('blog list', reverse('blog:list')),
+        ('public achievements', reverse('achievements:public')),
+        ('book list', reverse('books:list')),
+    ]
+    post = BlogPost.objects.filter(status='published').order_by('pk').first()
+    if post:
+        pages.append(('blog detail', reverse('blog:detail', args=[post.slug])))
+    community = Community.objects.order_by('pk').first()
+    if community:
+        pages.append(('community detail', reverse('community:detail', args=[community.pk])))
+    return pages
+
+
+def summarize(latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'rps': len(latencies) / elapsed,
+        'mean_ms': statistics.mean(latencies) * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare throughput of the read-heavy pages served over WSGI (sync views) and ASGI (async views)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per page')
+        parser.add_argument('--concurrency', type=int, default=10, help='Requests in flight at once')
+        # Set on the child processes: the URLconf picks sync or async views at import time
+        parser.add_argument('--mode', choices=['wsgi', 'asgi'], help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['mode']:
+            self.stdout.write(json.dumps(self.run_mode(options['mode'], options['requests'], options['concurrency'])))
+            return
+
+        results = {}
+        for mode in ('wsgi', 'asgi'):
+            completed = subprocess.run(
+                [
+                    sys.executable, '-m', 'django', 'benchmark_asgi', '--mode', mode,
+                    '--requests', str(options['requests']), '--concurrency', str(options['concurrency']),
+                ],
+                cwd=settings.BASE_DIR,
+                env={**os.environ, 'DJANGO_ASYNC_VIEWS': '1' if mode == 'asgi' else '0'},
+                capture_output=True,
+                text=True,
+            )
+            if completed.returncode:
+                raise CommandError(f'{mode} run failed:\n{completed.stderr}')
+            results[mode] = json.loads(completed.stdout.strip().splitlines()[-1])
+
+        self.stdout.write(
+            f"{options['requests']} requests per page, {options['concurrency']} concurrent, in-process handlers"
+        )
+        self.stdout.write(f"{'page':<22}{'WSGI req/s':>12}{'ASGI req/s':>12}{'WSGI p95':>11}{'ASGI p95':>11}")
+        for name, wsgi in results['wsgi'].items():
+            asgi = results['asgi'][name]
+            self.stdout.write(
+                f"{name:<22}{wsgi['rps']:>12.1f}{asgi['rps']:>12.1f}"
+                f"{wsgi['p95_ms']:>9.1f}ms{asgi['p95_ms']:>9.1f}ms"
+            )
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
+
+    def run_mode(self, mode, total, concurrency):
+        if settings.ASYNC_VIEWS != (mode == 'asgi'):
+            raise CommandError('Run without --mode; the benchmark starts its own WSGI and ASGI processes.')
+        results = {}
+        for name, url in benchmark_pages():
+            if mode == 'asgi':
+                results[name] = asyncio.run(self.run_asgi(url, total, concurrency))
+            else:
+                results[name] = self.run_wsgi(url, total, concurrency)
+        return results
+
+    def run_wsgi(self, url, total, concurrency):
+        local = threading.local()
+
+        def fetch(_):
+            if not hasattr(local, 'client'):
+                local.client = Client()
+            started = time.perf_counter()
+            response = local.client.get(url)
+            if response.status_code != 200:
+                raise CommandError(f'GET {url} returned {response.status_code}')
+            return time.perf_counter() - started
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(fetch, range(WARMUP_REQUESTS)))
+            started = time.perf_counter()
+            latencies = list(pool.map(fetch, range(total)))
+            return summarize(latencies, time.perf_counter() - started)
+
+    async def run_asgi(self, url, total, concurrency):
+        client = AsyncClient()
+        slots = asyncio.Semaphore(concurrency)
+
+        async def fetch():
+            async with slots:
+                started = time.perf_counter()
+                response = await client.get(url)
+                if response.status_code != 200:
+                    raise CommandError(f'GET {url} returned {response.status_code}')
+                return time.perf_counter() - started
+
+        await asyncio.gather(*(fetch() for _ in range(WARMUP_REQUESTS)))
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(fetch() for _ in range(total)))
+        return summarize(latencies, time.perf_counter() - started)
@@ -0,0 +1,82 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from core.models import Blob, StoredFile
+from core.storage import DedupStorage, dedup_stats, hash_file
+
+
+class Command(BaseCommand):
+    help = 'Move existing media files into content-addressed blobs, hard-linking duplicates to one copy'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many bytes would be saved')
+        parser.add_argument('--stats', action='store_true', help='Print current dedup statistics and exit')
+
+    def handle(self, *args, **options):
+        storage = default_storage
+        if not isinstance(storage, DedupStorage):
+            raise CommandError('The default storage is not core.storage.DedupStorage; check STORAGES.')
+        if options['stats']:
+            self.report(dedup_stats())
+            return
+
+        tracked = dict(StoredFile.objects.values_list('name', 'blob__digest'))
+        seen = {}
+        walked = set()
+        files = saved = 0
+        for root, dirs, names in os.walk(storage.location):
+            # Skip the blob store and other hidden/temporary directories
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
+            for filename in names:
+                full_path = os.path.join(root, filename)
+                if filename.startswith('.') or os.path.islink(full_path) or not os.path.isfile(full_path):
+                    continue
+                name = os.path.relpath(full_path, storage.location).replace('\\', '/')
+                walked.add(name)
+                digest = hash_file(full_path)
+                size = os.path.getsize(full_path)
+                files += 1
+                blob = storage.blob_path(digest)
+                if name in tracked and tracked[name] == digest and os.path.exists(blob) \
+                        and os.path.samefile(blob, full_path):
+                    continue
+                if digest in seen or os.path.exists(blob):
+                    saved += size
+                seen[digest] = True
+                if options['dry_run']:
+                    continue
+
+                if not os.path.exists(blob):
+                    os.makedirs(os.path.dirname(blob), exist_ok=True)
+                    os.link(full_path, blob)
+                elif not os.path.samefile(blob, full_path):
+                    # Swap in a link to the blob atomically so the file never disappears
+                    staged = full_path + '.dedup'
+                    os.link(blob, staged)
+                    os.replace(staged, full_path)
+                storage.add_reference(name, digest, size)
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Scanned {files} files; deduplicating would save {saved} bytes'))
+            return
+
+        # Forget names removed outside the storage API and make refcounts exact
+        StoredFile.objects.filter(name__in=set(tracked) - walked).delete()
+        counts = StoredFile.objects.filter(blob=OuterRef('pk')).values('blob').annotate(n=Count('pk')).values('n')
+        Blob.objects.update(refcount=Coalesce(Subquery(counts), 0))
+        for digest in Blob.objects.filter(refcount=0).values_list('digest', flat=True):
+            if os.path.exists(storage.blob_path(digest)):
+                os.remove(storage.blob_path(digest))
+        Blob.objects.filter(refcount=0).delete()
+        self.stdout.write(self.style.SUCCESS(f'Scanned {files} files; freed {saved} bytes'))
+        self.report(dedup_stats())
+
+    def report(self, stats):
+        self.stdout.write(
+            f"Blobs: {stats['stored_bytes']} bytes on disk for {stats['referenced_bytes']} bytes of files "
+            f"({stats['saved_bytes']} bytes saved)"
+        )
@@ -0,0 +1,41 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from core.images import IMAGE_FIELDS, generate_derivatives
+from core.models import ImageDerivatives
+from core.tasks import build_image_derivatives
+
+
+class Command(BaseCommand):
+    help = 'Generate resized WebP/fallback renditions for uploaded images that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--enqueue', action='store_true', help='Queue background jobs instead of resizing inline')
+        parser.add_argument('--force', action='store_true', help='Regenerate images that already have derivatives')
+
+    def handle(self, *args, **options):
+        done = set() if options['force'] else set(ImageDerivatives.objects.values_list('source', flat=True))
+        generated = failed = 0
+        for label, field_name in IMAGE_FIELDS:
+            model = apps.get_model(label)
+            names = (
+                model._default_manager.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                .values_list(field_name, flat=True).distinct()
+            )
+            for name in names.iterator(chunk_size=500):
+                if name in done:
+                    continue
+                done.add(name)
+                if options['enqueue']:
+                    build_image_derivatives.enqueue(name, unique_key=name[:200])
+                    generated += 1
+                    continue
+                try:
+                    generate_derivatives(name)
+                    generated += 1
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'{name}: {exc}')
+
+        verb = 'Queued' if options['enqueue'] else 'Generated derivatives for'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {generated} images ({failed} failed)'))
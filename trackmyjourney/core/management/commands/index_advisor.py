@@ -0,0 +1,171 @@
+import os
+import sqlite3
+import sys
+import tempfile
+from contextlib import ExitStack
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import counters
+from core.queryplans import EXPLAINABLE, explain, fingerprint, merge_proposals, propose, read_statements
+from groups.models import Group
+from .benchmark_asgi import benchmark_pages
+
+# Pages only a logged-in user sees, replayed with --user
+USER_PAGES = [
+    'goals:list', 'achievements:list', 'blog:my_list', 'books:my_books',
+    'books:reading_list', 'resources:my_list', 'groups:my_groups',
+]
+
+
+def advisor_pages(logged_in):
+    pages = [url for name, url in benchmark_pages()]
+    pages += [reverse('resources:list'), reverse('groups:list')]
+    group = Group.objects.order_by('pk').first()
+    if group:
+        pages.append(reverse('groups:detail', args=[group.slug]))
+    if logged_in:
+        pages += [reverse(name) for name in USER_PAGES]
+    return pages
+
+
+class Command(BaseCommand):
+    help = (
+        'Explain captured SQL and propose Meta.indexes for full table scans and temp B-tree sorts. '
+        'Reads SQL logs (slow query log JSON lines, django.db.backends debug output or plain SQL), '
+        'or replays the benchmark pages when none are given. The replay runs on a temporary copy of '
+        'SQLite databases and in rolled-back transactions elsewhere, but it still writes to the cache. '
+        'Add the proposed lines to the models\' Meta.indexes and run makemigrations.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('logs', nargs='*', help='Files of captured SQL; "-" reads stdin')
+        parser.add_argument('--user', help='Also replay the logged-in pages as this user')
+        parser.add_argument('--database', default='default', help='Database to explain the queries on')
+
+    def handle(self, *args, **options):
+        statements = self.read_logs(options['logs']) if options['logs'] else self.replay(options['user'])
+
+        # One example per query shape is enough to explain, the count says how much it matters
+        shapes = {}
+        for sql in statements:
+            if EXPLAINABLE.match(sql):
+                shape = shapes.setdefault(fingerprint(sql), [sql, 0])
+                shape[1] += 1
+        if not shapes:
+            raise CommandError('No SELECT, UPDATE or DELETE statements to explain.')
+
+        proposals = {}
+        unindexable = 0
+        for shape, (sql, count) in shapes.items():
+            try:
+                problems = explain(sql, options['database'])
+            except DatabaseError as e:
+                self.stderr.write(f'Could not explain: {e}\n    {shape[:200]}')
+                continue
+            for problem in problems:
+                proposal = propose(sql, problem)
+                if proposal is None:
+                    unindexable += 1
+                    continue
+                key = (proposal.model._meta.label, tuple(proposal.fields))
+                proposal = proposals.setdefault(key, proposal)
+                proposal.queries.add((shape, count))
+                proposal.problems.add(problem.kind)
+        proposals = merge_proposals(proposals.values())
+
+        self.stdout.write(
+            f'Explained {len(shapes)} query shapes ({sum(count for sql, count in shapes.values())} statements); '
+            f'{unindexable} scans or sorts had no filter or ordering an index could serve'
+        )
+        if not proposals:
+            self.stdout.write(self.style.SUCCESS('No missing indexes found'))
+            return
+
+        for proposal in sorted(proposals, key=lambda p: -sum(count for shape, count in p.queries)):
+            executions = sum(count for shape, count in proposal.queries)
+            self.stdout.write(f'\n{proposal.model._meta.label}  ({" and ".join(sorted(proposal.problems))}, {executions} runs)')
+            if proposal.model._meta.auto_created:
+                # Many-to-many tables Django created have no Meta to add the index to
+                self.stdout.write(f'    {proposal.meta_line()}  (give the relation a through model to index it)')
+            else:
+                self.stdout.write(f'    {proposal.meta_line()}')
+            for shape, count in sorted(proposal.queries, key=lambda query: -query[1])[:3]:
+                self.stdout.write(f'    {count:>4} x {shape[:160]}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n{len(proposals)} indexes proposed: add them to Meta.indexes, then run makemigrations'
+        ))
+
+    def read_logs(self, paths):
+        statements = []
+        for path in paths:
+            if path == '-':
+                statements += read_statements(sys.stdin)
+                continue
+            with open(path) as f:
+                statements += read_statements(f)
+        return statements
+
+    def replay(self, username):
+        """
+        GET the advisor pages and return the SQL they ran.
+
+        SQLite databases are swapped for temporary copies first: a write
+        transaction there locks the whole file, and the site's writers would
+        queue behind the replay. Everything also runs inside transactions
+        that are rolled back, so on other databases view counts, the --user
+        login, sessions and queued jobs never persist. Cache writes (cached
+        sessions and pages) do stay.
+        """
+        client = Client()
+        # Reads may be routed to a replica; capture (and roll back) on every database
+        with ExitStack() as stack:
+            self.use_snapshots(stack)
+            for connection in connections.all():
+                stack.enter_context(transaction.atomic(using=connection.alias))
+                stack.callback(transaction.set_rollback, True, using=connection.alias)
+            stack.callback(counters.discard)
+            captures = [stack.enter_context(CaptureQueriesContext(connection)) for connection in connections.all()]
+
+            if username:
+                try:
+                    client.force_login(get_user_model().objects.get(username=username))
+                except get_user_model().DoesNotExist:
+                    raise CommandError(f'No user named {username!r}')
+            for url in advisor_pages(logged_in=bool(username)):
+                response = client.get(url)
+                if response.status_code != 200:
+                    self.stderr.write(f'GET {url} returned {response.status_code}')
+        return [query['sql'] for capture in captures for query in capture.captured_queries]
+
+    def use_snapshots(self, stack):
+        """Point every SQLite alias at a copy of its database until ``stack`` closes; aliases of one file share a copy."""
+        copies = {}
+        for connection in connections.all():
+            if connection.vendor != 'sqlite':
+                continue
+            name = connection.settings_dict['NAME']
+            if name not in copies:
+                directory = stack.enter_context(tempfile.TemporaryDirectory(prefix='index-advisor-'))
+                copies[name] = os.path.join(directory, 'snapshot.sqlite3')
+                source = sqlite3.connect(name)
+                target = sqlite3.connect(copies[name])
+                try:
+                    # The online backup API takes a consistent snapshot while the site keeps writing
+                    source.backup(target)
+                finally:
+                    target.close()
+                    source.close()
+            connection.close()
+            connection.settings_dict['NAME'] = copies[name]
+            stack.callback(self.restore_database, connection, name)
+
+    def restore_database(self, connection, name):
+        connection.close()
+        connection.settings_dict['NAME'] = name
@@ -0,0 +1,56 @@
+import glob
+import os
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import PROFILE_DIR, load
+
+
+class Command(BaseCommand):
+    help = (
+        'Summarize the sampled request profiles per URL name: the functions with the most samples, '
+        'on their own (self) and including what they called (total)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='URL names to report on (default: all profiled)')
+        parser.add_argument('--top', type=int, default=15)
+        parser.add_argument(
+            '--flamegraph', metavar='DIR',
+            help='Also write one merged collapsed-stack file per URL name to DIR, for flamegraph.pl or speedscope',
+        )
+        parser.add_argument('--clear', action='store_true', help='Delete the reported profiles afterwards')
+
+    def handle(self, *args, **options):
+        paths = sorted(glob.glob(os.path.join(PROFILE_DIR, '*.collapsed')))
+        if options['names']:
+            wanted = {name.replace(':', '.') for name in options['names']}
+            paths = [path for path in paths if os.path.basename(path)[:-len('.collapsed')] in wanted]
+        if not paths:
+            raise CommandError(f'No profiles in {PROFILE_DIR}')
+
+        for path in paths:
+            name = os.path.basename(path)[:-len('.collapsed')]
+            stacks = load(path)
+            total = sum(stacks.values())
+            own, inclusive = Counter(), Counter()
+            for stack, count in stacks.items():
+                frames = stack.split(';')
+                own[frames[-1]] += count
+                for frame in set(frames):
+                    inclusive[frame] += count
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{name}: {total} samples'))
+            self.stdout.write(f"{'self':>7}{'total':>8}  function")
+            for frame, count in own.most_common(options['top']):
+                self.stdout.write(f'{count / total:>7.1%}{inclusive[frame] / total:>8.1%}  {frame}')
+
+            if options['flamegraph']:
+                os.makedirs(options['flamegraph'], exist_ok=True)
+                with open(os.path.join(options['flamegraph'], f'{name}.collapsed'), 'w') as f:
+                    f.writelines(f'{stack} {count}\n' for stack, count in stacks.most_common())
+            if options['clear']:
+                os.remove(path)
+
+        self.stdout.write(self.style.SUCCESS(f'\nReported {len(paths)} profiles'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.profiling import PROFILE_HEADER, make_token
+
+
+class Command(BaseCommand):
+    help = 'Print a signed X-Profile header value; requests sending it are always profiled'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=1, help='How long the token stays valid')
+
+    def handle(self, *args, **options):
+        token = make_token(int(options['hours'] * 3600))
+        self.stdout.write(f'{PROFILE_HEADER}: {token}')
+        self.stdout.write(self.style.SUCCESS(f"Valid for {options['hours']:g} hours"))
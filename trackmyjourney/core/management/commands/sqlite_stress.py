@@ -0,0 +1,148 @@
+import argparse
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connections
+from django.db.models import Count, F
+
+from accounts.models import User
+from blog.models import BlogPost, Comment
+
+PROFILES = ('default', 'production')
+
+
+def copy_database(source, target, journal_mode):
+    src, dst = sqlite3.connect(source), sqlite3.connect(target)
+    src.backup(dst)
+    dst.execute(f'PRAGMA journal_mode = {journal_mode}')
+    src.close()
+    dst.close()
+
+
+class Workload:
+    """The writes a busy site makes: like toggles, comments and view-count flushes, mixed with page reads."""
+
+    def __init__(self, seconds):
+        self.deadline = time.monotonic() + seconds
+        self.user_ids = list(User.objects.values_list('pk', flat=True)[:50])
+        self.post_ids = list(BlogPost.objects.filter(status='published').values_list('pk', flat=True)[:20])
+        if not self.user_ids or not self.post_ids:
+            raise CommandError('The stress test needs at least one user and one published blog post.')
+        self.lock = threading.Lock()
+        self.done = Counter()
+        self.errors = Counter()
+        self.latencies = []
+
+    def toggle_like(self, post, user_id):
+        if post.likes.filter(pk=user_id).exists():
+            post.likes.remove(user_id)
+        else:
+            post.likes.add(user_id)
+
+    def comment(self, post, user_id):
+        Comment.objects.create(post=post, author_id=user_id, content='Stress test comment')
+
+    def count_view(self, post, user_id):
+        BlogPost.objects.filter(pk=post.pk).update(views=F('views') + 1)
+
+    def read(self, post, user_id):
+        BlogPost.objects.filter(pk=post.pk).annotate(comment_count=Count('comments')).get()
+
+    OPERATIONS = [(read, 5), (count_view, 3), (toggle_like, 2), (comment, 1)]
+
+    def run(self):
+        operations, weights = zip(*self.OPERATIONS)
+        while time.monotonic() < self.deadline:
+            operation = random.choices(operations, weights)[0]
+            started = time.perf_counter()
+            try:
+                operation(self, BlogPost(pk=random.choice(self.post_ids)), random.choice(self.user_ids))
+            except OperationalError as e:
+                with self.lock:
+                    self.errors[f'{operation.__name__}: {e}'] += 1
+                continue
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.done[operation.__name__] += 1
+                self.latencies.append(elapsed)
+        close_old_connections()
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Hammer a copy of the database with concurrent writes under the stock and production SQLite profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=10)
+        # Set on the child processes, one per profile
+        parser.add_argument('--database-copy', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['database_copy']:
+            self.stdout.write(json.dumps(self.run_profile(options['database_copy'], options['threads'], options['seconds'])))
+            return
+
+        source = str(settings.DATABASES['default']['NAME'])
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for profile in PROFILES:
+                copy = os.path.join(directory, f'{profile}.sqlite3')
+                copy_database(source, copy, 'WAL' if profile == 'production' else 'DELETE')
+                completed = subprocess.run(
+                    [
+                        sys.executable, '-m', 'django', 'sqlite_stress', '--database-copy', copy,
+                        '--threads', str(options['threads']), '--seconds', str(options['seconds']),
+                    ],
+                    cwd=settings.BASE_DIR,
+                    env={**os.environ, 'DJANGO_SQLITE_PROFILE': profile},
+                    capture_output=True,
+                    text=True,
+                )
+                if completed.returncode:
+                    raise CommandError(f'{profile} run failed:\n{completed.stderr}')
+                results[profile] = json.loads(completed.stdout.strip().splitlines()[-1])
+
+        self.stdout.write(f"{options['threads']} threads for {options['seconds']:g}s on a copy of {source}")
+        for profile, result in results.items():
+            self.stdout.write(
+                f"{profile:<11} {result['ops_per_second']:>8.1f} ops/s  {result['writes_per_second']:>7.1f} writes/s  "
+                f"p95 {result['p95_ms']:>7.1f}ms  lock errors {result['lock_errors']}"
+            )
+            for error, count in result['errors'].items():
+                self.stdout.write(f'            {count} x {error}')
+        self.stdout.write(self.style.SUCCESS('Stress test complete'))
+
+    def run_profile(self, database, threads, seconds):
+        connections.close_all()
+        connections.settings['default']['NAME'] = database
+        workload = Workload(seconds)
+        connections.close_all()
+
+        started = time.perf_counter()
+        workers = [threading.Thread(target=workload.run) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(workload.latencies) or [0]
+        writes = sum(count for name, count in workload.done.items() if name != 'read')
+        return {
+            'ops_per_second': sum(workload.done.values()) / elapsed,
+            'writes_per_second': writes / elapsed,
+            'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+            'lock_errors': sum(count for error, count in workload.errors.items() if 'locked' in error),
+            'errors': dict(workload.errors),
+        }
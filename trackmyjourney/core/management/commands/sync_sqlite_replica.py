@@ -0,0 +1,31 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = 'Copy the primary SQLite database into each SQLite alias in DATABASE_REPLICAS (a local stand-in for replication)'
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('The primary is not SQLite; replicas are kept up to date by the database server.')
+        replicas = [alias for alias in settings.DATABASE_REPLICAS if connections[alias].vendor == 'sqlite']
+        if not replicas:
+            raise CommandError('No SQLite aliases in DATABASE_REPLICAS (set DJANGO_REPLICA_DB).')
+
+        source = sqlite3.connect(primary.settings_dict['NAME'])
+        try:
+            for alias in replicas:
+                target = sqlite3.connect(connections[alias].settings_dict['NAME'], timeout=30)
+                try:
+                    # The online backup API takes a consistent snapshot while the site keeps writing
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(f"Copied {primary.settings_dict['NAME']} to {alias} ({connections[alias].settings_dict['NAME']})")
+        finally:
+            source.close()
+        self.stdout.write(self.style.SUCCESS(f'{len(replicas)} replica(s) refreshed'))
@@ -0,0 +1,295 @@
+import atexit
+import contextvars
+import fcntl
+import glob
+import json
+import os
+import secrets
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+# Every process writes its values here; /metrics adds up all the files
+METRICS_DIR = getattr(settings, 'METRICS_DIR', os.path.join(settings.BASE_DIR, '.metrics'))
+# Values are written at most this often (after a request) and at exit, never per request
+DUMP_INTERVAL = getattr(settings, 'METRICS_DUMP_INTERVAL', 5)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+_registry = {}
+_lock = threading.Lock()
+_last_dump = time.monotonic()
+_process_file = None
+
+# Queries run by the request being served, counted by count_queries
+_query_count = contextvars.ContextVar('metrics_query_count', default=None)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}
+        _registry[name] = self
+
+    def key(self, labels):
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self):
+        with _lock:
+            return [[list(key), value] for key, value in self.values.items()]
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """A value per process, from ``set`` or, when given, ``callback`` (returning ``{label_tuple: value}``) at dump time."""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labels=(), callback=None):
+        super().__init__(name, documentation, labels)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        with _lock:
+            self.values[self.key(labels)] = value
+
+    def samples(self):
+        if self.callback is not None:
+            return [[list(key), value] for key, value in self.callback().items()]
+        return super().samples()
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with _lock:
+            # Per-bucket counts (not cumulative) plus +Inf, then the sum
+            counts = self.values.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            counts[bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Time to produce the response', ['view', 'method', 'status'],
+)
+REQUEST_QUERIES = Histogram(
+    'http_request_db_queries', 'Database queries run per request', ['view'], buckets=QUERY_COUNT_BUCKETS,
+)
+CACHE_REQUESTS = Counter('cache_requests_total', 'Cache lookups by key namespace and result', ['namespace', 'result'])
+UPLOAD_BYTES = Counter('upload_bytes_total', 'Bytes received by the chunked upload endpoint')
+DOWNLOAD_BYTES = Counter('download_bytes_total', 'Bytes of files served for download', ['kind'])
+
+
+def _counter_buffer_depth():
+    from . import counters
+    return {(): len(counters._pending)}
+
+
+COUNTER_BUFFER = Gauge(
+    'counter_buffer_pending_rows', 'Rows with buffered view/download increments not yet written (core.counters)',
+    callback=_counter_buffer_depth,
+)
+
+
+def count_queries(execute, sql, params, many, context):
+    box = _query_count.get()
+    if box is not None:
+        box[0] += 1
+    return execute(sql, params, many, context)
+
+
+def install(sender=None, connection=None, **kwargs):
+    """connection_created receiver: count the queries each request runs."""
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+def start_request():
+    """Start counting the current request's queries; returns what ``finish_request`` needs."""
+    return time.perf_counter(), _query_count.set([0])
+
+
+def finish_request(request, response, started):
+    began, token = started
+    queries = _query_count.get()[0]
+    _query_count.reset(token)
+    match = getattr(request, 'resolver_match', None)
+    # Unresolved paths are unbounded (scanners, typos); keep them out of the label values
+    view = (match.view_name or match._func_path) if match else 'unresolved'
+    REQUEST_LATENCY.observe(
+        time.perf_counter() - began, view=view, method=request.method, status=f'{response.status_code // 100}xx',
+    )
+    REQUEST_QUERIES.observe(queries, view=view)
+
+
+def snapshot():
+    return {
+        name: {
+            'kind': metric.kind, 'documentation': metric.documentation, 'labels': list(metric.labels),
+            'buckets': list(getattr(metric, 'buckets', [])), 'samples': metric.samples(),
+        }
+        for name, metric in _registry.items()
+    }
+
+
+def write_json(path, data):
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(data, f)
+    os.replace(temporary, path)
+
+
+def process_file():
+    """
+    This process's file: ``process-<pid>-<token>.json``.
+
+    The token is made once per pid, so a worker that gets a dead worker's
+    recycled pid never overwrites the file ``collect`` has yet to archive.
+    """
+    global _process_file
+    pid = os.getpid()
+    if _process_file is None or _process_file[0] != pid:
+        _process_file = (pid, os.path.join(METRICS_DIR, f'process-{pid}-{secrets.token_hex(4)}.json'))
+    return _process_file[1]
+
+
+def file_pid(path):
+    return int(os.path.basename(path)[len('process-'):-len('.json')].split('-')[0])
+
+
+def dump():
+    """Write this process's values to its file under METRICS_DIR."""
+    global _last_dump
+    _last_dump = time.monotonic()
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    write_json(process_file(), snapshot())
+
+
+def maybe_dump(**kwargs):
+    """request_finished receiver."""
+    if time.monotonic() - _last_dump >= DUMP_INTERVAL:
+        dump()
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def merge(into, data, with_gauges=True):
+    """Add the families in ``data`` (as written by ``dump``) to ``into``, whose samples are keyed by label tuple."""
+    for name, family in data.items():
+        merged = into.setdefault(name, {**family, 'samples': {}})
+        if family['kind'] == 'gauge' and not with_gauges:
+            continue
+        for labels, value in family['samples']:
+            key = tuple(labels)
+            if isinstance(value, list):
+                current = merged['samples'].get(key) or [0] * len(value)
+                merged['samples'][key] = [a + b for a, b in zip(current, value)]
+            else:
+                merged['samples'][key] = merged['samples'].get(key, 0) + value
+
+
+def as_data(families):
+    return {
+        name: {**family, 'samples': [[list(key), value] for key, value in family['samples'].items()]}
+        for name, family in families.items()
+    }
+
+
+def collect():
+    """
+    Every process's values added up.
+
+    Files of processes that have exited are folded into ``archive.json``
+    (counters and histograms only: their gauges died with them), so recycled
+    workers don't make counters go backwards.
+    """
+    dump()
+    families, archive = {}, {}
+    with open(os.path.join(METRICS_DIR, 'lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive_path = os.path.join(METRICS_DIR, 'archive.json')
+        if os.path.exists(archive_path):
+            with open(archive_path) as f:
+                merge(archive, json.load(f), with_gauges=False)
+        archived = False
+        for path in glob.glob(os.path.join(METRICS_DIR, 'process-*.json')):
+            pid = file_pid(path)
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if process_alive(pid):
+                merge(families, data)
+            else:
+                merge(archive, data, with_gauges=False)
+                os.remove(path)
+                archived = True
+        if archived:
+            write_json(archive_path, as_data(archive))
+    merge(families, as_data(archive), with_gauges=False)
+    return families
+
+
+def escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def label_text(names, values, extra=()):
+    pairs = [f'{name}="{escape(value)}"' for name, value in [*zip(names, values), *extra]]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def render(families):
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name, family in sorted(families.items()):
+        lines.append(f"# HELP {name} {family['documentation']}")
+        lines.append(f"# TYPE {name} {family['kind']}")
+        for labels, value in sorted(family['samples'].items()):
+            if family['kind'] != 'histogram':
+                lines.append(f"{name}{label_text(family['labels'], labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip([*family['buckets'], '+Inf'], value[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{label_text(family['labels'], labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{label_text(family['labels'], labels)} {value[-1]}")
+            lines.append(f"{name}_count{label_text(family['labels'], labels)} {cumulative}")
+    return '\n'.join(lines) + '\n'
+
+
+def dump_at_exit():
+    if any(metric.values for metric in _registry.values()):
+        dump()
+
+
+atexit.register(dump_at_exit)
@@ -0,0 +1,156 @@
+import threading
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from . import metrics, profiling, querylog, routers
+
+PIN_COOKIE = 'db_primary'
+
+
+class PrimaryReplicaMiddleware:
+    """
+    Read-your-writes for PrimaryReplicaRouter.
+
+    Unsafe requests and requests carrying the pin cookie read from the
+    primary. A request that writes sets the cookie for REPLICA_PIN_SECONDS.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tokens = self.start(request)
+        try:
+            return self.finish(self.get_response(request))
+        finally:
+            self.reset(tokens)
+
+    async def __acall__(self, request):
+        tokens = self.start(request)
+        try:
+            return self.finish(await self.get_response(request))
+        finally:
+            self.reset(tokens)
+
+    def start(self, request):
+        pinned = request.method not in ('GET', 'HEAD', 'OPTIONS') or PIN_COOKIE in request.COOKIES
+        return routers._pinned.set(pinned), routers._wrote.set(False)
+
+    def finish(self, response):
+        if routers._wrote.get() and routers.replica_aliases():
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def reset(self, tokens):
+        pinned, wrote = tokens
+        routers._pinned.reset(pinned)
+        routers._wrote.reset(wrote)
+
+
+class SlowQueryLogMiddleware:
+    """Lets core.querylog attribute slow queries to the view serving the request."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = querylog.current_request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            querylog.current_request.reset(token)
+
+    async def __acall__(self, request):
+        token = querylog.current_request.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            querylog.current_request.reset(token)
+
+
+class ProfilingMiddleware:
+    """
+    Samples the call stacks of a PROFILE_SAMPLE_RATE share of requests, and of
+    requests sending a token from ``manage.py profile_token`` in X-Profile.
+
+    Stacks are appended per URL name under PROFILE_DIR in collapsed format
+    (see ``manage.py profile_report``). Unprofiled requests only pay for the
+    coin toss.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not profiling.should_profile(request):
+            return self.get_response(request)
+        sampler = profiling.StackSampler({threading.get_ident()})
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            stacks = sampler.stop()
+        return self.finish(request, response, stacks)
+
+    async def __acall__(self, request):
+        if not profiling.should_profile(request):
+            return await self.get_response(request)
+        sampler = profiling.StackSampler()
+        sampler.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stacks = sampler.stop()
+        return self.finish(request, response, stacks)
+
+    def finish(self, request, response, stacks):
+        profiling.save(profiling.profile_name(request), stacks)
+        response['X-Profile-Samples'] = str(sum(stacks.values()))
+        return response
+
+
+class MetricsMiddleware:
+    """Observes each request's latency and query count for /metrics (core.metrics)."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = metrics.start_request()
+        response = self.get_response(request)
+        metrics.finish_request(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = metrics.start_request()
+        response = await self.get_response(request)
+        metrics.finish_request(request, response, started)
+        return response
@@ -0,0 +1,137 @@
+from django.db import models
+from django.db.models import F
+
+# Each level of a materialized path is the zero-padded pk plus a separator, so
+# lexical order on ``path`` is depth-first thread order (oldest reply first).
+PATH_SEGMENT_WIDTH = 10
+PATH_SEPARATOR = '/'
+PATH_MAX_LENGTH = 255
+MAX_THREAD_DEPTH = PATH_MAX_LENGTH // (PATH_SEGMENT_WIDTH + 1)
+
+
+def path_segment(pk):
+    return f"{pk:0{PATH_SEGMENT_WIDTH}d}{PATH_SEPARATOR}"
+
+
+class ThreadedComment(models.Model):
+    """
+    Abstract base for comments with a ``parent`` self-FK.
+
+    Keeps a materialized ``path``, the ``depth`` and the number of direct
+    replies up to date so a whole thread can be loaded in one ordered query
+    (see core/threads.py). Subclasses must define ``parent``.
+    """
+    path = models.CharField(max_length=PATH_MAX_LENGTH, blank=True, db_index=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    reply_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        parent = self.parent if adding and self.parent_id else None
+        if parent is not None and parent.depth >= MAX_THREAD_DEPTH - 1:
+            # Too deep to extend the path: answer alongside the parent instead
+            parent = parent.parent
+            self.parent = parent
+
+        super().save(*args, **kwargs)
+
+        if adding:
+            manager = self._meta.concrete_model._default_manager
+            self.depth = parent.depth + 1 if parent else 0
+            self.path = (parent.path if parent else '') + path_segment(self.pk)
+            manager.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+            if parent is not None:
+                manager.filter(pk=parent.pk).update(reply_count=F('reply_count') + 1)
+                parent.reply_count += 1
+
+
+class ImageDerivatives(models.Model):
+    """
+    Manifest of resized renditions generated for one uploaded image (see core/images.py).
+
+    ``renditions`` maps a rendition name to ``{"width", "height", "webp", "fallback"}``
+    where the last two are storage names next to the original.
+    """
+    source = models.CharField(max_length=255, unique=True)
+    digest = models.CharField(max_length=64)
+    renditions = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = 'Image derivatives'
+
+    def __str__(self):
+        return self.source
+
+
+class Blob(models.Model):
+    """One stored copy of some file content, shared by every upload with the same SHA-256 (see core/storage.py)."""
+    digest = models.CharField(max_length=64, unique=True)
+    size = models.PositiveBigIntegerField()
+    refcount = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.digest[:12]} ({self.refcount} refs)"
+
+
+class StoredFile(models.Model):
+    """A storage name (what FileFields hold) and the blob it links to."""
+    name = models.CharField(max_length=255, unique=True)
+    blob = models.ForeignKey(Blob, on_delete=models.PROTECT, related_name='files')
+
+    def __str__(self):
+        return self.name
+
+
+class SiteStats(models.Model):
+    """
+    Snapshot of the admin dashboard numbers, one row (pk=1) rewritten by core.tasks.refresh_site_stats.
+
+    ``counts`` maps a stat name to a number; ``daily`` maps a series name
+    (signups, posts) to ``[[iso_date, count], ...]`` for the last days, oldest first.
+    """
+    counts = models.JSONField(default=dict)
+    daily = models.JSONField(default=dict)
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = 'Site stats'
+
+    def __str__(self):
+        return f"Site stats at {self.refreshed_at:%Y-%m-%d %H:%M}"
+
+
+class SlowQuery(models.Model):
+    """
+    Slow queries of one shape, summed by core.querylog since ``first_seen``.
+
+    ``sql``, ``view``, ``call_site`` and ``template`` describe the latest
+    sample; ``fingerprint`` is the SQL with its literals replaced by ``?``.
+    """
+    digest = models.CharField(max_length=40, unique=True)
+    fingerprint = models.TextField()
+    sql = models.TextField()
+    calls = models.PositiveBigIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    rows = models.BigIntegerField(default=0)
+    view = models.CharField(max_length=255, blank=True)
+    call_site = models.CharField(max_length=255, blank=True)
+    template = models.CharField(max_length=255, blank=True)
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-total_ms']
+        verbose_name_plural = 'Slow queries'
+
+    def __str__(self):
+        return self.fingerprint[:80]
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.calls if self.calls else 0
@@ -0,0 +1,62 @@
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
+
+# Below this many rows an exact COUNT(*) is cheap enough and worth its precision
+ESTIMATE_THRESHOLD = 10000
+
+
+def estimated_count(model, using='default'):
+    """
+    The planner's row estimate for ``model``'s table, or None when the database has none.
+
+    Reads table statistics instead of scanning: ``pg_class.reltuples`` on
+    PostgreSQL, ``information_schema`` on MySQL and ``sqlite_stat1`` on SQLite,
+    which only exists once ANALYZE has run (see core.tasks.analyze_database).
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            elif connection.vendor == 'mysql':
+                cursor.execute(
+                    'SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s',
+                    [table],
+                )
+            elif connection.vendor == 'sqlite':
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+                if cursor.fetchone() is None:
+                    return None
+                # One row per index, each starting with the number of rows it covers
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table])
+                row = cursor.fetchone()
+                return int(row[0].split()[0]) if row else None
+            else:
+                return None
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    # PostgreSQL reports -1 for a table that was never analyzed
+    return int(row[0]) if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for big tables that skips the exact COUNT(*) when nothing is filtered.
+
+    An unfiltered queryset over a table of at least ESTIMATE_THRESHOLD rows
+    is counted from the table statistics; searches, filters and small tables
+    still get an exact count. The estimate can be a little off, so the page
+    count is too, but the first pages, the ones people use, are exact.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where and not query.distinct and not query.is_sliced:
+            estimate = estimated_count(self.object_list.model, self.object_list.db)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
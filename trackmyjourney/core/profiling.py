@@ -0,0 +1,122 @@
+import os
+import random
+import sys
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+
+# Share of requests profiled; requests sending a valid PROFILE_HEADER token always are
+SAMPLE_RATE = getattr(settings, 'PROFILE_SAMPLE_RATE', 0.0)
+INTERVAL = getattr(settings, 'PROFILE_INTERVAL', 0.005)
+PROFILE_DIR = getattr(settings, 'PROFILE_DIR', os.path.join(settings.BASE_DIR, 'profiles'))
+PROFILE_HEADER = 'X-Profile'
+TOKEN_SALT = 'core.profiling'
+
+_STDLIB_DIR = os.path.dirname(os.__file__)
+# Innermost frames of a thread that is waiting for work, not doing it
+_IDLE_FUNCTIONS = {'wait', 'select', 'poll', 'get', 'acquire', '_worker', 'sleep', 'run_forever', '_run_once'}
+
+
+def make_token(max_age):
+    """A PROFILE_HEADER value that profiles every request sending it for ``max_age`` seconds."""
+    return signing.dumps({'max_age': max_age}, salt=TOKEN_SALT)
+
+
+def token_is_valid(token):
+    try:
+        payload = signing.loads(token, salt=TOKEN_SALT, max_age=None)
+        signing.loads(token, salt=TOKEN_SALT, max_age=payload['max_age'])
+    except (signing.BadSignature, KeyError, TypeError):
+        return False
+    return True
+
+
+def should_profile(request):
+    token = request.headers.get(PROFILE_HEADER)
+    if token:
+        return token_is_valid(token)
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+def frame_label(code):
+    filename = code.co_filename
+    if filename.startswith(str(settings.BASE_DIR)):
+        filename = os.path.relpath(filename, settings.BASE_DIR)
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'.replace(';', ':')
+
+
+def collapse(frame):
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+def is_idle(frame):
+    return frame.f_code.co_filename.startswith(_STDLIB_DIR) and frame.f_code.co_name in _IDLE_FUNCTIONS
+
+
+class StackSampler(threading.Thread):
+    """
+    Counts the call stacks of ``thread_ids`` every INTERVAL seconds until stopped.
+
+    With ``thread_ids=None`` every busy thread is sampled: an async request's
+    code runs on the event loop and in sync_to_async threads, which can't be
+    told apart from other requests' threads, so keep concurrent traffic in
+    mind when reading profiles of async views.
+    """
+
+    def __init__(self, thread_ids=None, interval=INTERVAL):
+        super().__init__(name='request-profiler', daemon=True)
+        self.thread_ids = thread_ids
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        me = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me or (self.thread_ids is not None and ident not in self.thread_ids):
+                    continue
+                if self.thread_ids is None and is_idle(frame):
+                    continue
+                self.stacks[collapse(frame)] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        return self.stacks
+
+
+def profile_name(request):
+    match = getattr(request, 'resolver_match', None)
+    name = (match.view_name or match._func_path) if match else 'unresolved'
+    return name.replace(':', '.').replace('/', '_')
+
+
+def save(name, stacks):
+    """Append ``stacks`` to ``<PROFILE_DIR>/<name>.collapsed`` in one write, so processes can share the file."""
+    if not stacks:
+        return
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    data = ''.join(f'{stack} {count}\n' for stack, count in stacks.items()).encode()
+    fd = os.open(os.path.join(PROFILE_DIR, f'{name}.collapsed'), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def load(path):
+    """Stacks in a collapsed file, with the counts of repeated lines (one per profiled request) summed."""
+    stacks = Counter()
+    with open(path) as f:
+        for line in f:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            if stack and count.isdigit():
+                stacks[stack] += int(count)
+    return stacks
@@ -0,0 +1,197 @@
+import atexit
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+
+import django
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, IntegrityError, connections, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .queryplans import fingerprint
+
+logger = logging.getLogger(__name__)
+# One JSON object per sampled query; settings.LOGGING sends it to a rotating file
+slow_query_log = logging.getLogger('core.slow_queries')
+
+# Queries at least this slow are recorded (None turns the log off), a random SAMPLE_RATE share of them
+SLOW_QUERY_MS = getattr(settings, 'SLOW_QUERY_MS', 200)
+SAMPLE_RATE = getattr(settings, 'SLOW_QUERY_SAMPLE_RATE', 1.0)
+FLUSH_INTERVAL = getattr(settings, 'SLOW_QUERY_FLUSH_INTERVAL', 30)
+
+# The request being served, set by SlowQueryLogMiddleware
+current_request = contextvars.ContextVar('slow_query_request', default=None)
+
+_pending = {}
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+_local = threading.local()
+
+# Frames from these are framework, not the code that asked for the query
+_SKIPPED_DIRS = (
+    os.path.dirname(django.__file__), os.path.dirname(os.__file__),
+    os.path.abspath(__file__), os.path.join(os.path.dirname(os.path.abspath(__file__)), 'middleware.py'),
+)
+
+
+def install(sender=None, connection=None, **kwargs):
+    """connection_created receiver: time every query on the new connection."""
+    if SLOW_QUERY_MS is not None and record_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_slow_queries)
+
+
+def record_slow_queries(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = (time.perf_counter() - started) * 1000
+        if (
+            duration >= SLOW_QUERY_MS and not getattr(_local, 'flushing', False)
+            and (SAMPLE_RATE >= 1 or random.random() < SAMPLE_RATE)
+        ):
+            note(sql, params, many, context, duration)
+
+
+def call_site():
+    """The innermost frame in our own code and, if a template was rendering, the template line."""
+    code = template = ''
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not code and not filename.startswith(_SKIPPED_DIRS) and 'site-packages' not in filename:
+            code = f'{os.path.relpath(filename, settings.BASE_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        if not template and frame.f_code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            origin, token = getattr(node, 'origin', None), getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                template = f'{origin.template_name}:{token.lineno}'
+        if code and template:
+            break
+        frame = frame.f_back
+    return code, template
+
+
+def view_name():
+    request = current_request.get()
+    if request is None:
+        return ''
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return request.path
+    return match.view_name or match._func_path
+
+
+def note(sql, params, many, context, duration):
+    cursor = context['cursor']
+    try:
+        example = sql if many else context['connection'].ops.last_executed_query(cursor, sql, params)
+    except Exception:
+        example = sql
+    rows = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else None
+    shape = fingerprint(sql)
+    code, template = call_site()
+    sample = {
+        'fingerprint': shape, 'sql': example, 'ms': round(duration, 1), 'rows': rows,
+        'view': view_name(), 'call_site': code, 'template': template,
+        'database': context['connection'].alias,
+    }
+    slow_query_log.info(json.dumps(sample))
+
+    with _lock:
+        entry = _pending.setdefault(shape, {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0})
+        entry['calls'] += 1
+        entry['total_ms'] += duration
+        entry['max_ms'] = max(entry['max_ms'], duration)
+        entry['rows'] += rows or 0
+        entry.update(sql=example, view=sample['view'], call_site=code, template=template)
+
+
+def maybe_flush(**kwargs):
+    """request_finished receiver: write the buffered samples every FLUSH_INTERVAL seconds."""
+    if _pending and time.monotonic() - _last_flush >= FLUSH_INTERVAL:
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return
+        try:
+            flush()
+        except DatabaseError:
+            logger.exception('Could not flush the slow query log')
+
+
+def _restore(entries):
+    """Put ``(shape, entry)`` pairs that were not written back in the buffer, merged with samples noted since."""
+    with _lock:
+        for shape, entry in entries:
+            newer = _pending.get(shape)
+            if newer is not None:
+                # The newer sample's SQL and call site win; the totals add up
+                entry = {
+                    **newer, 'calls': entry['calls'] + newer['calls'], 'total_ms': entry['total_ms'] + newer['total_ms'],
+                    'max_ms': max(entry['max_ms'], newer['max_ms']), 'rows': entry['rows'] + newer['rows'],
+                }
+            _pending[shape] = entry
+
+
+def _write(shape, entry, now):
+    from .models import SlowQuery
+
+    digest = hashlib.sha1(shape.encode()).hexdigest()
+    details = {
+        'sql': entry['sql'], 'view': entry['view'][:255], 'call_site': entry['call_site'][:255],
+        'template': entry['template'][:255], 'last_seen': now,
+    }
+
+    def add_to_row():
+        return SlowQuery.objects.filter(digest=digest).update(
+            calls=F('calls') + entry['calls'],
+            total_ms=F('total_ms') + entry['total_ms'],
+            max_ms=Greatest('max_ms', entry['max_ms']),
+            rows=F('rows') + entry['rows'],
+            **details,
+        )
+
+    if add_to_row():
+        return
+    try:
+        with transaction.atomic():
+            SlowQuery.objects.create(
+                digest=digest, fingerprint=shape, calls=entry['calls'], total_ms=entry['total_ms'],
+                max_ms=entry['max_ms'], rows=entry['rows'], **details,
+            )
+    except IntegrityError:
+        # Another process created the row since our update found none
+        add_to_row()
+
+
+def flush():
+    """Add the buffered samples to their SlowQuery rows; returns the number of fingerprints written."""
+    global _last_flush
+
+    with _lock:
+        entries = list(_pending.items())
+        _pending.clear()
+        _last_flush = time.monotonic()
+
+    _local.flushing = True
+    try:
+        now = timezone.now()
+        for done, (shape, entry) in enumerate(entries):
+            try:
+                _write(shape, entry, now)
+            except DatabaseError:
+                _restore(entries[done:])
+                raise
+    finally:
+        _local.flushing = False
+    return len(entries)
+
+
+atexit.register(flush)
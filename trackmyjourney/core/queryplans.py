@@ -0,0 +1,258 @@
+import json
+import re
+from collections import namedtuple
+from dataclasses import dataclass, field
+
+from django.apps import apps
+from django.db import DatabaseError, connections, models
+
+# Statements worth explaining; the rest (INSERT, SAVEPOINT, PRAGMA...) can't use an index to find rows
+EXPLAINABLE = re.compile(r'^\s*(SELECT|UPDATE|DELETE)\b', re.IGNORECASE)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+# DB-API placeholders as the backend wrappers see them, before the driver fills them in
+_PLACEHOLDER = re.compile(r'%(?:\(\w+\))?s')
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN \((?:\s*\?\s*,)*\s*\?\s*\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+# A line of the django.db.backends debug log: "(0.002) SELECT ...; args=(...); alias=default"
+_BACKEND_LOG_LINE = re.compile(r'^\(\d+\.\d+\) (?P<sql>.*?); args=.*?(?:; alias=\w+)?$')
+
+# ``table`` is the table (or alias) scanned; None for a sort, which is traced back through ORDER BY
+Problem = namedtuple('Problem', 'table kind detail')
+
+
+def fingerprint(sql):
+    """``sql`` with literals replaced by ``?``, so every run of the same query shape reads the same."""
+    sql = _STRING.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def read_statements(lines):
+    """
+    SQL statements from a captured log.
+
+    Understands JSON lines with a ``sql`` key (the slow query log),
+    ``django.db.backends`` debug output, and plain SQL, one statement per
+    line or spread over several lines ending with ``;``.
+    """
+    pending = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('{'):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                pass
+            else:
+                if record.get('sql'):
+                    yield record['sql']
+                continue
+        match = _BACKEND_LOG_LINE.match(line)
+        if match:
+            yield match['sql']
+            continue
+        pending.append(line)
+        if line.endswith(';'):
+            yield ' '.join(pending).rstrip(';')
+            pending = []
+    if pending:
+        yield ' '.join(pending)
+
+
+def explain(sql, using='default'):
+    """What the planner would do badly for ``sql``: a list of Problems, one per table scanned in full or sorted in a temp structure."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return sqlite_problems(row[-1] for row in cursor.fetchall())
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+            plan = cursor.fetchone()[0]
+            return postgresql_problems(json.loads(plan) if isinstance(plan, str) else plan)
+    raise DatabaseError(f'Query plans are not supported on {connection.vendor}')
+
+
+_SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(?P<table>\w+)(?: AS (?P<alias>\w+))?(?P<rest>.*)$')
+
+
+def sqlite_problems(details):
+    problems = []
+    for detail in details:
+        scan = _SQLITE_SCAN.match(detail)
+        # A scan through an index reads rows in index order and is usually cut short by LIMIT
+        if scan and 'USING' not in scan['rest']:
+            problems.append(Problem(scan['alias'] or scan['table'], 'full scan', detail))
+        elif detail.startswith('USE TEMP B-TREE'):
+            problems.append(Problem(None, 'temp b-tree', detail))
+    return problems
+
+
+def postgresql_problems(plan):
+    problems = []
+
+    def walk(node):
+        if node.get('Node Type') == 'Seq Scan':
+            problems.append(Problem(node.get('Alias') or node['Relation Name'], 'full scan', f"Seq Scan on {node['Relation Name']}"))
+        elif node.get('Node Type') == 'Sort':
+            problems.append(Problem(None, 'temp b-tree', f"Sort on {', '.join(node.get('Sort Key', []))}"))
+        for child in node.get('Plans', []):
+            walk(child)
+
+    walk(plan[0]['Plan'])
+    return problems
+
+
+def table_aliases(sql):
+    """Map every name a table goes by in ``sql`` (Django aliases repeated joins as T2, T3...) to the table."""
+    aliases = {}
+    for table, alias in re.findall(r'(?:FROM|JOIN) "(\w+)"(?: AS)?(?: "?(T\d+)"?)?', sql, re.IGNORECASE):
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+    return aliases
+
+
+def split_clauses(sql):
+    """The WHERE and ORDER BY parts of ``sql``, found by keyword: good enough for the SQL the ORM writes."""
+    upper = sql.upper()
+    where_at = upper.find(' WHERE ')
+    order_at = upper.rfind(' ORDER BY ')
+    where = order = ''
+    if where_at >= 0:
+        ends = [upper.find(' GROUP BY ', where_at), order_at, upper.find(' LIMIT ', where_at)]
+        where = sql[where_at + len(' WHERE '):min([at for at in ends if at > where_at], default=len(sql))]
+    if order_at >= 0:
+        limit_at = upper.find(' LIMIT ', order_at)
+        order = sql[order_at + len(' ORDER BY '):limit_at if limit_at >= 0 else len(sql)]
+    return where, order
+
+
+@dataclass
+class Proposal:
+    model: type
+    fields: list
+    queries: set = field(default_factory=set)
+    problems: set = field(default_factory=set)
+
+    @property
+    def index(self):
+        index = models.Index(fields=list(self.fields))
+        index.set_name_with_model(self.model)
+        return index
+
+    def meta_line(self):
+        return f'models.Index(fields={list(self.fields)!r}),'
+
+
+def model_for_table(table):
+    for model in apps.get_models(include_auto_created=True):
+        if model._meta.db_table == table:
+            return model
+    return None
+
+
+def field_for_column(model, column):
+    for model_field in model._meta.concrete_fields:
+        if model_field.column == column:
+            return model_field.name
+    return None
+
+
+def existing_indexes(model):
+    """Field-name lists of indexes the table already has, in the order their columns are indexed."""
+    indexed = [list(index.fields) for index in model._meta.indexes]
+    indexed += [list(fields) for fields in model._meta.unique_together]
+    indexed += [list(fields) for fields in getattr(model._meta, 'index_together', ())]
+    indexed += [
+        list(constraint.fields) for constraint in model._meta.constraints
+        if isinstance(constraint, models.UniqueConstraint) and constraint.fields
+    ]
+    indexed += [[f.name] for f in model._meta.concrete_fields if f.db_index or f.unique or f.primary_key]
+    return indexed
+
+
+def is_covered(fields, indexed):
+    """True when an existing index starts with ``fields`` (ignoring sort direction, which SQLite and PostgreSQL can scan backwards)."""
+    wanted = [name.lstrip('-') for name in fields]
+    return any([name.lstrip('-') for name in existing[:len(wanted)]] == wanted for existing in indexed)
+
+
+def propose(sql, problem):
+    """
+    An index for the table in ``problem``: its equality-filtered columns, then
+    its range-filtered or ORDER BY columns. None when nothing in the query
+    could use one.
+    """
+    aliases = table_aliases(sql)
+    where, order = split_clauses(sql)
+    if problem.table is None:
+        # A sort is fixed by an index on the table the ORDER BY starts with
+        first = re.match(r'\s*"(\w+)"\.', order)
+        if first is None:
+            return None
+        table = aliases.get(first.group(1), first.group(1))
+    else:
+        table = aliases.get(problem.table, problem.table)
+    model = model_for_table(table)
+    if model is None:
+        return None
+    names = [name for name, target in aliases.items() if target == table] or [table]
+
+    def columns(clause, pattern):
+        found = []
+        for name in names:
+            for match in re.finditer(rf'"{name}"\."(\w+)"{pattern}', clause):
+                found.append((match.start(), match))
+        return [match for start, match in sorted(found, key=lambda item: item[0])]
+
+    equal, ranged, ordered = [], [], []
+    # An empty operator is a boolean column tested on its own: WHERE "t"."is_public" AND ...
+    for match in columns(where, r'\s*(=|IN\b|IS\b|<=|>=|<|>|BETWEEN\b|(?=\)|\s+AND\b|\s+OR\b|\s*$))'):
+        name = field_for_column(model, match.group(1))
+        operator = match.group(2).upper()
+        if name is None:
+            continue
+        target = equal if operator in ('', '=', 'IN', 'IS') else ranged
+        if name not in equal and name not in target:
+            target.append(name)
+    for match in columns(order, r'\s*(ASC|DESC)?'):
+        name = field_for_column(model, match.group(1))
+        if name is not None and name not in equal:
+            ordered.append(f'-{name}' if (match.group(2) or '').upper() == 'DESC' else name)
+
+    if model._meta.pk.name in equal:
+        # Rows picked by primary key (pk IN (...)) are found through it; sorting the few of them is cheap
+        return None
+    if problem.kind == 'temp b-tree':
+        if not ordered:
+            return None
+        fields = equal + ordered
+    else:
+        fields = equal + ranged[:1] or ordered
+    if not fields or is_covered(fields, existing_indexes(model)):
+        return None
+    return Proposal(model, fields)
+
+
+def merge_proposals(proposals):
+    """Drop proposals another one for the same model already covers (``[a]`` when there is ``[a, -b]``), keeping their queries."""
+    merged = []
+    for proposal in sorted(proposals, key=lambda p: -len(p.fields)):
+        wider = next((
+            other for other in merged
+            if other.model is proposal.model and is_covered(proposal.fields, [other.fields])
+        ), None)
+        if wider is None:
+            merged.append(proposal)
+        else:
+            wider.queries |= proposal.queries
+            wider.problems |= proposal.problems
+    return merged
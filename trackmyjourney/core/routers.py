@@ -0,0 +1,73 @@
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Set once the current request (or thread, outside requests) must read from the primary
+_pinned = contextvars.ContextVar('db_pinned_to_primary', default=False)
+_wrote = contextvars.ContextVar('db_wrote', default=False)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def pin_to_primary():
+    """Send the rest of this request's reads to the primary."""
+    _pinned.set(True)
+
+
+@contextmanager
+def use_primary():
+    """Read from the primary inside the block, e.g. right after a write made through raw SQL."""
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Reads go to a random alias in DATABASE_REPLICAS, writes to ``default``.
+
+    After the first write, reads in the same request go to the primary too.
+    So do reads inside an open transaction on the primary, which must see
+    its own uncommitted rows. PrimaryReplicaMiddleware carries the pin over
+    to the session's next requests for REPLICA_PIN_SECONDS, longer than
+    replication lag, so users always see their own writes.
+    """
+    # Read-modify-write state that must never be read stale: sessions and the job queue
+    primary_only_apps = {'sessions', 'jobs'}
+
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if (
+            not replicas or _pinned.get() or model._meta.app_label in self.primary_only_apps
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Related lookups from an object stay on the database it came from
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _pinned.set(True)
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of the primary and get its schema with the data
+        if db in replica_aliases():
+            return False
+        return None
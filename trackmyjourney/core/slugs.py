@@ -0,0 +1,107 @@
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+
+# Suffixes are "-<n>"; every "<stem>-<digits>" slug sorts before "<stem>-:"
+SUFFIX_RANGE_END = '-:'
+# Room kept for "-<n>" when a base is too long to take a suffix whole (up to -999999)
+SUFFIX_LENGTH = 7
+
+
+def slug_family(model, base, field='slug'):
+    """
+    ``base`` cut to fit the field, and the stem its ``-<n>`` variants start with.
+
+    The stem is fixed before any suffix is chosen, so a long base's variants
+    all share it and one range query finds every one of them.
+    """
+    max_length = model._meta.get_field(field).max_length
+    base = base[:max_length].strip('-') or model._meta.model_name
+    if len(base) <= max_length - SUFFIX_LENGTH:
+        return base, base
+    return base, base[:max_length - SUFFIX_LENGTH].rstrip('-')
+
+
+def family_q(field, base, stem):
+    """Q matching ``base`` itself and every ``<stem>-...`` slug."""
+    return Q(**{field: base}) | Q(**{f'{field}__gte': stem + '-', f'{field}__lt': stem + SUFFIX_RANGE_END})
+
+
+def first_free(base, stem, taken, start=1):
+    """
+    ``base`` if it is not in ``taken``, otherwise ``<stem>-<n>`` with the
+    smallest free ``n`` from ``start``; returns the slug and the next ``n``
+    worth trying.
+
+    Numbers that are part of a title ("Reading list 2024") stay out of the
+    way: only the variants actually taken are skipped.
+    """
+    if base not in taken:
+        return base, start
+    n = start
+    while f'{stem}-{n}' in taken:
+        n += 1
+    return f'{stem}-{n}', n + 1
+
+
+def next_free_slug(model, base, field='slug'):
+    """
+    Return ``base`` or ``<stem>-<n>`` with the smallest ``n`` not in use.
+
+    Costs one indexed range query on the slug column no matter how many
+    duplicates already exist.
+    """
+    base, stem = slug_family(model, base, field)
+    taken = set(model._default_manager.filter(family_q(field, base, stem)).values_list(field, flat=True))
+    return first_free(base, stem, taken)[0]
+
+
+def save_with_unique_slug(instance, source, save, *args, field='slug', attempts=5, **kwargs):
+    """
+    Fill ``instance.<field>`` from ``source`` and call ``save(*args, **kwargs)``.
+
+    A concurrent insert can take the same slug between allocation and
+    insert; the unique index then raises IntegrityError and a fresh slug is
+    allocated. IntegrityErrors from other constraints are re-raised.
+    """
+    model = instance._meta.concrete_model
+    base = slugify(source)
+    for attempt in range(attempts):
+        slug = next_free_slug(model, base, field)
+        setattr(instance, field, slug)
+        try:
+            with transaction.atomic():
+                return save(*args, **kwargs)
+        except IntegrityError:
+            collided = model._default_manager.filter(**{field: slug}).exists()
+            if not collided or attempt == attempts - 1:
+                raise
+
+
+def allocate_slugs(model, sources, field='slug'):
+    """
+    Unique slugs for many new rows at once (for ``bulk_create``), using one query.
+
+    Returns one slug per entry of ``sources``, also unique among themselves.
+    A concurrent insert can still collide; callers fall back to
+    ``save_with_unique_slug`` when the batch insert fails.
+    """
+    families = [slug_family(model, slugify(source), field) for source in sources]
+    if not families:
+        return []
+
+    ranges = Q()
+    for base, stem in set(families):
+        ranges |= family_q(field, base, stem)
+    taken = set(model._default_manager.filter(ranges).values_list(field, flat=True))
+
+    # Long bases that differ only past the cut share a stem, so suffixes are counted per stem
+    next_n = {}
+    slugs = []
+    for base, stem in families:
+        slug, next_n[stem] = first_free(base, stem, taken, next_n.get(stem, 1))
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
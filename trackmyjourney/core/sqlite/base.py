@@ -0,0 +1,49 @@
+from django.db.backends.sqlite3 import base
+
+# Applied to every new connection; OPTIONS['pragmas'] overrides or adds to these
+DEFAULT_PRAGMAS = {
+    # Wait this many ms for a lock instead of failing with "database is locked"
+    'busy_timeout': 5000,
+    # Readers don't block the writer and the writer doesn't block readers
+    'journal_mode': 'WAL',
+    # Safe with WAL: a power cut can lose the last commits but not corrupt the file
+    'synchronous': 'NORMAL',
+    'cache_size': -20000,  # KiB
+    'mmap_size': 128 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Django 5.1+ reads OPTIONS['transaction_mode'] itself (and defaults to a plain BEGIN)
+NATIVE_TRANSACTION_MODE = hasattr(base.DatabaseWrapper, 'transaction_modes')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite tuned for a threaded web server (``ENGINE = 'core.sqlite'``).
+
+    New connections get ``DEFAULT_PRAGMAS`` plus ``OPTIONS['pragmas']``, and
+    ``atomic()`` blocks start with ``BEGIN IMMEDIATE`` (``OPTIONS['transaction_mode']``).
+    A deferred transaction that reads first and then writes cannot wait for
+    the write lock: SQLite fails it at once to avoid a deadlock, whatever
+    the busy timeout. Taking the lock up front makes writers queue instead.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = {**DEFAULT_PRAGMAS, **params.pop('pragmas', {})}
+        if NATIVE_TRANSACTION_MODE:
+            # Django has already validated and applied the option; only the default differs
+            if 'transaction_mode' not in self.settings_dict['OPTIONS']:
+                self.transaction_mode = 'IMMEDIATE'
+        else:
+            self.transaction_mode = params.pop('transaction_mode', 'IMMEDIATE')
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}' if self.transaction_mode else 'BEGIN')
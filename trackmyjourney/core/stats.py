@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import SiteStats
+
+SERIES_DAYS = 30
+
+
+def compute_counts():
+    """The dashboard totals, with the filtered figures folded into one aggregate per table."""
+    from achievements.models import Achievement
+    from blog.models import BlogPost
+    from books.models import Book
+    from community.models import Community
+    from goals.models import Goal
+    from groups.models import Group
+    from resources.models import Resource
+
+    goals = Goal.objects.aggregate(total=Count('pk'), completed=Count('pk', filter=Q(status='completed')))
+    posts = BlogPost.objects.aggregate(total=Count('pk'), published=Count('pk', filter=Q(status='published')))
+    return {
+        'total_users': get_user_model().objects.count(),
+        'total_goals': goals['total'],
+        'completed_goals': goals['completed'],
+        'total_achievements': Achievement.objects.count(),
+        'total_posts': posts['total'],
+        'published_posts': posts['published'],
+        'total_resources': Resource.objects.count(),
+        'total_books': Book.objects.count(),
+        'total_groups': Group.objects.count(),
+        'total_communities': Community.objects.count(),
+    }
+
+
+def per_day(queryset, field, days):
+    today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    rows = (
+        queryset.filter(**{f'{field}__date__gte': start})
+        .annotate(day=TruncDate(field))
+        .values('day')
+        .annotate(total=Count('pk'))
+        .values_list('day', 'total')
+    )
+    totals = dict(rows)
+    return [[(start + timedelta(days=i)).isoformat(), totals.get(start + timedelta(days=i), 0)] for i in range(days)]
+
+
+def compute_daily(days=SERIES_DAYS):
+    from blog.models import BlogPost
+
+    return {
+        'signups': per_day(get_user_model().objects.all(), 'date_joined', days),
+        'posts': per_day(BlogPost.objects.all(), 'created_at', days),
+    }
+
+
+def refresh_site_stats():
+    stats, created = SiteStats.objects.update_or_create(
+        pk=1, defaults={'counts': compute_counts(), 'daily': compute_daily(), 'refreshed_at': timezone.now()},
+    )
+    return stats
+
+
+def get_site_stats():
+    """The current snapshot in one query; only the very first call, before any refresh has run, computes it inline."""
+    return SiteStats.objects.filter(pk=1).first() or refresh_site_stats()
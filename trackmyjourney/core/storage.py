@@ -0,0 +1,222 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F, FileField, Sum
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .images import release_derivatives
+
+# Blobs live under MEDIA_ROOT so they can be hard-linked to their names
+BLOB_DIR = '.blobs'
+READ_BLOCK = 1024 * 1024
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(READ_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def link_or_copy(source, target):
+    """Hard-link ``source`` to ``target``; copy where links are unsupported. Raises FileExistsError and FileNotFoundError."""
+    try:
+        os.link(source, target)
+    except (FileExistsError, FileNotFoundError):
+        raise
+    except OSError:
+        fd = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        with os.fdopen(fd, 'wb') as out, open(source, 'rb') as src:
+            shutil.copyfileobj(src, out, READ_BLOCK)
+
+
+class DedupStorage(FileSystemStorage):
+    """
+    FileSystemStorage that keeps one copy of each distinct file content.
+
+    Content is hashed while it is written to a staging file, stored once as
+    ``.blobs/ab/cd/<sha256>`` and hard-linked to the usual name, so URLs,
+    ``upload_to`` paths and filenames are unchanged. Blob and StoredFile rows
+    count references; deleting the last name that uses a blob removes it.
+    """
+
+    def blob_path(self, digest):
+        return self.path(os.path.join(BLOB_DIR, digest[:2], digest[2:4], digest))
+
+    def _makedirs(self, directory):
+        if self.directory_permissions_mode is not None:
+            old_umask = os.umask(0o777 & ~self.directory_permissions_mode)
+            try:
+                os.makedirs(directory, self.directory_permissions_mode, exist_ok=True)
+            finally:
+                os.umask(old_umask)
+        else:
+            os.makedirs(directory, exist_ok=True)
+
+    def _stage(self, content):
+        """Write ``content`` under BLOB_DIR while hashing it; returns (digest, size, staged path)."""
+        staging = self.path(os.path.join(BLOB_DIR, 'tmp'))
+        self._makedirs(staging)
+        fd, staged = tempfile.mkstemp(dir=staging)
+        os.close(fd)
+        if hasattr(content, 'temporary_file_path'):
+            file_move_safe(content.temporary_file_path(), staged, allow_overwrite=True)
+            return hash_file(staged), os.path.getsize(staged), staged
+
+        digest = hashlib.sha256()
+        size = 0
+        with open(staged, 'wb') as out:
+            for chunk in content.chunks():
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                out.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+        return digest.hexdigest(), size, staged
+
+    def _save(self, name, content):
+        digest, size, staged = self._stage(content)
+        blob = self.blob_path(digest)
+        self._makedirs(os.path.dirname(blob))
+        full_path = self.path(name)
+        self._makedirs(os.path.dirname(full_path))
+        # The staged copy is kept until the name is linked: a concurrent release() can
+        # remove an orphaned blob between the check and the link, and it is put back from here
+        try:
+            while True:
+                if not os.path.exists(blob):
+                    self._place_blob(staged, blob)
+                try:
+                    link_or_copy(blob, full_path)
+                except FileExistsError:
+                    name = self.get_available_name(name)
+                    full_path = self.path(name)
+                except FileNotFoundError:
+                    continue
+                else:
+                    break
+        finally:
+            os.remove(staged)
+
+        name = os.path.relpath(full_path, self.location).replace('\\', '/')
+        self.add_reference(name, digest, size)
+        return name
+
+    def _place_blob(self, staged, blob):
+        try:
+            link_or_copy(staged, blob)
+        except FileExistsError:
+            return
+        if self.file_permissions_mode is not None:
+            os.chmod(blob, self.file_permissions_mode)
+
+    def delete(self, name):
+        super().delete(name)
+        self.release(name)
+
+    def add_reference(self, name, digest, size):
+        from .models import Blob, StoredFile
+
+        with transaction.atomic():
+            self.release(name)
+            blob, _ = Blob.objects.get_or_create(digest=digest, defaults={'size': size})
+            StoredFile.objects.create(name=name, blob=blob)
+            Blob.objects.filter(pk=blob.pk).update(refcount=F('refcount') + 1)
+
+    def release(self, name):
+        """Drop the reference held by ``name``; the blob goes with its last reference."""
+        from .models import Blob, StoredFile
+
+        stored = StoredFile.objects.filter(name=name).select_related('blob').first()
+        if stored is None:
+            return
+        blob = stored.blob
+        with transaction.atomic():
+            stored.delete()
+            Blob.objects.filter(pk=blob.pk).update(refcount=F('refcount') - 1)
+            orphaned = Blob.objects.filter(pk=blob.pk, refcount__lte=0).delete()[0]
+        if orphaned:
+            try:
+                os.remove(self.blob_path(blob.digest))
+            except FileNotFoundError:
+                pass
+
+
+def _file_fields(model):
+    return [f for f in model._meta.concrete_fields if isinstance(f, FileField)]
+
+
+def _delete_on_commit(field, name):
+    def delete():
+        field.storage.delete(name)
+        release_derivatives(name, field.storage)
+
+    transaction.on_commit(delete)
+
+
+def _remember_replaced_files(sender, instance, raw=False, update_fields=None, **kwargs):
+    """pre_save receiver: note the names a save is about to replace or clear."""
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    fields = [f for f in sender._stored_file_fields if update_fields is None or f.name in update_fields]
+    if not fields:
+        return
+    old = sender._base_manager.filter(pk=instance.pk).values_list(*[f.attname for f in fields]).first()
+    if old is None:
+        return
+    instance._replaced_files = [
+        (field, name) for field, name in zip(fields, old)
+        if name and name != getattr(instance, field.attname).name
+    ]
+
+
+def _delete_replaced_files(sender, instance, raw=False, **kwargs):
+    """post_save receiver: drop the files the save replaced once it commits."""
+    for field, name in instance.__dict__.pop('_replaced_files', ()):
+        _delete_on_commit(field, name)
+
+
+def _delete_files(sender, instance, **kwargs):
+    """post_delete receiver: drop the deleted row's files once the delete commits."""
+    for field in sender._stored_file_fields:
+        name = getattr(instance, field.attname).name
+        if name:
+            _delete_on_commit(field, name)
+
+
+def connect_file_signals():
+    """
+    Delete files no row refers to any more: a deleted row's files and the
+    old file when a save replaces or clears one.
+
+    Storage never hands out the same name twice, so a name belongs to one
+    row. With DedupStorage, deleting a name releases its blob reference;
+    an image's generated renditions and their manifest go with it.
+    """
+    from django.apps import apps
+
+    for model in apps.get_models():
+        fields = _file_fields(model)
+        if not fields:
+            continue
+        model._stored_file_fields = fields
+        label = model._meta.label
+        pre_save.connect(_remember_replaced_files, sender=model, dispatch_uid=f'stored_files_pre_save_{label}')
+        post_save.connect(_delete_replaced_files, sender=model, dispatch_uid=f'stored_files_post_save_{label}')
+        post_delete.connect(_delete_files, sender=model, dispatch_uid=f'stored_files_post_delete_{label}')
+
+
+def dedup_stats():
+    """Bytes on disk for blobs, bytes the references would take without dedup, and the difference."""
+    from .models import Blob
+
+    totals = Blob.objects.aggregate(stored=Sum('size'), referenced=Sum(F('size') * F('refcount')))
+    stored = totals['stored'] or 0
+    referenced = totals['referenced'] or 0
+    return {'stored_bytes': stored, 'referenced_bytes': referenced, 'saved_bytes': referenced - stored}
@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.db import connection
+
+from jobs.registry import periodic_task, task
+from . import stats
+from .images import generate_derivatives
+
+
+@task(queue='media', max_attempts=3)
+def build_image_derivatives(name):
+    generate_derivatives(name)
+
+
+@periodic_task(every=timedelta(minutes=5), priority=-5)
+def refresh_site_stats():
+    """Recount the admin dashboard snapshot (core.models.SiteStats)."""
+    stats.refresh_site_stats()
+
+
+@periodic_task(every=timedelta(days=1), priority=-10)
+def analyze_database():
+    """Refresh SQLite's planner statistics, which EstimatedCountPaginator also reads row counts from."""
+    if connection.vendor != 'sqlite':
+        # PostgreSQL and MySQL keep their statistics current on their own
+        return
+    with connection.cursor() as cursor:
+        # Sample at most this many rows per index: estimates, fast even on big tables
+        cursor.execute('PRAGMA analysis_limit = 1000')
+        cursor.execute('ANALYZE')
@@ -0,0 +1,68 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from core.images import RENDITIONS, get_renditions
+
+register = template.Library()
+
+# Default ``sizes`` hint per rendition; override with sizes="..."
+DEFAULT_SIZES = {
+    'thumb': '160px',
+    'card': '(max-width: 576px) 100vw, 480px',
+    'full': '(max-width: 1280px) 100vw, 1280px',
+}
+
+
+def _srcset(renditions, key, rendition):
+    # Offer every rendition with the same framing so high-density screens can pick a larger one
+    crop = RENDITIONS[rendition]['crop']
+    entries = []
+    for name, spec in RENDITIONS.items():
+        entry = renditions.get(name)
+        if entry and key in entry and spec['crop'] == crop:
+            entries.append(f"{default_storage.url(entry[key])} {entry['width']}w")
+    return ', '.join(entries)
+
+
+@register.simple_tag
+def picture(image, rendition='card', **attrs):
+    """
+    Render ``<picture>`` with WebP and fallback srcsets for an ImageField value.
+
+    Usage: ``{% picture post.featured_image 'card' alt=post.title class="card-img-top" %}``.
+    Until the background job has produced derivatives the original is used.
+    """
+    if not image:
+        return ''
+    attrs.setdefault('alt', '')
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+    sizes = attrs.pop('sizes', DEFAULT_SIZES.get(rendition, '100vw'))
+    renditions = get_renditions(image.name)
+    entry = renditions.get(rendition)
+    if not entry:
+        attrs['src'] = image.url
+        return format_html('<img {}>', format_html_join(' ', '{}="{}"', attrs.items()))
+
+    attrs.setdefault('width', entry['width'])
+    attrs.setdefault('height', entry['height'])
+    attrs['src'] = default_storage.url(entry['fallback'])
+    attrs['srcset'] = _srcset(renditions, 'fallback', rendition)
+    attrs['sizes'] = sizes
+    img = format_html('<img {}>', format_html_join(' ', '{}="{}"', attrs.items()))
+    if 'webp' not in entry:
+        return img
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">{}</picture>',
+        _srcset(renditions, 'webp', rendition), sizes, img,
+    )
+
+
+@register.simple_tag
+def rendition_url(image, rendition='card'):
+    """URL of one rendition (fallback format), e.g. for CSS backgrounds; the original until generated."""
+    if not image:
+        return ''
+    entry = get_renditions(image.name).get(rendition)
+    return default_storage.url(entry['fallback']) if entry else image.url
@@ -0,0 +1,672 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.files.base import ContentFile
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import DatabaseError, connections
+from django.db.models.query import QuerySet
+from django.template import Context, Template
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from blog.models import BlogPost, Comment
+from books.models import Book
+from goals.models import Goal
+from jobs.models import Job
+from resources.models import Resource
+from . import counters, metrics, querylog, routers, storage as dedup
+from .images import generate_derivatives, get_renditions
+from .middleware import PIN_COOKIE, PrimaryReplicaMiddleware
+from .models import Blob, ImageDerivatives, SiteStats, SlowQuery, StoredFile
+from .paginator import EstimatedCountPaginator
+from .stats import SERIES_DAYS, get_site_stats
+
+User = get_user_model()
+
+
+class TemporaryMediaMixin:
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class DedupStorageTests(TemporaryMediaMixin, TestCase):
+    def save(self, name, data=b'same bytes'):
+        return default_storage.save(name, ContentFile(data))
+
+    def test_identical_content_is_stored_once(self):
+        first = self.save('a/one.txt')
+        second = self.save('b/two.txt')
+
+        blob = Blob.objects.get()
+        self.assertEqual(blob.refcount, 2)
+        self.assertEqual(set(blob.files.values_list('name', flat=True)), {first, second})
+        self.assertTrue(os.path.samefile(default_storage.path(first), default_storage.blob_path(blob.digest)))
+        with default_storage.open(second) as f:
+            self.assertEqual(f.read(), b'same bytes')
+
+    def test_blob_goes_with_its_last_reference(self):
+        first = self.save('one.txt')
+        second = self.save('two.txt')
+        blob_path = default_storage.blob_path(Blob.objects.get().digest)
+
+        default_storage.delete(first)
+        self.assertEqual(Blob.objects.get().refcount, 1)
+        self.assertTrue(os.path.exists(blob_path))
+
+        default_storage.delete(second)
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(StoredFile.objects.exists())
+        self.assertFalse(os.path.exists(blob_path))
+
+    def test_taken_names_get_a_new_one(self):
+        first = self.save('same.txt', b'one')
+        second = self.save('same.txt', b'two')
+        self.assertNotEqual(first, second)
+        self.assertEqual(Blob.objects.count(), 2)
+
+    def test_blob_released_between_check_and_link_is_put_back(self):
+        self.save('kept.txt')
+        digest = Blob.objects.get().digest
+        default_storage.delete('kept.txt')
+        blob_path = default_storage.blob_path(digest)
+        self.assertFalse(os.path.exists(blob_path))
+
+        # The first check still sees the blob another request is about to remove
+        exists = os.path.exists
+        seen = []
+
+        def stale_exists(path):
+            if path == blob_path and not seen:
+                seen.append(path)
+                return True
+            return exists(path)
+
+        with mock.patch.object(dedup.os.path, 'exists', stale_exists):
+            name = self.save('again.txt')
+
+        self.assertTrue(seen)
+        with default_storage.open(name) as f:
+            self.assertEqual(f.read(), b'same bytes')
+        self.assertEqual(Blob.objects.get().refcount, 1)
+        self.assertEqual(os.listdir(default_storage.path(os.path.join(dedup.BLOB_DIR, 'tmp'))), [])
+
+
+class StoredFileSignalTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('uploader', password='x')
+
+    def create_book(self, data=b'%PDF-1.4 book'):
+        book = Book(title='A Book', author='Someone', description='', uploaded_by=self.user)
+        book.file.save('book.pdf', ContentFile(data), save=False)
+        book.save()
+        return book
+
+    def test_deleting_a_row_releases_its_files(self):
+        book = self.create_book()
+        name = book.file.name
+        with self.captureOnCommitCallbacks(execute=True):
+            book.delete()
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(default_storage.exists(name))
+
+    def test_replacing_a_file_releases_the_old_one(self):
+        book = self.create_book()
+        old = book.file.name
+        book = Book.objects.get(pk=book.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            book.file.save('new.pdf', ContentFile(b'%PDF-1.4 new edition'))
+        self.assertFalse(StoredFile.objects.filter(name=old).exists())
+        self.assertEqual(list(StoredFile.objects.values_list('name', flat=True)), [book.file.name])
+
+    def test_clearing_a_file_releases_it(self):
+        resource = Resource(title='Notes', description='', uploaded_by=self.user)
+        resource.file.save('notes.txt', ContentFile(b'notes'), save=False)
+        resource.save()
+        resource.file = None
+        with self.captureOnCommitCallbacks(execute=True):
+            resource.save()
+        self.assertFalse(StoredFile.objects.exists())
+
+    def test_saves_of_other_fields_leave_files_alone(self):
+        book = self.create_book()
+        book.title = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            book.save()
+            Book.objects.get(pk=book.pk).save(update_fields=['views'])
+        self.assertEqual(callbacks, [])
+        self.assertTrue(StoredFile.objects.filter(name=book.file.name).exists())
+
+    def test_image_renditions_go_with_their_source(self):
+        from PIL import Image
+
+        image = BytesIO()
+        Image.new('RGB', (640, 320), 'teal').save(image, 'PNG')
+        book = self.create_book()
+        book.cover_image.save('cover.png', ContentFile(image.getvalue()))
+        source = book.cover_image.name
+        derived = [
+            name for entry in generate_derivatives(source).renditions.values()
+            for name in (entry.get('webp'), entry.get('fallback')) if name
+        ]
+        self.assertTrue(derived)
+
+        book = Book.objects.get(pk=book.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            book.delete()
+
+        self.assertFalse(ImageDerivatives.objects.exists())
+        self.assertFalse(StoredFile.objects.exists())
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(any(default_storage.exists(name) for name in derived))
+
+    def test_shared_content_survives_one_deletion(self):
+        first = self.create_book()
+        second = self.create_book()
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        blob = Blob.objects.get()
+        self.assertEqual(blob.refcount, 1)
+        with second.file.open() as f:
+            self.assertEqual(f.read(), b'%PDF-1.4 book')
+
+
+def image_bytes(size, mode='RGB', fmt='PNG'):
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.new(mode, size, (20, 120, 200, 128) if mode == 'RGBA' else (20, 120, 200)).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+class ImageDerivativeTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('illustrator', password='x')
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def cover(self, data):
+        book = Book(title='Covered', author='A', description='d', uploaded_by=self.user)
+        book.cover_image.save('cover.png', ContentFile(data))
+        return book
+
+    def open_image(self, name):
+        from PIL import Image
+
+        with default_storage.open(name) as f:
+            image = Image.open(BytesIO(f.read()))
+            image.load()
+        return image
+
+    def test_saving_an_image_queues_its_renditions_once(self):
+        book = self.cover(image_bytes((800, 400)))
+        book.save()
+        job = Job.objects.get(name='core.tasks.build_image_derivatives')
+        self.assertEqual(job.args, [book.cover_image.name])
+
+    def test_renditions_are_resized_and_keep_their_shape(self):
+        source = self.cover(image_bytes((800, 400))).cover_image.name
+        renditions = generate_derivatives(source).renditions
+
+        self.assertEqual({name: (e['width'], e['height']) for name, e in renditions.items()}, {
+            'thumb': (160, 160), 'card': (480, 240), 'full': (800, 400),
+        })
+        card = renditions['card']
+        self.assertTrue(card['fallback'].endswith('.card.jpg'))
+        self.assertEqual(self.open_image(card['fallback']).size, (480, 240))
+        if 'webp' in card:
+            self.assertEqual(self.open_image(card['webp']).format, 'WEBP')
+
+    def test_transparent_images_fall_back_to_png(self):
+        source = self.cover(image_bytes((300, 300), 'RGBA')).cover_image.name
+        fallback = generate_derivatives(source).renditions['thumb']['fallback']
+        self.assertTrue(fallback.endswith('.thumb.png'))
+        self.assertEqual(self.open_image(fallback).mode, 'RGBA')
+
+    def test_regenerating_unchanged_content_does_nothing(self):
+        source = self.cover(image_bytes((640, 480))).cover_image.name
+        manifest = generate_derivatives(source)
+        files = StoredFile.objects.count()
+        with self.assertNumQueries(1):
+            self.assertEqual(generate_derivatives(source).pk, manifest.pk)
+        self.assertEqual(StoredFile.objects.count(), files)
+
+    def test_picture_tag_switches_to_renditions_once_generated(self):
+        book = self.cover(image_bytes((800, 400)))
+        template = Template("{% load image_tags %}{% picture book.cover_image 'card' alt='Cover' %}")
+
+        before = template.render(Context({'book': book}))
+        self.assertIn(f'src="{book.cover_image.url}"', before)
+        self.assertEqual(get_renditions(book.cover_image.name), {})
+
+        generate_derivatives(book.cover_image.name)
+        after = template.render(Context({'book': book}))
+        self.assertIn('width="480" height="240"', after)
+        self.assertIn('.card.jpg', after)
+        self.assertNotIn(f'src="{book.cover_image.url}"', after)
+
+
+@mock.patch.object(counters.threading, 'Timer')
+class CounterBufferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reader', password='x')
+        cls.books = [
+            Book.objects.create(title=f'Book {n}', author='A', description='', uploaded_by=cls.user)
+            for n in range(3)
+        ]
+
+    def setUp(self):
+        counters._pending.clear()
+        counters._timer = None
+        self.addCleanup(counters._pending.clear)
+        self.addCleanup(setattr, counters, '_timer', None)
+
+    def views(self):
+        return list(Book.objects.order_by('pk').values_list('views', flat=True))
+
+    def test_increments_are_buffered_then_written_together(self, Timer):
+        first, second, third = self.books
+        counters.bump(first, 'views')
+        counters.bump(first, 'views')
+        counters.bump(second, 'views', 2)
+        counters.bump(third, 'views')
+        self.assertEqual(self.views(), [0, 0, 0])
+
+        with self.assertNumQueries(2):
+            self.assertEqual(counters.flush(), 3)
+        self.assertEqual(self.views(), [2, 2, 1])
+        self.assertFalse(counters._pending)
+
+    def test_first_increment_starts_one_flush_timer(self, Timer):
+        counters.bump(self.books[0], 'views')
+        counters.bump(self.books[1], 'views')
+        Timer.assert_called_once_with(counters.FLUSH_INTERVAL, counters._flush_in_background)
+        Timer.return_value.start.assert_called_once_with()
+
+    def test_failed_updates_keep_their_increments(self, Timer):
+        first, second, third = self.books
+        counters.bump(first, 'views')
+        counters.bump(second, 'views', 2)
+        counters.bump(third, 'downloads', 5)
+
+        update = QuerySet.update
+        calls = []
+
+        def flaky_update(queryset, **kwargs):
+            calls.append(kwargs)
+            if len(calls) == 2:
+                raise DatabaseError('database is locked')
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', flaky_update):
+            with self.assertRaises(DatabaseError):
+                counters.flush()
+
+        # The first UPDATE went through; the one that failed and the one after it are pending again
+        self.assertEqual(sum(self.views()), 1)
+        self.assertEqual(len(counters._pending), 2)
+        self.assertEqual(counters.flush(), 2)
+        self.assertEqual(self.views(), [1, 2, 0])
+        self.assertEqual(Book.objects.get(pk=third.pk).downloads, 5)
+
+
+def slow_sample(calls=1, ms=300.0, sql='SELECT 1', view='blog:list'):
+    return {
+        'calls': calls, 'total_ms': ms * calls, 'max_ms': ms, 'rows': calls,
+        'sql': sql, 'view': view, 'call_site': 'blog/views.py:10 in get', 'template': '',
+    }
+
+
+class SlowQueryFlushTests(TestCase):
+    def setUp(self):
+        querylog._pending.clear()
+        self.addCleanup(querylog._pending.clear)
+
+    def test_samples_add_up_on_their_fingerprint_row(self):
+        querylog._pending['SELECT ?'] = slow_sample(calls=2)
+        self.assertEqual(querylog.flush(), 1)
+        querylog._pending['SELECT ?'] = slow_sample(calls=1, ms=500.0)
+        querylog.flush()
+
+        row = SlowQuery.objects.get()
+        self.assertEqual((row.calls, row.total_ms, row.max_ms, row.rows), (3, 1100.0, 500.0, 3))
+
+    def test_row_created_by_another_process_meanwhile_is_added_to(self):
+        querylog._pending['SELECT ?'] = slow_sample()
+        querylog.flush()
+
+        # The other process's INSERT lands between our UPDATE (finding nothing) and our INSERT
+        update = QuerySet.update
+        calls = []
+
+        def update_missing_the_row(queryset, **kwargs):
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else update(queryset, **kwargs)
+
+        querylog._pending['SELECT ?'] = slow_sample(calls=4)
+        with mock.patch.object(QuerySet, 'update', update_missing_the_row):
+            querylog.flush()
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(SlowQuery.objects.get().calls, 5)
+
+    def test_in_lists_of_any_length_share_a_row(self):
+        for placeholders in ['%s', '%s, %s, %s', '%(a)s, %(b)s']:
+            shape = querylog.fingerprint(f'SELECT * FROM "books_book" WHERE "books_book"."id" IN ({placeholders})')
+            querylog._pending[shape] = slow_sample()
+            querylog.flush()
+
+        row = SlowQuery.objects.get()
+        self.assertEqual(row.fingerprint, 'SELECT * FROM "books_book" WHERE "books_book"."id" IN (...)')
+        self.assertEqual(row.calls, 3)
+
+    def test_failed_flush_keeps_unwritten_samples(self):
+        for n in range(3):
+            querylog._pending[f'SELECT {n}'] = slow_sample(sql=f'SELECT {n}')
+        write = querylog._write
+
+        def failing_write(shape, entry, now):
+            if shape == 'SELECT 1':
+                # A sample noted by another thread while this flush runs
+                querylog._pending['SELECT 1'] = slow_sample(calls=2, ms=900.0, view='books:list')
+                raise DatabaseError('database is locked')
+            write(shape, entry, now)
+
+        with mock.patch.object(querylog, '_write', failing_write):
+            with self.assertRaises(DatabaseError):
+                querylog.flush()
+
+        self.assertEqual(SlowQuery.objects.count(), 1)
+        self.assertEqual(set(querylog._pending), {'SELECT 1', 'SELECT 2'})
+        merged = querylog._pending['SELECT 1']
+        self.assertEqual((merged['calls'], merged['max_ms'], merged['view']), (3, 900.0, 'books:list'))
+
+        querylog.flush()
+        self.assertEqual(SlowQuery.objects.count(), 3)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, metrics_dir, ignore_errors=True)
+        for name, value in [('METRICS_DIR', metrics_dir), ('_process_file', None)]:
+            patcher = mock.patch.object(metrics, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        saved = dict(metrics.UPLOAD_BYTES.values)
+        metrics.UPLOAD_BYTES.values.clear()
+        self.addCleanup(metrics.UPLOAD_BYTES.values.update, saved)
+
+    def uploaded_bytes(self):
+        return metrics.collect()['upload_bytes_total']['samples'][()]
+
+    def test_recycled_pid_does_not_overwrite_the_dead_workers_file(self):
+        with mock.patch.object(metrics.os, 'getpid', return_value=4242):
+            metrics.UPLOAD_BYTES.inc(100)
+            metrics.dump()
+            # A new worker that was given the same pid
+            metrics.UPLOAD_BYTES.values.clear()
+            metrics._process_file = None
+            metrics.UPLOAD_BYTES.inc(5)
+            metrics.dump()
+        self.assertEqual(len(os.listdir(metrics.METRICS_DIR)), 2)
+
+        with mock.patch.object(metrics, 'process_alive', return_value=True):
+            self.assertEqual(self.uploaded_bytes(), 100 + 5 + 5)
+
+    def test_exited_workers_are_archived(self):
+        with mock.patch.object(metrics.os, 'getpid', return_value=4242):
+            metrics.UPLOAD_BYTES.inc(100)
+            metrics.dump()
+        metrics.UPLOAD_BYTES.values.clear()
+
+        with mock.patch.object(metrics, 'process_alive', side_effect=lambda pid: pid != 4242):
+            self.assertEqual(self.uploaded_bytes(), 100)
+            self.assertEqual(self.uploaded_bytes(), 100)
+        self.assertTrue(os.path.exists(os.path.join(metrics.METRICS_DIR, 'archive.json')))
+
+    @override_settings(DEBUG=False, METRICS_TOKEN='', METRICS_ALLOWED_IPS=['127.0.0.1'])
+    def test_address_alone_is_not_enough_outside_debug(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    @override_settings(DEBUG=False, METRICS_TOKEN='s3cret', METRICS_ALLOWED_IPS=['127.0.0.1'])
+    def test_scrapes_need_the_bearer_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 404)
+        self.assertEqual(
+            self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret', REMOTE_ADDR='10.0.0.9').status_code, 404,
+        )
+
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer s3cret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'# TYPE http_request_duration_seconds histogram', response.content)
+
+    @override_settings(DEBUG=True, METRICS_TOKEN='', METRICS_ALLOWED_IPS=['127.0.0.1'])
+    def test_debug_runs_go_by_address(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.9').status_code, 404)
+
+
+class SQLiteProfileTests(TestCase):
+    def wrapper(self, **options):
+        from .sqlite.base import DatabaseWrapper
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        settings_dict = {
+            **connections['default'].settings_dict, 'ENGINE': 'core.sqlite',
+            'NAME': os.path.join(directory, 'profile.sqlite3'), 'OPTIONS': options,
+        }
+        wrapper = DatabaseWrapper(settings_dict, alias='profile')
+        self.addCleanup(wrapper.close)
+        wrapper.force_debug_cursor = True
+        return wrapper
+
+    def begin(self, wrapper):
+        wrapper.ensure_connection()
+        wrapper._start_transaction_under_autocommit()
+        wrapper.connection.rollback()
+        return wrapper.queries_log[-1]['sql']
+
+    def test_write_transactions_take_the_lock_up_front(self):
+        wrapper = self.wrapper(pragmas={'cache_size': -1000})
+        self.assertEqual(self.begin(wrapper), 'BEGIN IMMEDIATE')
+        with wrapper.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -1000)
+
+    def test_transaction_mode_option_is_honoured(self):
+        self.assertEqual(self.begin(self.wrapper(transaction_mode='DEFERRED')), 'BEGIN DEFERRED')
+        self.assertEqual(self.begin(self.wrapper(transaction_mode=None)), 'BEGIN')
+
+    def test_native_transaction_mode_is_left_to_django(self):
+        from .sqlite import base
+
+        def native_params(wrapper):
+            # What Django 5.1+ does with the option before the profile sees the params
+            params = {**wrapper.settings_dict['OPTIONS'], 'database': wrapper.settings_dict['NAME']}
+            mode = params.pop('transaction_mode', None)
+            wrapper.transaction_mode = mode.upper() if mode else None
+            return params
+
+        with mock.patch.object(base, 'NATIVE_TRANSACTION_MODE', True), \
+                mock.patch.object(base.base.DatabaseWrapper, 'get_connection_params', native_params):
+            for options, mode in [({}, 'IMMEDIATE'), ({'transaction_mode': 'deferred'}, 'DEFERRED')]:
+                wrapper = self.wrapper(**options)
+                params = wrapper.get_connection_params()
+                self.assertNotIn('transaction_mode', params)
+                self.assertEqual(wrapper.transaction_mode, mode)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_PIN_SECONDS=7)
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.PrimaryReplicaRouter()
+        for var in (routers._pinned, routers._wrote):
+            self.addCleanup(var.reset, var.set(False))
+
+    def serve(self, method='get', cookies=None, writes=False):
+        """Run a request through the middleware; returns the response and where the view read from."""
+        reads = []
+
+        def view(request):
+            reads.append(self.router.db_for_read(Book))
+            if writes:
+                self.router.db_for_write(Book)
+                reads.append(self.router.db_for_read(Book))
+            return HttpResponse()
+
+        request = getattr(RequestFactory(), method)('/')
+        request.COOKIES.update(cookies or {})
+        return PrimaryReplicaMiddleware(view)(request), reads
+
+    def test_reads_go_to_the_replica_until_the_first_write(self):
+        self.assertEqual(self.router.db_for_read(Book), 'replica')
+        self.assertEqual(self.router.db_for_write(Book), 'default')
+        self.assertEqual(self.router.db_for_read(Book), 'default')
+
+    def test_queue_and_session_state_is_always_read_from_the_primary(self):
+        self.assertEqual(self.router.db_for_read(Job), 'default')
+        self.assertEqual(self.router.db_for_read(Session), 'default')
+        with routers.use_primary():
+            self.assertEqual(self.router.db_for_read(Book), 'default')
+        self.assertEqual(self.router.db_for_read(Book), 'replica')
+
+    def test_reads_inside_a_transaction_see_its_rows(self):
+        with mock.patch.object(connections['default'], 'in_atomic_block', True):
+            self.assertEqual(self.router.db_for_read(Book), 'default')
+
+    def test_a_write_pins_the_session_to_the_primary_for_a_while(self):
+        response, reads = self.serve()
+        self.assertEqual(reads, ['replica'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+        response, reads = self.serve('post', writes=True)
+        self.assertEqual(reads, ['default', 'default'])
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 7)
+
+        _, reads = self.serve(cookies={PIN_COOKIE: '1'})
+        self.assertEqual(reads, ['default'])
+        # The pin belongs to the request; this thread reads from the replica again
+        self.assertEqual(self.router.db_for_read(Book), 'replica')
+
+    def test_replicas_are_not_migrated(self):
+        self.assertIs(self.router.allow_migrate('replica', 'books'), False)
+        self.assertIsNone(self.router.allow_migrate('default', 'books'))
+
+
+class SiteStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        Goal.objects.create(user=cls.admin, title='Done', status='completed')
+        Goal.objects.create(user=cls.admin, title='Open')
+        BlogPost.objects.create(author=cls.admin, title='Live', content='c', excerpt='e', status='published')
+        BlogPost.objects.create(author=cls.admin, title='Draft', content='c', excerpt='e')
+
+    def dashboard(self):
+        self.client.force_login(self.admin)
+        return self.client.get(reverse('trackmyjourney_admin:index')).context
+
+    def test_snapshot_counts_and_daily_series(self):
+        stats = get_site_stats()
+        expected = {'total_users': 1, 'total_goals': 2, 'completed_goals': 1, 'total_posts': 2, 'published_posts': 1}
+        self.assertEqual({key: stats.counts[key] for key in expected}, expected)
+        for series in ('signups', 'posts'):
+            self.assertEqual(len(stats.daily[series]), SERIES_DAYS)
+        self.assertEqual(stats.daily['posts'][-1], [timezone.localdate().isoformat(), 2])
+        self.assertEqual(sum(count for _, count in stats.daily['signups']), 1)
+
+    def test_dashboard_reads_the_snapshot_until_it_is_refreshed(self):
+        from .tasks import refresh_site_stats
+
+        self.assertEqual(self.dashboard()['total_users'], 1)
+        User.objects.create_user('newcomer', 'newcomer@example.com', 'x')
+        with self.assertNumQueries(1):
+            get_site_stats()
+        context = self.dashboard()
+        self.assertEqual(context['total_users'], 1)
+        self.assertEqual(context['daily_stats'][0]['posts'], 2)
+
+        refresh_site_stats.func()
+        self.assertEqual(SiteStats.objects.get().counts['total_users'], 2)
+        self.assertEqual(self.dashboard()['total_users'], 2)
+
+
+class AdminChangelistTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        cls.readers = [User.objects.create_user(f'reader{n}', f'reader{n}@example.com', 'x') for n in range(3)]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def post(self, likes=0):
+        post = BlogPost.objects.create(author=self.admin, title='Post', content='c', excerpt='e')
+        post.likes.add(*self.readers[:likes])
+        return post
+
+    def changelist(self, model):
+        url = reverse(f'trackmyjourney_admin:{model._meta.app_label}_{model._meta.model_name}_changelist')
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl'], len(queries)
+
+    def test_like_columns_cost_no_query_per_row(self):
+        self.post(likes=2)
+        # The first request also loads per-process state (content types and the like)
+        self.changelist(BlogPost)
+        _, few = self.changelist(BlogPost)
+        for likes in range(4):
+            self.post(likes=min(likes, 3))
+        cl, many = self.changelist(BlogPost)
+
+        self.assertEqual(many, few)
+        self.assertEqual(sorted(post.like_count for post in cl.result_list), [0, 1, 2, 2, 3])
+
+    def test_big_unfiltered_tables_are_counted_from_statistics(self):
+        from .tasks import analyze_database
+
+        post = self.post()
+        for n in range(5):
+            Comment.objects.create(post=post, author=self.admin, content=f'comment {n}')
+        analyze_database.func()
+        Comment.objects.create(post=post, author=self.admin, content='since the last ANALYZE', is_approved=False)
+
+        with mock.patch('core.paginator.ESTIMATE_THRESHOLD', 5):
+            self.assertEqual(EstimatedCountPaginator(Comment.objects.all(), 10).count, 5)
+            self.assertEqual(EstimatedCountPaginator(Comment.objects.filter(is_approved=False), 10).count, 1)
+            cl, _ = self.changelist(Comment)
+        self.assertEqual(cl.result_count, 5)
+        self.assertEqual(EstimatedCountPaginator(Comment.objects.all(), 10).count, 6)
+
+    def test_inlines_edit_only_the_newest_rows(self):
+        post = self.post()
+        comments = [Comment.objects.create(post=post, author=self.admin, content=f'comment {n}') for n in range(25)]
+        response = self.client.get(reverse('trackmyjourney_admin:blog_blogpost_change', args=[post.pk]))
+
+        formset = response.context['inline_admin_formsets'][0].formset
+        self.assertEqual([form.instance.pk for form in formset.forms], [c.pk for c in reversed(comments[-20:])])
@@ -0,0 +1,141 @@
+from django.apps import apps
+from django.core.paginator import Paginator
+from django.db.models import CharField, F, Q, Value
+from django.db.models.functions import Concat, Substr
+from django.db.models.signals import post_delete
+
+from .models import MAX_THREAD_DEPTH, PATH_SEPARATOR, ThreadedComment, path_segment
+
+# First character sorting after the separator: ``path < prefix[:-1] + SUBTREE_END``
+# bounds a subtree with an index-friendly range instead of LIKE 'prefix%'.
+SUBTREE_END = chr(ord(PATH_SEPARATOR) + 1)
+
+
+def subtree_q(paths):
+    """Q matching every comment whose path starts with one of ``paths``."""
+    q = Q(pk__in=[])
+    for path in paths:
+        q |= Q(path__gte=path, path__lt=path[:-1] + SUBTREE_END)
+    return q
+
+
+def build_tree(comments):
+    """
+    Link path-ordered comments into a tree and return the top-level ones.
+
+    Every comment gets a ``thread_replies`` list. Replies whose parent is not
+    in ``comments`` (e.g. filtered out as unapproved) are dropped together
+    with their own replies.
+    """
+    by_id = {}
+    roots = []
+    for comment in comments:
+        comment.thread_replies = []
+        if comment.parent_id is None:
+            roots.append(comment)
+        elif comment.parent_id in by_id:
+            by_id[comment.parent_id].thread_replies.append(comment)
+        else:
+            continue
+        by_id[comment.pk] = comment
+    return roots
+
+
+def load_thread(queryset):
+    """Load every comment in ``queryset`` in a single ordered query and return the roots."""
+    return build_tree(queryset.order_by('path'))
+
+
+def paginate_threads(queryset, page_number, per_page=20):
+    """
+    Paginate top-level comments and prefetch their complete subtrees.
+
+    ``page.object_list`` holds the roots of the requested page, each with
+    ``thread_replies`` populated. Costs a COUNT, one query for the page's
+    root paths and one query for all of their subtrees.
+    """
+    root_paths = queryset.filter(parent__isnull=True).order_by('path').values_list('path', flat=True)
+    page = Paginator(root_paths, per_page).get_page(page_number)
+    paths = list(page.object_list)
+    page.object_list = load_thread(queryset.filter(subtree_q(paths))) if paths else []
+    return page
+
+
+def rebuild_thread_paths(model):
+    """
+    Recompute path, depth and reply_count for every row of ``model``.
+
+    Repairs threads whose parents were changed without going through save().
+    The data migrations that first filled these columns carry their own copy.
+    """
+    manager = model._default_manager
+    parents = dict(manager.values_list('pk', 'parent_id'))
+    children = {}
+    for pk, parent_id in sorted(parents.items()):
+        children.setdefault(parent_id, []).append(pk)
+
+    rows = {}
+    stack = [(pk, None, 0, '') for pk in reversed(children.get(None, []))]
+    while stack:
+        pk, parent_id, depth, parent_path = stack.pop()
+        if depth >= MAX_THREAD_DEPTH:
+            # Legacy threads deeper than a path can hold are lifted one level
+            parent_id = rows[parent_id].parent_id
+            depth -= 1
+            parent_path = rows[parent_id].path if parent_id else ''
+        obj = model(pk=pk, parent_id=parent_id, depth=depth, path=parent_path + path_segment(pk))
+        rows[pk] = obj
+        for child in reversed(children.get(pk, [])):
+            stack.append((child, pk, depth + 1, obj.path))
+
+    for obj in rows.values():
+        obj.reply_count = 0
+    for obj in rows.values():
+        if obj.parent_id:
+            rows[obj.parent_id].reply_count += 1
+    manager.bulk_update(rows.values(), ['parent', 'path', 'depth', 'reply_count'], batch_size=500)
+    return len(rows)
+
+
+def lift_replies(model, pks):
+    """
+    Re-attach the replies of comments ``pks``, which are about to be deleted,
+    to those comments' own parents so the parent FK doesn't cascade into them.
+
+    Each moved subtree keeps its order; its paths lose the deleted comment's
+    segment and its depths go down by one. Returns the number of replies moved.
+    """
+    manager = model._base_manager
+    doomed = set(pks)
+    lifting = set(manager.filter(parent_id__in=doomed).exclude(pk__in=doomed).values_list('parent_id', flat=True))
+    moved = 0
+    # Deepest first, so replies lifted onto another doomed comment are lifted again with it
+    for pk, parent_id, path in manager.filter(pk__in=doomed).order_by('-depth').values_list('pk', 'parent_id', 'path'):
+        if pk not in lifting:
+            continue
+        manager.filter(subtree_q([path])).exclude(pk=pk).update(
+            path=Concat(Value(path[:-len(path_segment(pk))]), Substr('path', len(path) + 1), output_field=CharField()),
+            depth=F('depth') - 1,
+        )
+        count = manager.filter(parent_id=pk).exclude(pk__in=doomed).update(parent_id=parent_id)
+        if parent_id:
+            manager.filter(pk=parent_id).update(reply_count=F('reply_count') + count)
+            if parent_id in doomed:
+                lifting.add(parent_id)
+        moved += count
+    return moved
+
+
+def _decrement_reply_count(sender, instance, **kwargs):
+    if instance.parent_id:
+        sender._default_manager.filter(pk=instance.parent_id, reply_count__gt=0).update(
+            reply_count=F('reply_count') - 1
+        )
+
+
+def connect_thread_signals():
+    for model in apps.get_models():
+        if issubclass(model, ThreadedComment):
+            post_delete.connect(
+                _decrement_reply_count, sender=model, dispatch_uid=f'thread_reply_count_{model._meta.label}'
+            )
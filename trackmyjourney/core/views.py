@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.db.models import Count, Min
+from django.http import Http404, HttpResponse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_safe
+
+from . import metrics
+
+
+def job_queue_families():
+    """Ready job counts and the wait of the oldest ready job per queue, read at scrape time (one query)."""
+    from jobs.models import Job
+
+    now = timezone.now()
+    ready = (
+        Job.objects.filter(status='queued', run_at__lte=now)
+        .values_list('queue')
+        .annotate(total=Count('pk'), oldest=Min('run_at'))
+    )
+    families = {
+        'jobs_ready': {'kind': 'gauge', 'documentation': 'Queued jobs due to run', 'labels': ['queue'], 'samples': {}},
+        'jobs_queue_lag_seconds': {
+            'kind': 'gauge', 'documentation': 'How long the oldest due job has been waiting',
+            'labels': ['queue'], 'samples': {},
+        },
+    }
+    for queue, total, oldest in ready:
+        families['jobs_ready']['samples'][(queue,)] = total
+        families['jobs_queue_lag_seconds']['samples'][(queue,)] = (now - oldest).total_seconds()
+    return families
+
+
+def metrics_allowed(request):
+    """
+    True for a scrape from METRICS_ALLOWED_IPS (None allows any address) that
+    sends ``Authorization: Bearer <METRICS_TOKEN>``.
+
+    Behind a reverse proxy on the same host every request comes from
+    127.0.0.1, so the address alone only suffices when DEBUG is on.
+    """
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+    if allowed_ips is not None and request.META.get('REMOTE_ADDR') not in allowed_ips:
+        return False
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        return settings.DEBUG
+    scheme, _, given = request.headers.get('Authorization', '').partition(' ')
+    return scheme.lower() == 'bearer' and constant_time_compare(given.strip(), token)
+
+
+@require_safe
+def metrics_view(request):
+    """All processes' metrics in the Prometheus text format; see ``metrics_allowed`` for who gets them."""
+    if not metrics_allowed(request):
+        raise Http404
+    families = {**metrics.collect(), **job_queue_families()}
+    return HttpResponse(metrics.render(families), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:44
+
+from django.db import migrations, models
+
+# Frozen copies of core.models' path layout at the time of this migration
+PATH_SEGMENT_WIDTH = 10
+PATH_SEPARATOR = '/'
+MAX_THREAD_DEPTH = 255 // (PATH_SEGMENT_WIDTH + 1)
+
+
+def backfill_thread_paths(apps, schema_editor):
+    Comment = apps.get_model('groups', 'GroupPostComment')
+    parents = dict(Comment.objects.values_list('pk', 'parent_id'))
+    children = {}
+    for pk, parent_id in sorted(parents.items()):
+        children.setdefault(parent_id, []).append(pk)
+
+    rows = {}
+    stack = [(pk, None, 0, '') for pk in reversed(children.get(None, []))]
+    while stack:
+        pk, parent_id, depth, parent_path = stack.pop()
+        if depth >= MAX_THREAD_DEPTH:
+            # Legacy threads deeper than a path can hold are lifted one level
+            parent_id = rows[parent_id].parent_id
+            depth -= 1
+            parent_path = rows[parent_id].path if parent_id else ''
+        path = f'{parent_path}{pk:0{PATH_SEGMENT_WIDTH}d}{PATH_SEPARATOR}'
+        rows[pk] = Comment(pk=pk, parent_id=parent_id, depth=depth, path=path, reply_count=0)
+        for child in reversed(children.get(pk, [])):
+            stack.append((child, pk, depth + 1, path))
+
+    for comment in rows.values():
+        if comment.parent_id:
+            rows[comment.parent_id].reply_count += 1
+    Comment.objects.bulk_update(rows.values(), ['parent', 'path', 'depth', 'reply_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='grouppostcomment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='grouppostcomment',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='grouppostcomment',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='grouppostcomment',
+            index=models.Index(fields=['post', 'path'], name='groups_grou_post_id_1cf3b2_idx'),
+        ),
+        migrations.RunPython(backfill_thread_paths, migrations.RunPython.noop),
+    ]
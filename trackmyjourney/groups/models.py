@@ -1,7 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from django.utils.text import slugify
+from core.models import ThreadedComment
+from core.slugs import save_with_unique_slug
 
 User = get_user_model()
 
@@ -74,14 +75,10 @@ class Group(models.Model):
         return reverse('groups:detail', kwargs={'slug': self.slug})
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = slugify(self.name)
-            original_slug = self.slug
-            counter = 1
-            while Group.objects.filter(slug=self.slug).exists():
-                self.slug = f"{original_slug}-{counter}"
-                counter += 1
-        super().save(*args, **kwargs)
+        if self.slug:
+            super().save(*args, **kwargs)
+        else:
+            save_with_unique_slug(self, self.name, super().save, *args, **kwargs)
     
     def get_members(self):
         return GroupMembership.objects.filter(group=self, status='active')
@@ -163,7 +160,7 @@ class GroupPost(models.Model):
     def total_likes(self):
         return self.likes.count()
 
-class GroupPostComment(models.Model):
+class GroupPostComment(ThreadedComment):
     post = models.ForeignKey(GroupPost, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     content = models.TextField()
@@ -173,6 +170,9 @@ class GroupPostComment(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['post', 'path']),
+        ]
 
     def __str__(self):
         return f"Comment by {self.author.username} on {self.post.title}"
@@ -1,3 +1,46 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-# Create your tests here.
+from core.slugs import SUFFIX_LENGTH, next_free_slug
+from .models import Group
+
+User = get_user_model()
+
+
+class GroupSlugTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.creator = User.objects.create_user('creator', password='x')
+
+    def create(self, name):
+        return Group.objects.create(name=name, description='', creator=self.creator)
+
+    def test_duplicates_get_numbered_suffixes(self):
+        slugs = [self.create('Weekend Readers').slug for _ in range(4)]
+        self.assertEqual(slugs, ['weekend-readers', 'weekend-readers-1', 'weekend-readers-2', 'weekend-readers-3'])
+
+    def test_long_names_keep_getting_unique_slugs(self):
+        max_length = Group._meta.get_field('slug').max_length
+        slugs = [self.create('z' * max_length).slug for _ in range(12)]
+
+        self.assertEqual(len(set(slugs)), 12)
+        self.assertTrue(all(len(slug) <= max_length for slug in slugs))
+        stem = 'z' * (max_length - SUFFIX_LENGTH)
+        self.assertEqual(slugs[0], 'z' * max_length)
+        self.assertEqual(slugs[1:3], [f'{stem}-1', f'{stem}-2'])
+        self.assertEqual(slugs[-1], f'{stem}-11')
+
+    def test_numbers_in_a_name_are_not_taken_as_suffixes(self):
+        self.assertEqual(self.create('Slugcheck 2024').slug, 'slugcheck-2024')
+        self.assertEqual(self.create('Slugcheck').slug, 'slugcheck')
+        self.assertEqual(self.create('Slugcheck').slug, 'slugcheck-1')
+
+    def test_suffix_skips_names_that_look_like_suffixes(self):
+        self.create('Slugcheck')
+        self.create('Slugcheck 1')
+        self.assertEqual(next_free_slug(Group, 'slugcheck'), 'slugcheck-2')
+
+    def test_freed_suffixes_are_reused(self):
+        groups = [self.create('Book Club') for _ in range(3)]
+        groups[1].delete()
+        self.assertEqual(self.create('Book Club').slug, 'book-club-1')
@@ -5,7 +5,8 @@ from django.contrib import messages
 from django.views.generic import ListView, DetailView, CreateView, UpdateView
 from django.urls import reverse_lazy
 from django.http import JsonResponse
-from django.db.models import Q
+from django.db.models import Max, OuterRef, Q, Subquery
+from core.conditional import ConditionalDetailMixin, related_aggregate
 from .models import Group, GroupMembership, GroupPost, GroupPostComment
 from .forms import GroupForm, GroupPostForm, GroupPostCommentForm
 
@@ -57,11 +58,25 @@ class MyGroupsView(LoginRequiredMixin, ListView):
         user_memberships = GroupMembership.objects.filter(user=self.request.user, status='active')
         return Group.objects.filter(id__in=user_memberships.values_list('group_id', flat=True))
 
-class GroupDetailView(DetailView):
+class GroupDetailView(ConditionalDetailMixin, DetailView):
     model = Group
     template_name = 'groups/group_detail.html'
     context_object_name = 'group'
 
+    def get_versions(self):
+        versions = {
+            'posts': related_aggregate(GroupPost.objects.filter(is_approved=True), 'group'),
+            'post_updated': related_aggregate(GroupPost.objects.all(), 'group', Max('updated_at')),
+            'post_likes': related_aggregate(GroupPost.likes.through.objects.all(), 'grouppost__group'),
+            'members': related_aggregate(GroupMembership.objects.filter(status='active'), 'group'),
+            'member_joined': related_aggregate(GroupMembership.objects.all(), 'group', Max('joined_at')),
+        }
+        if self.request.user.is_authenticated:
+            membership = GroupMembership.objects.filter(group=OuterRef('pk'), user=self.request.user)
+            versions['membership'] = Subquery(membership.values('status')[:1])
+            versions['role'] = Subquery(membership.values('role')[:1])
+        return versions
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['posts'] = self.object.posts.filter(is_approved=True)[:10]
@@ -46,6 +46,11 @@ class HomePageSettings(models.Model):
         settings, created = cls.objects.get_or_create(pk=1)
         return settings
 
+    @classmethod
+    async def aget_settings(cls):
+        settings, created = await cls.objects.aget_or_create(pk=1)
+        return settings
+
 class FakePost(models.Model):
     """Fake posts for demo purposes until you integrate with real blog"""
     title = models.CharField(max_length=200)
@@ -1,9 +1,10 @@
 from django.urls import path
+from core.asyncviews import served
 from . import views
 
 app_name = 'homepage'
 
 urlpatterns = [
-    path('', views.home, name='home'),
+    path('', served(views.home, views.home_async), name='home'),
     #path('contact/', views.contact, name='contact'),
 ]
@@ -1,8 +1,12 @@
+import asyncio
+
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.http import JsonResponse
+from django.template.response import TemplateResponse
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
+from core.asyncviews import alist
 from .models import ContactMessage, HomePageSettings, FakePost
 import json
 
@@ -21,6 +25,20 @@ def home(request):
     
     return render(request, 'home.html', context)
 
+async def home_async(request):
+    """Homepage view for ASGI; both queries go through the async ORM together"""
+    settings, recent_posts = await asyncio.gather(
+        HomePageSettings.aget_settings(),
+        alist(FakePost.objects.all()[:6]),
+    )
+
+    context = {
+        'settings': settings,
+        'recent_posts': recent_posts,
+    }
+
+    return TemplateResponse(request, 'home.html', context)
+
 @require_POST
 def contact(request):
     """Handle contact form submission"""
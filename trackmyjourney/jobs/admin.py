@@ -0,0 +1,13 @@
+from django.contrib import admin
+from .models import Job, PeriodicTaskState
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'queue', 'priority', 'status', 'attempts', 'run_at', 'finished_at')
+    list_filter = ('status', 'queue', 'name')
+    search_fields = ('name', 'unique_key')
+    readonly_fields = ('created_at', 'finished_at', 'locked_by', 'locked_at', 'last_error')
+
+@admin.register(PeriodicTaskState)
+class PeriodicTaskStateAdmin(admin.ModelAdmin):
+    list_display = ('name', 'next_run_at', 'last_run_at')
@@ -0,0 +1,58 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.worker import Worker, run_worker_process
+
+
+class Command(BaseCommand):
+    help = 'Run background job workers backed by the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Number of worker processes')
+        parser.add_argument('--queue', action='append', dest='queues', help='Only run jobs from this queue (repeatable)')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when no job is due')
+        parser.add_argument('--burst', action='store_true', help='Exit once no jobs are due')
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        queues = options['queues'] or []
+        poll_interval = options['poll_interval']
+        burst = options['burst']
+
+        if processes == 1:
+            worker = Worker(queues, poll_interval)
+            signal.signal(signal.SIGTERM, lambda *args: worker.stop_event.set())
+            try:
+                worker.run(burst=burst)
+            except KeyboardInterrupt:
+                pass
+            return
+
+        # Children must not inherit open database connections
+        connections.close_all()
+        context = multiprocessing.get_context()
+        stop_event = context.Event()
+        signal.signal(signal.SIGTERM, lambda *args: stop_event.set())
+        workers = [
+            context.Process(
+                target=run_worker_process,
+                args=(queues, poll_interval, burst, stop_event),
+                name=f'job-worker-{index}',
+            )
+            for index in range(processes)
+        ]
+        for process in workers:
+            process.start()
+        self.stdout.write(self.style.SUCCESS(f'Started {processes} worker processes'))
+
+        try:
+            for process in workers:
+                process.join()
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping workers after their current job...')
+            stop_event.set()
+            for process in workers:
+                process.join()
@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+
+
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=200)
+    queue = models.CharField(max_length=50, default='default')
+    priority = models.SmallIntegerField(default=0, help_text="Higher runs first")
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    unique_key = models.CharField(max_length=200, blank=True, help_text="Coalesces identical queued jobs")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-priority', 'run_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'queue', 'run_at']),
+            models.Index(fields=['name', 'unique_key', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+    @classmethod
+    def enqueue(cls, task, args=(), kwargs=None, run_at=None, delay=None, priority=None, unique_key=''):
+        if run_at is None:
+            run_at = timezone.now()
+        if delay is not None:
+            run_at += delay if isinstance(delay, timedelta) else timedelta(seconds=delay)
+
+        if getattr(settings, 'JOBS_RUN_INLINE', False):
+            # No worker in this environment: run right after the caller commits
+            transaction.on_commit(lambda: task(*args, **(kwargs or {})))
+            return None
+
+        if unique_key:
+            pending = cls.objects.filter(name=task.name, unique_key=unique_key, status='queued').first()
+            if pending is not None:
+                return pending
+
+        return cls.objects.create(
+            name=task.name,
+            queue=task.queue,
+            priority=task.priority if priority is None else priority,
+            args=list(args),
+            kwargs=kwargs or {},
+            unique_key=unique_key,
+            max_attempts=task.max_attempts,
+            run_at=run_at,
+        )
+
+
+class PeriodicTaskState(models.Model):
+    """When each periodic task is next due; advanced with a conditional UPDATE so only one worker enqueues it."""
+    name = models.CharField(max_length=200, unique=True)
+    next_run_at = models.DateTimeField()
+    last_run_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.name
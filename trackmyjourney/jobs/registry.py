@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+_tasks = {}
+_periodic = {}
+
+
+class Task:
+    """A function that can be run now or enqueued for a worker."""
+
+    def __init__(self, func, name, queue='default', priority=0, max_attempts=5, backoff=30):
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f'<Task {self.name}>'
+
+    def enqueue(self, *args, run_at=None, delay=None, priority=None, unique_key='', **kwargs):
+        """
+        Store a job for this task; arguments must be JSON-serializable.
+
+        The job row is part of the current transaction, so it only becomes
+        visible to workers if the surrounding work commits.
+        """
+        from .models import Job
+        return Job.enqueue(
+            self, args, kwargs,
+            run_at=run_at, delay=delay, priority=priority, unique_key=unique_key,
+        )
+
+
+def task(func=None, *, name=None, queue='default', priority=0, max_attempts=5, backoff=30):
+    """
+    Register ``func`` as a background task.
+
+    Usable bare (``@task``) or with options. ``priority`` is higher-first;
+    failed runs are retried up to ``max_attempts`` times with exponential
+    backoff starting at ``backoff`` seconds.
+    """
+    def register(func):
+        task_name = name or f'{func.__module__}.{func.__qualname__}'
+        registered = Task(func, task_name, queue, priority, max_attempts, backoff)
+        _tasks[task_name] = registered
+        return registered
+
+    if func is not None:
+        return register(func)
+    return register
+
+
+def periodic_task(every, **options):
+    """Register a task that workers enqueue once per ``every`` (a timedelta or seconds)."""
+    if not isinstance(every, timedelta):
+        every = timedelta(seconds=every)
+
+    def register(func):
+        registered = task(func, **options)
+        _periodic[registered.name] = every
+        return registered
+    return register
+
+
+def get_task(name):
+    return _tasks[name]
+
+
+def periodic_tasks():
+    return dict(_periodic)
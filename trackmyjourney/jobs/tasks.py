@@ -0,0 +1,14 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Job
+from .registry import periodic_task
+
+
+@periodic_task(every=timedelta(days=1), priority=-10)
+def purge_finished_jobs():
+    """Delete finished jobs older than JOBS_KEEP_FINISHED (default 7 days)."""
+    keep = getattr(settings, 'JOBS_KEEP_FINISHED', timedelta(days=7))
+    Job.objects.filter(status='done', finished_at__lt=timezone.now() - keep).delete()
@@ -0,0 +1,163 @@
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Job, PeriodicTaskState
+from .registry import periodic_tasks, task
+from .worker import Worker
+
+calls = []
+
+
+@task(name='jobs.tests.record', max_attempts=3, backoff=10)
+def record(value):
+    calls.append(value)
+
+
+@task(name='jobs.tests.explode', max_attempts=3, backoff=10)
+def explode():
+    raise RuntimeError('boom')
+
+
+# close_old_connections() would close the test transaction's connection
+@mock.patch('jobs.worker.close_old_connections')
+class WorkerTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_coalesces_on_unique_key(self, close):
+        first = record.enqueue(1, unique_key='same')
+        self.assertEqual(record.enqueue(2, unique_key='same'), first)
+        record.enqueue(3)
+        self.assertEqual(Job.objects.count(), 2)
+
+    @override_settings(JOBS_RUN_INLINE=True)
+    def test_inline_jobs_run_when_the_caller_commits(self, close):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(record.enqueue('inline'))
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, ['inline'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_claims_due_jobs_by_priority_then_age(self, close):
+        low = record.enqueue('low')
+        high = record.enqueue('high', priority=5)
+        record.enqueue('later', delay=60)
+        worker = Worker()
+
+        claimed = worker.claim()
+        self.assertEqual(claimed.pk, high.pk)
+        self.assertEqual((claimed.status, claimed.attempts, claimed.locked_by), ('running', 1, worker.name))
+        self.assertEqual(Worker().claim().pk, low.pk)
+        self.assertIsNone(Worker().claim())
+
+    def test_workers_only_claim_their_queues(self, close):
+        job = record.enqueue('x')
+        self.assertIsNone(Worker(queues=['media']).claim())
+        self.assertEqual(Worker(queues=['default']).claim().pk, job.pk)
+
+    def test_successful_job_is_done(self, close):
+        job = record.enqueue('ok')
+        Worker().run(burst=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.last_error), ('done', ''))
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(calls, ['ok'])
+
+    def test_failures_back_off_exponentially_then_fail(self, close):
+        job = explode.enqueue()
+        worker = Worker()
+        for attempt, backoff in [(1, 10), (2, 20)]:
+            before = timezone.now()
+            with self.assertLogs('jobs.worker', 'WARNING'):
+                worker.execute(worker.claim())
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('queued', attempt))
+            self.assertIn('RuntimeError: boom', job.last_error)
+            delay = (job.run_at - before).total_seconds()
+            self.assertTrue(backoff * 0.8 - 1 <= delay <= backoff * 1.2 + 1, delay)
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+
+        with self.assertLogs('jobs.worker', 'WARNING'):
+            worker.execute(worker.claim())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 3))
+        self.assertIsNone(worker.claim())
+
+    def test_unknown_task_fails_at_once(self, close):
+        job = Job.objects.create(name='jobs.tests.gone')
+        worker = Worker()
+        worker.execute(worker.claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('Unknown task', job.last_error)
+
+    def test_jobs_of_lost_workers_are_requeued_or_failed(self, close):
+        long_ago = timezone.now() - timedelta(hours=2)
+        retry = Job.objects.create(name=record.name, status='running', attempts=1, locked_at=long_ago, locked_by='x')
+        spent = Job.objects.create(
+            name=record.name, status='running', attempts=3, max_attempts=3, locked_at=long_ago, locked_by='x',
+        )
+        busy = Job.objects.create(name=record.name, status='running', attempts=1, locked_at=timezone.now())
+
+        Worker().recover_stale()
+        statuses = dict(Job.objects.values_list('pk', 'status'))
+        self.assertEqual(
+            [statuses[retry.pk], statuses[spent.pk], statuses[busy.pk]], ['queued', 'failed', 'running'],
+        )
+
+    def test_running_jobs_keep_their_lock_while_they_beat(self, close):
+        Job.enqueue(record, args=['slow'])
+        worker = Worker()
+        job = worker.claim()
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=2))
+
+        worker.heartbeat(job)
+        worker.recover_stale()
+        self.assertEqual(Job.objects.get(pk=job.pk).status, 'running')
+
+    def test_heartbeat_runs_until_the_job_ends(self, close):
+        Job.enqueue(record, args=['beat'])
+        worker = Worker()
+        job = worker.claim()
+        beats = []
+        with mock.patch('jobs.worker.HEARTBEAT_INTERVAL', 0.01), \
+                mock.patch('jobs.worker.connection'), \
+                mock.patch.object(Worker, 'heartbeat', lambda self, job: beats.append(job.pk)), \
+                mock.patch.object(record, 'func', side_effect=lambda value: time.sleep(0.1)):
+            worker.execute(job)
+            count = len(beats)
+            time.sleep(0.05)
+
+        self.assertGreater(count, 0)
+        self.assertEqual(len(beats), count)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, 'done')
+
+    def test_periodic_tasks_are_enqueued_once_per_period(self, close):
+        Worker().schedule_periodic()
+        Worker().schedule_periodic()
+        names = list(Job.objects.values_list('name', flat=True))
+        self.assertEqual(sorted(names), sorted(periodic_tasks()))
+
+        # Once due again, the next round is enqueued (the last one has run)
+        Job.objects.update(status='done')
+        PeriodicTaskState.objects.update(next_run_at=timezone.now() - timedelta(seconds=1))
+        Worker().schedule_periodic()
+        self.assertEqual(Job.objects.filter(status='queued').count(), len(periodic_tasks()))
+
+    def test_only_one_of_two_racing_schedulers_enqueues(self, close):
+        name = next(iter(periodic_tasks()))
+        now = timezone.now()
+        PeriodicTaskState.objects.create(name=name, next_run_at=now)
+        stale_state = PeriodicTaskState.objects.get(name=name)
+
+        Worker().schedule_periodic()
+        # Already run, so unique_key coalescing can't hide a second enqueue
+        Job.objects.update(status='done')
+        # The other worker read the state before the first advanced it
+        with mock.patch.object(PeriodicTaskState.objects, 'get_or_create', return_value=(stale_state, False)):
+            Worker().schedule_periodic()
+        self.assertEqual(Job.objects.filter(name=name).count(), 1)
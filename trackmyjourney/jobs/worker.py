@@ -0,0 +1,180 @@
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job, PeriodicTaskState
+from .registry import get_task, periodic_tasks
+
+logger = logging.getLogger(__name__)
+
+LOCK_TIMEOUT = getattr(settings, 'JOBS_LOCK_TIMEOUT', timedelta(minutes=30))
+# Seconds between locked_at refreshes of a running job; must stay well under LOCK_TIMEOUT
+HEARTBEAT_INTERVAL = getattr(settings, 'JOBS_HEARTBEAT_INTERVAL', 60)
+MAX_BACKOFF = getattr(settings, 'JOBS_MAX_BACKOFF', 3600)
+SCHEDULER_INTERVAL = getattr(settings, 'JOBS_SCHEDULER_INTERVAL', 10)
+
+
+class Worker:
+    """Claims due jobs from the database and runs them one at a time."""
+
+    def __init__(self, queues=None, poll_interval=1.0, stop_event=None):
+        self.queues = queues or []
+        self.poll_interval = poll_interval
+        self.stop_event = stop_event or threading.Event()
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self._next_housekeeping = 0
+
+    def run(self, burst=False):
+        """Work until stopped; with ``burst`` return as soon as nothing is due."""
+        logger.info('Worker %s started (queues: %s)', self.name, ', '.join(self.queues) or 'all')
+        while not self.stop_event.is_set():
+            if time.monotonic() >= self._next_housekeeping:
+                self.housekeeping()
+                self._next_housekeeping = time.monotonic() + SCHEDULER_INTERVAL
+
+            job = self.claim()
+            if job is None:
+                if burst:
+                    break
+                close_old_connections()
+                self.stop_event.wait(self.poll_interval)
+                continue
+            self.execute(job)
+        logger.info('Worker %s stopped', self.name)
+
+    def due_jobs(self):
+        queryset = Job.objects.filter(status='queued', run_at__lte=timezone.now())
+        if self.queues:
+            queryset = queryset.filter(queue__in=self.queues)
+        return queryset.order_by('-priority', 'run_at', 'id')
+
+    def claim(self):
+        claim_fields = {
+            'status': 'running',
+            'locked_by': self.name,
+            'locked_at': timezone.now(),
+            'attempts': F('attempts') + 1,
+        }
+        if connection.features.has_select_for_update_skip_locked:
+            with transaction.atomic():
+                job_id = self.due_jobs().select_for_update(skip_locked=True).values_list('pk', flat=True).first()
+                if job_id is None:
+                    return None
+                Job.objects.filter(pk=job_id).update(**claim_fields)
+            return Job.objects.get(pk=job_id)
+
+        # No SKIP LOCKED (SQLite): claim optimistically; losing a race just
+        # means another worker got that job, so try the next candidate.
+        for job_id in self.due_jobs().values_list('pk', flat=True)[:10]:
+            if Job.objects.filter(pk=job_id, status='queued').update(**claim_fields):
+                return Job.objects.get(pk=job_id)
+        return None
+
+    def execute(self, job):
+        try:
+            task = get_task(job.name)
+        except KeyError:
+            self.finish(job, 'failed', f'Unknown task {job.name!r}')
+            return
+
+        started = time.monotonic()
+        beating = self.start_heartbeat(job)
+        try:
+            task.func(*job.args, **job.kwargs)
+        except Exception:
+            error = traceback.format_exc()
+            logger.warning('Job %s failed (attempt %s/%s)', job, job.attempts, job.max_attempts)
+            if job.attempts >= job.max_attempts:
+                self.finish(job, 'failed', error)
+            else:
+                backoff = min(task.backoff * 2 ** (job.attempts - 1), MAX_BACKOFF)
+                retry_at = timezone.now() + timedelta(seconds=backoff * random.uniform(0.8, 1.2))
+                Job.objects.filter(pk=job.pk).update(
+                    status='queued', run_at=retry_at, locked_by='', locked_at=None, last_error=error
+                )
+        else:
+            logger.debug('Job %s done in %.3fs', job, time.monotonic() - started)
+            self.finish(job, 'done', '')
+        finally:
+            beating.set()
+            close_old_connections()
+
+    def start_heartbeat(self, job):
+        """
+        Refresh ``job``'s lock from a background thread while it runs, so
+        recover_stale() only takes jobs whose worker stopped beating, however
+        long they run. Set the returned event to stop.
+        """
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(HEARTBEAT_INTERVAL):
+                try:
+                    self.heartbeat(job)
+                except DatabaseError:
+                    logger.warning('Heartbeat for job %s failed', job, exc_info=True)
+                finally:
+                    connection.close()
+
+        threading.Thread(target=beat, name=f'job-{job.pk}-heartbeat', daemon=True).start()
+        return stop
+
+    def heartbeat(self, job):
+        Job.objects.filter(pk=job.pk, status='running', locked_by=self.name).update(locked_at=timezone.now())
+
+    def finish(self, job, status, error):
+        Job.objects.filter(pk=job.pk).update(
+            status=status, finished_at=timezone.now(), locked_by='', locked_at=None, last_error=error
+        )
+
+    def housekeeping(self):
+        self.recover_stale()
+        self.schedule_periodic()
+
+    def recover_stale(self):
+        """Requeue jobs whose worker died mid-run, seen by a lock with no heartbeat for LOCK_TIMEOUT (or fail them if out of attempts)."""
+        cutoff = timezone.now() - LOCK_TIMEOUT
+        stale = Job.objects.filter(status='running', locked_at__lt=cutoff)
+        stale.filter(attempts__gte=F('max_attempts')).update(
+            status='failed', finished_at=timezone.now(), locked_by='', last_error='Worker lost while running'
+        )
+        stale.update(status='queued', locked_by='', locked_at=None, last_error='Worker lost while running')
+
+    def schedule_periodic(self):
+        now = timezone.now()
+        for name, every in periodic_tasks().items():
+            state, _ = PeriodicTaskState.objects.get_or_create(name=name, defaults={'next_run_at': now})
+            if state.next_run_at > now:
+                continue
+            with transaction.atomic():
+                # Only the worker whose conditional update wins enqueues this round
+                advanced = PeriodicTaskState.objects.filter(
+                    pk=state.pk, next_run_at=state.next_run_at
+                ).update(next_run_at=now + every, last_run_at=now)
+                if advanced:
+                    get_task(name).enqueue(unique_key='periodic')
+
+
+def run_worker_process(queues, poll_interval, burst, stop_event):
+    """Entry point for ``run_workers`` child processes."""
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+    # Ctrl-C reaches the whole process group; let the parent coordinate shutdown
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *args: stop_event.set())
+    connection.close()
+    Worker(queues, poll_interval, stop_event).run(burst=burst)
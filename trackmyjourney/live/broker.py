@@ -0,0 +1,192 @@
+import asyncio
+import json
+import logging
+import socket
+import threading
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# Events a slow client may fall behind by before newer ones are dropped for it
+QUEUE_SIZE = 100
+RELAY_RETRY_SECONDS = 2
+
+
+def broker_address():
+    """``(host, port)`` of the optional local broker (``LIVE_BROKER_URL = 'tcp://127.0.0.1:8765'``), or None."""
+    url = getattr(settings, 'LIVE_BROKER_URL', '')
+    if not url:
+        return None
+    parts = urlsplit(url)
+    return parts.hostname or '127.0.0.1', parts.port or 8765
+
+
+class Subscription:
+    """One SSE client's queue of events for a set of channels; lives on the event loop that created it."""
+
+    def __init__(self, channels):
+        self.channels = frozenset(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def deliver(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+
+
+class Hub:
+    """
+    In-process pub/sub.
+
+    ``dispatch`` may be called from any thread (sync views and signal
+    handlers run in worker threads under ASGI); events are handed to each
+    subscriber's event loop with ``call_soon_threadsafe``.
+    """
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channels):
+        subscription = Subscription(channels)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscriptions.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[channel]
+
+    def dispatch(self, event):
+        with self._lock:
+            subscribers = list(self._subscriptions.get(event['channel'], ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The loop has shut down; the subscription goes with it
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscriptions.values())
+
+
+hub = Hub()
+
+
+class BrokerPublisher:
+    """Sends events to the local broker over one persistent connection per thread."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _connect(self, address):
+        connection = socket.create_connection(address, timeout=2)
+        connection.sendall(b'PUB\n')
+        return connection
+
+    def send(self, address, event):
+        line = json.dumps(event, separators=(',', ':')).encode() + b'\n'
+        for attempt in range(2):
+            connection = getattr(self._local, 'connection', None)
+            try:
+                if connection is None:
+                    connection = self._local.connection = self._connect(address)
+                connection.sendall(line)
+                return True
+            except OSError:
+                if connection is not None:
+                    connection.close()
+                self._local.connection = None
+        logger.warning('Live broker at %s:%s unreachable; dropped %s event', *address, event['type'])
+        return False
+
+
+_publisher = BrokerPublisher()
+
+
+def publish(channel, event_type, data):
+    """Send an event to every subscriber of ``channel``, in this process or, with a broker, in all of them."""
+    event = {'channel': channel, 'type': event_type, 'data': data}
+    address = broker_address()
+    if address is None:
+        hub.dispatch(event)
+    else:
+        _publisher.send(address, event)
+
+
+def publish_on_commit(channel, event_type, data):
+    transaction.on_commit(lambda: publish(channel, event_type, data))
+
+
+_relays = {}
+
+
+async def _relay(address):
+    """Feed events from the broker into this process's hub, reconnecting as needed."""
+    while True:
+        try:
+            reader, writer = await asyncio.open_connection(*address)
+            writer.write(b'SUB\n')
+            await writer.drain()
+            while line := await reader.readline():
+                try:
+                    hub.dispatch(json.loads(line))
+                except (ValueError, KeyError):
+                    continue
+        except OSError:
+            pass
+        await asyncio.sleep(RELAY_RETRY_SECONDS)
+
+
+def ensure_relay():
+    """Start the broker relay on the running event loop once (no-op without LIVE_BROKER_URL)."""
+    address = broker_address()
+    if address is None:
+        return
+    loop = asyncio.get_running_loop()
+    task = _relays.get(loop)
+    if task is None or task.done():
+        _relays[loop] = loop.create_task(_relay(address))
+
+
+async def serve_broker(host, port):
+    """
+    A small stand-in for a real message broker: lines from ``PUB``
+    connections are copied to every ``SUB`` connection.
+    """
+    subscribers = set()
+
+    async def handle(reader, writer):
+        role = (await reader.readline()).strip()
+        try:
+            if role == b'SUB':
+                subscribers.add(writer)
+                await reader.read()
+            elif role == b'PUB':
+                while line := await reader.readline():
+                    for subscriber in list(subscribers):
+                        try:
+                            subscriber.write(line)
+                        except (ConnectionError, RuntimeError):
+                            subscribers.discard(subscriber)
+        finally:
+            subscribers.discard(writer)
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    async with server:
+        await server.serve_forever()
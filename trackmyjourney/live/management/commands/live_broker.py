@@ -0,0 +1,21 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from live.broker import broker_address, serve_broker
+
+
+class Command(BaseCommand):
+    help = 'Run the local pub/sub broker that fans live events out to every ASGI process'
+
+    def add_arguments(self, parser):
+        host, port = broker_address() or ('127.0.0.1', 8765)
+        parser.add_argument('--host', default=host)
+        parser.add_argument('--port', type=int, default=port)
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f"Live broker listening on {options['host']}:{options['port']}"))
+        try:
+            asyncio.run(serve_broker(options['host'], options['port']))
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,129 @@
+import threading
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from blog.models import BlogPost, Comment as BlogComment
+from community.models import Comment as CommunityComment, Post as CommunityPost, PostLike
+from groups.models import GroupPost
+from .broker import publish, publish_on_commit
+
+_scheduled = threading.local()
+
+
+def channel_name(model, pk):
+    return f'{model._meta.label}:{pk}'
+
+
+def blog_post_counts(post_id):
+    approved = BlogComment.objects.filter(post_id=post_id, is_approved=True)
+    return {
+        'likes': BlogPost.likes.through.objects.filter(blogpost_id=post_id).count(),
+        'comments': approved.count(),
+        'threads': approved.filter(parent__isnull=True).count(),
+    }
+
+
+def community_post_counts(post_id):
+    return {
+        'likes': PostLike.objects.filter(post_id=post_id).count(),
+        'comments': CommunityComment.objects.filter(post_id=post_id).count(),
+    }
+
+
+def group_post_counts(post_id):
+    return {'likes': GroupPost.likes.through.objects.filter(grouppost_id=post_id).count()}
+
+
+def schedule_counts(model, post_id, counter):
+    """
+    Publish fresh counts for one object after the transaction commits.
+
+    Repeated changes in one transaction (a bulk delete, say) are coalesced
+    into a single recount.
+    """
+    connection = transaction.get_connection()
+    pending = getattr(_scheduled, 'channels', None)
+    if pending is None or not connection.run_on_commit:
+        # Nothing is waiting for a commit, so anything left over was rolled back
+        pending = _scheduled.channels = set()
+    channel = channel_name(model, post_id)
+    if channel in pending:
+        return
+    pending.add(channel)
+
+    def send():
+        pending.discard(channel)
+        publish(channel, 'counts', counter(post_id))
+
+    transaction.on_commit(send)
+
+
+def comment_payload(comment):
+    return {
+        'id': comment.pk,
+        'parent': comment.parent_id,
+        'author': comment.author.get_username(),
+        'excerpt': comment.content[:200],
+    }
+
+
+@receiver(post_save, sender=BlogComment)
+def blog_comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created and instance.is_approved:
+        publish_on_commit(channel_name(BlogPost, instance.post_id), 'comment', comment_payload(instance))
+    schedule_counts(BlogPost, instance.post_id, blog_post_counts)
+
+
+@receiver(post_delete, sender=BlogComment)
+def blog_comment_deleted(sender, instance, **kwargs):
+    schedule_counts(BlogPost, instance.post_id, blog_post_counts)
+
+
+@receiver(m2m_changed, sender=BlogPost.likes.through)
+def blog_likes_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    for post_id in (pk_set or ()) if reverse else [instance.pk]:
+        schedule_counts(BlogPost, post_id, blog_post_counts)
+
+
+@receiver(post_save, sender=CommunityComment)
+def community_comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    publish_on_commit(channel_name(CommunityPost, instance.post_id), 'comment', comment_payload(instance))
+    schedule_counts(CommunityPost, instance.post_id, community_post_counts)
+
+
+@receiver(post_delete, sender=CommunityComment)
+@receiver(post_delete, sender=PostLike)
+def community_child_deleted(sender, instance, **kwargs):
+    schedule_counts(CommunityPost, instance.post_id, community_post_counts)
+
+
+@receiver(post_save, sender=PostLike)
+def community_like_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        schedule_counts(CommunityPost, instance.post_id, community_post_counts)
+
+
+@receiver(post_save, sender=GroupPost)
+def group_post_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.is_approved:
+        publish_on_commit(channel_name(type(instance.group), instance.group_id), 'post', {
+            'id': instance.pk,
+            'title': instance.title,
+            'author': instance.author.get_username(),
+        })
+
+
+@receiver(m2m_changed, sender=GroupPost.likes.through)
+def group_post_likes_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    for post_id in (pk_set or ()) if reverse else [instance.pk]:
+        schedule_counts(GroupPost, post_id, group_post_counts)
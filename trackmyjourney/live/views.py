@@ -0,0 +1,91 @@
+import asyncio
+import json
+import time
+
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+
+from blog.models import BlogPost
+from community.models import Post as CommunityPost
+from groups.models import Group, GroupPost
+from .broker import ensure_relay, hub
+
+MAX_CHANNELS = 50
+HEARTBEAT_SECONDS = 15
+# Connections are closed after this long; EventSource reconnects on its own
+MAX_LIFETIME_SECONDS = 300
+RETRY_MILLISECONDS = 5000
+
+# Channels a page may subscribe to, and the objects behind them anyone may watch
+SUBSCRIBABLE = {
+    'blog.BlogPost': BlogPost.objects.filter(status='published'),
+    'community.Post': CommunityPost.objects.all(),
+    'groups.Group': Group.objects.filter(is_active=True),
+    'groups.GroupPost': GroupPost.objects.filter(is_approved=True, group__is_active=True),
+}
+
+
+def _parse_channels(values):
+    """Group ``<label>:<pk>`` channel names by label, ignoring anything malformed."""
+    wanted = {}
+    for value in values[:MAX_CHANNELS]:
+        label, _, pk = value.partition(':')
+        if label in SUBSCRIBABLE and pk.isdigit():
+            wanted.setdefault(label, set()).add(int(pk))
+    return wanted
+
+
+async def _visible_channels(wanted):
+    async def visible(label, pks):
+        found = SUBSCRIBABLE[label].filter(pk__in=pks).values_list('pk', flat=True)
+        return [f'{label}:{pk}' async for pk in found]
+
+    results = await asyncio.gather(*(visible(label, pks) for label, pks in wanted.items()))
+    return [channel for channels in results for channel in channels]
+
+
+def _format(event_type, data):
+    return f'event: {event_type}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'
+
+
+async def _stream(channels):
+    ensure_relay()
+    subscription = hub.subscribe(channels)
+    deadline = time.monotonic() + MAX_LIFETIME_SECONDS
+    try:
+        yield f'retry: {RETRY_MILLISECONDS}\n\n'
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), min(HEARTBEAT_SECONDS, remaining))
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection
+                yield ': ping\n\n'
+                continue
+            yield _format(event['type'], {'channel': event['channel'], **event['data']})
+    finally:
+        hub.unsubscribe(subscription)
+
+
+async def events(request):
+    """
+    Server-Sent Events for like/comment counts and new comments on the
+    objects named by the ``channel`` parameters (``blog.BlogPost:5``, ...).
+
+    Each open stream holds a connection for minutes, so this only runs
+    under ASGI where it costs a coroutine rather than a worker thread.
+    """
+    # require_safe only learns to wrap coroutines in Django 5.0
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Live updates need the ASGI server'}, status=501)
+
+    channels = await _visible_channels(_parse_channels(request.GET.getlist('channel')))
+    if not channels:
+        return JsonResponse({'error': 'No channels to follow'}, status=400)
+
+    response = StreamingHttpResponse(_stream(channels), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,7 +1,8 @@
 from django import forms
+from uploads.forms import ChunkedUploadFormMixin
 from .models import Resource, ResourceComment, ResourceRating
 
-class ResourceForm(forms.ModelForm):
+class ResourceForm(ChunkedUploadFormMixin, forms.ModelForm):
     class Meta:
         model = Resource
         fields = ['title', 'description', 'category', 'resource_type', 'file', 'url', 'thumbnail', 'tags', 'is_public', 'is_featured']
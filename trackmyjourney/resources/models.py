@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from core.counters import bump
 import os
 
 User = get_user_model()
@@ -62,8 +63,7 @@ class Resource(models.Model):
         return reverse('resources:detail', kwargs={'pk': self.pk})
 
     def increment_views(self):
-        self.views += 1
-        self.save(update_fields=['views'])
+        bump(self, 'views')
 
     @property
     def file_extension(self):
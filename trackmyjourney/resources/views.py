@@ -4,11 +4,14 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy
-from django.http import HttpResponse, Http404, JsonResponse
-from django.db.models import Q
+from django.http import FileResponse, Http404, JsonResponse
+from django.db.models import Max, Q, Sum
 from django.utils import timezone
 import json
 
+from core.conditional import ConditionalDetailMixin, related_aggregate
+from core.metrics import DOWNLOAD_BYTES
+
 # Import your models
 from .models import Resource, ResourceComment, ResourceRating, ResourceLike, ResourceBookmark
 
@@ -45,15 +48,23 @@ class ResourceListView(ListView):
         context['search_query'] = self.request.GET.get('search', '')
         return context
 
-class ResourceDetailView(DetailView):
+class ResourceDetailView(ConditionalDetailMixin, DetailView):
     model = Resource
     template_name = 'resources/resource_detail.html'
     context_object_name = 'resource'
 
-    def get_object(self, queryset=None):
-        obj = super().get_object(queryset=queryset)
-        obj.increment_views()
-        return obj
+    def get_versions(self):
+        return {
+            'comments': related_aggregate(ResourceComment.objects.all(), 'resource'),
+            'comment_created': related_aggregate(ResourceComment.objects.all(), 'resource', Max('created_at')),
+            'ratings': related_aggregate(ResourceRating.objects.all(), 'resource'),
+            'rating_total': related_aggregate(ResourceRating.objects.all(), 'resource', Sum('rating')),
+            'likes': related_aggregate(ResourceLike.objects.all(), 'resource'),
+            'bookmarks': related_aggregate(ResourceBookmark.objects.all(), 'resource'),
+        }
+
+    def count_view(self):
+        self.object.increment_views()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -72,6 +83,11 @@ class ResourceCreateView(LoginRequiredMixin, CreateView):
     form_class = ResourceForm # Use the imported form
     template_name = 'resources/resource_form.html'
 
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+
     def form_valid(self, form):
         form.instance.uploaded_by = self.request.user
         messages.success(self.request, 'Resource uploaded successfully!')
@@ -82,6 +98,11 @@ class ResourceUpdateView(LoginRequiredMixin, UpdateView):
     form_class = ResourceForm # Use the imported form
     template_name = 'resources/resource_form.html'
 
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+
     def get_queryset(self):
         return Resource.objects.filter(uploaded_by=self.request.user)
 
@@ -107,7 +128,8 @@ def download_resource(request, pk):
     if resource.file:
         resource.downloads += 1
         resource.save(update_fields=['downloads'])
-        response = HttpResponse(resource.file.read(), content_type='application/octet-stream')
+        DOWNLOAD_BYTES.inc(resource.file.size, kind='resource')
+        response = FileResponse(resource.file.open('rb'), content_type='application/octet-stream')
         response['Content-Disposition'] = f'attachment; filename="{resource.file.name}"'
         return response
     messages.error(request, 'No file available for download.')
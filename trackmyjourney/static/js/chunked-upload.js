@@ -0,0 +1,121 @@
+// TrackMyJourney - chunked, resumable file uploads
+//
+// File inputs with a data-chunked-upload attribute are sent in chunks to the
+// uploads endpoints as soon as a file is picked. Each chunk carries its
+// SHA-256, an interrupted upload resumes from the server's offset, and the
+// finished session token goes into the form's hidden upload_token field.
+
+(() => {
+  const csrfToken = () => {
+    const input = document.querySelector("[name=csrfmiddlewaretoken]")
+    return input ? input.value : ""
+  }
+
+  const hex = (buffer) => Array.from(new Uint8Array(buffer), (b) => b.toString(16).padStart(2, "0")).join("")
+
+  const storageKey = (file) => `chunked-upload:${file.name}:${file.size}:${file.lastModified}`
+
+  async function request(url, options = {}) {
+    const headers = Object.assign({ "X-CSRFToken": csrfToken() }, options.headers || {})
+    const response = await fetch(url, Object.assign({ credentials: "same-origin" }, options, { headers }))
+    const data = await response.json().catch(() => ({}))
+    return { ok: response.ok, status: response.status, data }
+  }
+
+  async function openSession(startUrl, file) {
+    const saved = localStorage.getItem(storageKey(file))
+    if (saved) {
+      const existing = await request(`${startUrl}${saved}/`)
+      if (existing.ok) return existing.data
+      localStorage.removeItem(storageKey(file))
+    }
+    const created = await request(startUrl, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ filename: file.name, size: file.size, content_type: file.type }),
+    })
+    if (!created.ok) throw new Error(created.data.error || "Could not start upload")
+    localStorage.setItem(storageKey(file), created.data.token)
+    return created.data
+  }
+
+  async function upload(input, file, progress) {
+    const startUrl = input.dataset.chunkedUpload
+    let session = await openSession(startUrl, file)
+    const sessionUrl = `${startUrl}${session.token}/`
+    let offset = session.offset
+    let failures = 0
+
+    while (session.status === "open" && offset < file.size) {
+      const chunk = file.slice(offset, offset + session.chunk_size)
+      const body = await chunk.arrayBuffer()
+      const digest = hex(await crypto.subtle.digest("SHA-256", body))
+      let result
+      try {
+        result = await request(`${sessionUrl}?offset=${offset}`, {
+          method: "PUT",
+          headers: { "Content-Type": "application/octet-stream", "X-Chunk-SHA256": digest },
+          body,
+        })
+      } catch (error) {
+        result = { ok: false, status: 0, data: {} }
+      }
+      if (result.ok) {
+        offset = result.data.offset
+        failures = 0
+        progress(offset / file.size)
+        continue
+      }
+      // The server tells us where to continue from; network errors retry with backoff
+      if (typeof result.data.offset === "number") offset = result.data.offset
+      if (result.status === 413 || result.status === 404 || ++failures > 5) {
+        throw new Error(result.data.error || "Upload failed")
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1000 * 2 ** failures))
+    }
+
+    const done = await request(`${sessionUrl}complete/`, { method: "POST" })
+    if (!done.ok) throw new Error(done.data.error || "Upload failed")
+    localStorage.removeItem(storageKey(file))
+    return done.data.token
+  }
+
+  function attach(input) {
+    const form = input.form
+    const tokenInput = form.querySelector(`[name="${input.dataset.tokenField}"]`)
+    const bar = document.createElement("div")
+    bar.className = "progress mt-2 d-none"
+    bar.innerHTML = '<div class="progress-bar" role="progressbar" style="width: 0%"></div>'
+    input.insertAdjacentElement("afterend", bar)
+    const submit = form.querySelectorAll("[type=submit]")
+
+    input.addEventListener("change", async () => {
+      const file = input.files[0]
+      tokenInput.value = ""
+      if (!file) return
+      submit.forEach((button) => (button.disabled = true))
+      bar.classList.remove("d-none")
+      const fill = bar.firstElementChild
+      try {
+        tokenInput.value = await upload(input, file, (fraction) => {
+          fill.style.width = `${Math.round(fraction * 100)}%`
+        })
+        fill.classList.add("bg-success")
+        fill.style.width = "100%"
+        // The file is already on the server; don't post it again with the form
+        input.value = ""
+      } catch (error) {
+        fill.classList.add("bg-danger")
+        fill.textContent = error.message
+      } finally {
+        submit.forEach((button) => (button.disabled = false))
+      }
+    })
+  }
+
+  document.addEventListener("DOMContentLoaded", () => {
+    // crypto.subtle needs a secure context; without it the plain form upload is used
+    if (!window.crypto || !crypto.subtle || !window.fetch) return
+    document.querySelectorAll("input[type=file][data-chunked-upload]").forEach(attach)
+  })
+})()
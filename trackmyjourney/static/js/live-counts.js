@@ -0,0 +1,41 @@
+// TrackMyJourney - live like/comment counts
+//
+// Elements with a data-live-channel attribute (e.g. "blog.BlogPost:5") are
+// followed over one Server-Sent Events stream. "counts" events update the
+// [data-live-count="likes|comments|threads"] elements inside them; "comment"
+// and "post" events reveal their hidden [data-live-new] notice.
+
+(() => {
+  const containers = Array.from(document.querySelectorAll("[data-live-channel]"))
+  if (!containers.length || !window.EventSource) return
+
+  const channels = Array.from(new Set(containers.map((el) => el.dataset.liveChannel)))
+  const query = channels.map((channel) => `channel=${encodeURIComponent(channel)}`).join("&")
+  const inChannel = (channel) => containers.filter((el) => el.dataset.liveChannel === channel)
+
+  const source = new EventSource(`/live/events/?${query}`)
+
+  source.addEventListener("counts", (event) => {
+    const data = JSON.parse(event.data)
+    inChannel(data.channel).forEach((container) => {
+      container.querySelectorAll("[data-live-count]").forEach((el) => {
+        const value = data[el.dataset.liveCount]
+        if (value !== undefined) el.textContent = value
+      })
+    })
+  })
+
+  const announce = (event) => {
+    const data = JSON.parse(event.data)
+    inChannel(data.channel).forEach((container) => {
+      container.querySelectorAll("[data-live-new]").forEach((el) => el.classList.remove("d-none"))
+    })
+  }
+  source.addEventListener("comment", announce)
+  source.addEventListener("post", announce)
+
+  // The stream is only served under ASGI; stop retrying if it isn't available
+  source.addEventListener("error", () => {
+    if (source.readyState === EventSource.CLOSED) source.close()
+  })
+})()
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.contrib.admin import AdminSite
+from django.db.models import Count
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
@@ -12,45 +13,51 @@ class TrackMyJourneyAdminSite(AdminSite):
     def index(self, request, extra_context=None):
         extra_context = extra_context or {}
         
-        # Add custom dashboard data
-        from django.contrib.auth import get_user_model
-        from goals.models import Goal
-        from achievements.models import Achievement
-        from blog.models import BlogPost
-        from resources.models import Resource
-        from books.models import Book
-        from groups.models import Group
-        from community.models import Community
-        
-        User = get_user_model()
+        # Dashboard numbers come from the snapshot core.tasks.refresh_site_stats keeps current
+        from core.stats import get_site_stats
         
+        stats = get_site_stats()
+        extra_context.update(stats.counts)
         extra_context.update({
-            'total_users': User.objects.count(),
-            'total_goals': Goal.objects.count(),
-            'completed_goals': Goal.objects.filter(status='completed').count(),
-            'total_achievements': Achievement.objects.count(),
-            'total_posts': BlogPost.objects.count(),
-            'published_posts': BlogPost.objects.filter(status='published').count(),
-            'total_resources': Resource.objects.count(),
-            'total_books': Book.objects.count(),
-            'total_groups': Group.objects.count(),
-            'total_communities': Community.objects.count(),
+            'stats_refreshed_at': stats.refreshed_at,
+            'daily_stats': self.daily_rows(stats.daily),
         })
         
         return super().index(request, extra_context)
 
+    def daily_rows(self, daily):
+        """Newest first, with each count also scaled to a bar width (percent of its series' busiest day)."""
+        signups, posts = daily.get('signups', []), daily.get('posts', [])
+        top_signups = max((count for day, count in signups), default=0) or 1
+        top_posts = max((count for day, count in posts), default=0) or 1
+        return [
+            {
+                'day': day, 'signups': signup_count, 'posts': post_count,
+                'signups_width': signup_count * 100 // top_signups, 'posts_width': post_count * 100 // top_posts,
+            }
+            for (day, signup_count), (_, post_count) in reversed(list(zip(signups, posts)))
+        ]
+
 admin_site = TrackMyJourneyAdminSite(name='trackmyjourney_admin')
 
 # Register all models with custom admin site
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from accounts.models import User, UserProfile
+from accounts.admin import AccountDeletionAdmin, delete_accounts_in_background
+from accounts.models import AccountDeletion, User, UserProfile
 from achievements.models import Achievement, AchievementComment
 from blog.models import BlogPost, Category as BlogCategory, Comment as BlogComment
 from books.models import Book, BookCategory, ReadingList, BookRating
+from books.admin import BookImportMixin
 from goals.models import Goal, Category as GoalCategory, Milestone, GoalUpdate
 from resources.models import Resource, ResourceComment, ResourceRating
 from groups.models import Group, GroupMembership, GroupPost, GroupPostComment
 from community.models import Community, Post, CommunityMembership, PostLike, Comment as CommunityComment
+from jobs.admin import JobAdmin, PeriodicTaskStateAdmin
+from jobs.models import Job, PeriodicTaskState
+from core.admin import BlobAdmin, ImageDerivativesAdmin, LargeTableAdmin, LatestInline, SlowQueryAdmin
+from core.models import Blob, ImageDerivatives, SlowQuery
+from uploads.admin import UploadSessionAdmin
+from uploads.models import UploadSession
 
 class UserProfileInline(admin.StackedInline):
     model = UserProfile
@@ -58,27 +65,42 @@ class UserProfileInline(admin.StackedInline):
 
 class CustomUserAdmin(BaseUserAdmin):
     inlines = (UserProfileInline,)
+    actions = [delete_accounts_in_background]
     list_display = ('username', 'email', 'first_name', 'last_name', 'is_staff', 'date_joined')
     list_filter = ('is_staff', 'is_superuser', 'is_active', 'date_joined')
     search_fields = ('username', 'first_name', 'last_name', 'email')
     ordering = ('-date_joined',)
 
 admin_site.register(User, CustomUserAdmin)
-admin_site.register(UserProfile)
+admin_site.register(UserProfile, list_select_related=('user',), raw_id_fields=('user',))
+admin_site.register(AccountDeletion, AccountDeletionAdmin)
 
-class AchievementCommentInline(admin.TabularInline):
+class AchievementCommentInline(LatestInline):
     model = AchievementComment
-    extra = 0
+    raw_id_fields = ('user',)
 
-class AchievementAdmin(admin.ModelAdmin):
+class AchievementAdmin(LargeTableAdmin):
     list_display = ('title', 'user', 'category', 'badge_type', 'date_achieved', 'is_public', 'total_likes')
     list_filter = ('category', 'badge_type', 'is_public', 'date_achieved')
+    list_select_related = ('user',)
     search_fields = ('title', 'user__username')
     date_hierarchy = 'date_achieved'
     inlines = [AchievementCommentInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(like_count=Count('likes', distinct=True))
+
+    @admin.display(description='Likes', ordering='like_count')
+    def total_likes(self, obj):
+        return obj.like_count
+
+class AchievementCommentAdmin(LargeTableAdmin):
+    list_display = ('__str__', 'created_at')
+    list_select_related = ('user', 'achievement')
+    raw_id_fields = ('user', 'achievement')
+
 admin_site.register(Achievement, AchievementAdmin)
-admin_site.register(AchievementComment)
+admin_site.register(AchievementComment, AchievementCommentAdmin)
 
 class BlogCategoryAdmin(admin.ModelAdmin):
     list_display = ('name', 'slug', 'post_count', 'is_featured')
@@ -86,21 +108,37 @@ class BlogCategoryAdmin(admin.ModelAdmin):
     search_fields = ('name',)
     prepopulated_fields = {'slug': ('name',)}
 
-class BlogCommentInline(admin.TabularInline):
+class BlogCommentInline(LatestInline):
     model = BlogComment
-    extra = 0
+    fields = ('author', 'parent', 'content', 'is_approved')
+    raw_id_fields = ('author', 'parent')
 
-class BlogPostAdmin(admin.ModelAdmin):
+class BlogPostAdmin(LargeTableAdmin):
     list_display = ('title', 'author', 'status', 'is_featured', 'views', 'total_likes', 'created_at')
     list_filter = ('status', 'is_featured', 'created_at', 'categories')
+    list_select_related = ('author',)
     search_fields = ('title', 'author__username', 'content')
     prepopulated_fields = {'slug': ('title',)}
     date_hierarchy = 'created_at'
+    raw_id_fields = ('author', 'likes', 'bookmarks')
     inlines = [BlogCommentInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(like_count=Count('likes', distinct=True))
+
+    @admin.display(description='Likes', ordering='like_count')
+    def total_likes(self, obj):
+        return obj.like_count
+
+class BlogCommentAdmin(LargeTableAdmin):
+    list_display = ('__str__', 'is_approved', 'created_at')
+    list_filter = ('is_approved',)
+    list_select_related = ('author', 'post')
+    raw_id_fields = ('post', 'author', 'parent', 'likes')
+
 admin_site.register(BlogCategory, BlogCategoryAdmin)
 admin_site.register(BlogPost, BlogPostAdmin)
-admin_site.register(BlogComment)
+admin_site.register(BlogComment, BlogCommentAdmin)
 
 class BookCategoryAdmin(admin.ModelAdmin):
     list_display = ('name', 'slug')
@@ -110,8 +148,9 @@ class BookRatingInline(admin.TabularInline):
     model = BookRating
     extra = 0
 
-class BookAdmin(admin.ModelAdmin):
+class BookAdmin(BookImportMixin, admin.ModelAdmin):
     list_display = ('title', 'author', 'uploaded_by', 'format', 'language', 'is_public', 'downloads', 'views')
+    list_select_related = ('uploaded_by',)
     list_filter = ('format', 'language', 'is_public', 'is_featured', 'uploaded_at')
     search_fields = ('title', 'author', 'isbn', 'uploaded_by__username')
     date_hierarchy = 'uploaded_at'
@@ -119,8 +158,8 @@ class BookAdmin(admin.ModelAdmin):
 
 admin_site.register(BookCategory, BookCategoryAdmin)
 admin_site.register(Book, BookAdmin)
-admin_site.register(ReadingList)
-admin_site.register(BookRating)
+admin_site.register(ReadingList, list_select_related=('user', 'book'), raw_id_fields=('user', 'book'))
+admin_site.register(BookRating, list_select_related=('user', 'book'), raw_id_fields=('user', 'book'))
 
 class GoalCategoryAdmin(admin.ModelAdmin):
     list_display = ['name']
@@ -137,6 +176,7 @@ class GoalUpdateInline(admin.TabularInline):
 
 class GoalAdmin(admin.ModelAdmin):
     list_display = ['title', 'user', 'status', 'priority', 'progress', 'target_date', 'created_at']
+    list_select_related = ['user']
     list_filter = ['status', 'priority', 'category', 'is_public', 'created_at']
     search_fields = ['title', 'description', 'user__username']
     readonly_fields = ['created_at', 'updated_at', 'completed_at']
@@ -144,30 +184,33 @@ class GoalAdmin(admin.ModelAdmin):
 
 class MilestoneAdmin(admin.ModelAdmin):
     list_display = ['title', 'goal', 'target_date', 'is_completed', 'created_at']
+    list_select_related = ['goal']
     list_filter = ['is_completed', 'target_date', 'created_at']
 
 admin_site.register(GoalCategory, GoalCategoryAdmin)
 admin_site.register(Goal, GoalAdmin)
 admin_site.register(Milestone, MilestoneAdmin)
-admin_site.register(GoalUpdate)
+admin_site.register(GoalUpdate, list_select_related=('goal', 'user'))
 
 class ResourceAdmin(admin.ModelAdmin):
     list_display = ('title', 'uploaded_by', 'category', 'resource_type', 'is_public', 'downloads', 'views', 'uploaded_at')
+    list_select_related = ('uploaded_by',)
     list_filter = ('category', 'resource_type', 'is_public', 'is_featured', 'uploaded_at')
     search_fields = ('title', 'uploaded_by__username', 'description')
     date_hierarchy = 'uploaded_at'
 
 admin_site.register(Resource, ResourceAdmin)
-admin_site.register(ResourceComment)
-admin_site.register(ResourceRating)
+admin_site.register(ResourceComment, list_select_related=('user', 'resource'), raw_id_fields=('user', 'resource'))
+admin_site.register(ResourceRating, list_select_related=('user', 'resource'), raw_id_fields=('user', 'resource'))
 
-class GroupMembershipInline(admin.TabularInline):
+class GroupMembershipInline(LatestInline):
     model = GroupMembership
-    extra = 0
+    raw_id_fields = ('user', 'invited_by')
 
-class GroupPostCommentInline(admin.TabularInline):
+class GroupPostCommentInline(LatestInline):
     model = GroupPostComment
-    extra = 0
+    fields = ('author', 'parent', 'content')
+    raw_id_fields = ('author', 'parent')
 
 class GroupPostInline(admin.TabularInline):
     model = GroupPost
@@ -175,6 +218,7 @@ class GroupPostInline(admin.TabularInline):
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('name', 'creator', 'category', 'privacy', 'member_count', 'created_at')
+    list_select_related = ('creator',)
     list_filter = ('category', 'privacy', 'is_active', 'created_at')
     search_fields = ('name', 'creator__username')
     prepopulated_fields = {'slug': ('name',)}
@@ -183,21 +227,34 @@ class GroupAdmin(admin.ModelAdmin):
 
 class GroupPostAdmin(admin.ModelAdmin):
     list_display = ('title', 'group', 'author', 'is_pinned', 'created_at')
+    list_select_related = ('group', 'author')
     list_filter = ('group', 'is_pinned', 'created_at')
     search_fields = ('title', 'author__username')
     inlines = [GroupPostCommentInline]
 
+class GroupMembershipAdmin(LargeTableAdmin):
+    list_display = ('__str__', 'status', 'joined_at')
+    list_filter = ('role', 'status')
+    list_select_related = ('user', 'group')
+    raw_id_fields = ('group', 'user', 'invited_by')
+
+class GroupPostCommentAdmin(LargeTableAdmin):
+    list_display = ('__str__', 'created_at')
+    list_select_related = ('author', 'post')
+    raw_id_fields = ('post', 'author', 'parent', 'likes')
+
 admin_site.register(Group, GroupAdmin)
-admin_site.register(GroupMembership)
+admin_site.register(GroupMembership, GroupMembershipAdmin)
 admin_site.register(GroupPost, GroupPostAdmin)
-admin_site.register(GroupPostComment)
+admin_site.register(GroupPostComment, GroupPostCommentAdmin)
 
-class PostCommentInline(admin.TabularInline):
+class PostCommentInline(LatestInline):
     model = CommunityComment
-    extra = 0
+    raw_id_fields = ('author', 'parent')
 
 class CommunityPostAdmin(admin.ModelAdmin):
     list_display = ('title', 'author', 'community', 'created_at')
+    list_select_related = ('author', 'community')
     list_filter = ('community', 'created_at')
     search_fields = ('title', 'author__username')
     inlines = [PostCommentInline]
@@ -210,6 +267,23 @@ class CommunityAdmin(admin.ModelAdmin):
 
 admin_site.register(Community, CommunityAdmin)
 admin_site.register(Post, CommunityPostAdmin)
-admin_site.register(CommunityMembership)
-admin_site.register(PostLike)
-admin_site.register(CommunityComment)
+class PostLikeAdmin(LargeTableAdmin):
+    list_display = ('user', 'post', 'created_at')
+    list_select_related = ('user', 'post')
+    raw_id_fields = ('user', 'post')
+
+class CommunityCommentAdmin(LargeTableAdmin):
+    list_display = ('__str__', 'created_at')
+    list_select_related = ('author', 'post')
+    raw_id_fields = ('post', 'author', 'parent')
+
+admin_site.register(CommunityMembership, list_select_related=('user', 'community'), raw_id_fields=('user', 'community'))
+admin_site.register(PostLike, PostLikeAdmin)
+admin_site.register(CommunityComment, CommunityCommentAdmin)
+
+admin_site.register(Job, JobAdmin)
+admin_site.register(PeriodicTaskState, PeriodicTaskStateAdmin)
+admin_site.register(ImageDerivatives, ImageDerivativesAdmin)
+admin_site.register(UploadSession, UploadSessionAdmin)
+admin_site.register(Blob, BlobAdmin)
+admin_site.register(SlowQuery, SlowQueryAdmin)
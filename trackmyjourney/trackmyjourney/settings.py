@@ -27,6 +27,11 @@ INSTALLED_APPS = [
     'crispy_bootstrap5',
     
     # Local apps
+    'core',
+    'jobs',
+    'uploads',
+    'api',
+    'live',
     'accounts',
     'goals',
     'achievements',
@@ -40,6 +45,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.SlowQueryLogMiddleware',
+    'core.middleware.PrimaryReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -67,15 +76,101 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'trackmyjourney.wsgi.application'
+ASGI_APPLICATION = 'trackmyjourney.asgi.application'
+
+# asgi.py turns this on so the read-heavy pages are routed to their async views
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS') == '1'
 
 # Database
+# The 'production' SQLite profile (core.sqlite) turns on WAL, tuned pragmas and
+# BEGIN IMMEDIATE write transactions; DJANGO_SQLITE_PROFILE=default is stock SQLite.
+SQLITE_PROFILE = os.environ.get('DJANGO_SQLITE_PROFILE', 'production')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.sqlite' if SQLITE_PROFILE == 'production' else 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
 
+# Read replicas: reads go to these aliases, writes to 'default' (core.routers).
+# DJANGO_REPLICA_DB=<path> adds a local SQLite copy as a stand-in; refresh it
+# with `manage.py sync_sqlite_replica`. In tests replicas mirror 'default'.
+DATABASE_REPLICAS = []
+if os.environ.get('DJANGO_REPLICA_DB'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['DJANGO_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append('replica')
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+# After a write, the session reads from the primary for this long (> replication lag)
+REPLICA_PIN_SECONDS = 5
+
+# Caches: 'shared' is seen by every process on the host (point it at Redis or
+# Memcached when running on several hosts). Sessions and logged-in users are
+# cached there, so a logout or password change in one worker reaches all.
+# The core.cache backends count hits and misses for /metrics.
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'core.cache.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache',
+    },
+}
+
+# Sessions and users are read from the cache instead of two queries per logged-in request
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'shared'
+AUTHENTICATION_BACKENDS = ['accounts.backends.CachedModelBackend']
+USER_CACHE_ALIAS = 'shared'
+
+# Slow query log: queries over SLOW_QUERY_MS are summed per query shape into
+# core.SlowQuery (admin: Core > Slow queries) and written as JSON lines to
+# slow_queries.log, which `manage.py index_advisor slow_queries.log` reads.
+SLOW_QUERY_MS = float(os.environ.get('DJANGO_SLOW_QUERY_MS', 200))
+SLOW_QUERY_SAMPLE_RATE = 1.0
+
+# Metrics: each process keeps its own counters and writes them to METRICS_DIR
+# every few seconds; /metrics (Prometheus text format) adds up the files of all
+# processes. Scrapers must come from METRICS_ALLOWED_IPS and, unless DEBUG is on,
+# send "Authorization: Bearer <METRICS_TOKEN>": behind a local reverse proxy
+# every request comes from 127.0.0.1, so the address alone proves nothing.
+METRICS_DIR = BASE_DIR / '.metrics'
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+METRICS_TOKEN = os.environ.get('DJANGO_METRICS_TOKEN', '')
+
+# Request profiler: a PROFILE_SAMPLE_RATE share of requests (and any sending an
+# X-Profile token from `manage.py profile_token`) have their stacks sampled
+# every PROFILE_INTERVAL seconds into PROFILE_DIR; see `manage.py profile_report`.
+PROFILE_SAMPLE_RATE = float(os.environ.get('DJANGO_PROFILE_SAMPLE_RATE', 0))
+PROFILE_INTERVAL = 0.005
+PROFILE_DIR = BASE_DIR / 'profiles'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': BASE_DIR / 'slow_queries.log',
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'formatter': 'message',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'core.slow_queries': {'handlers': ['slow_queries'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -107,6 +202,13 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are stored once per distinct content and hard-linked to their names;
+# run `manage.py dedup_media` to convert an existing media tree.
+STORAGES = {
+    'default': {'BACKEND': 'core.storage.DedupStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -126,9 +228,17 @@ LOGOUT_REDIRECT_URL = '/'
 # Email Configuration (for development)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+# Background jobs: run `python manage.py run_workers` next to the web server.
+# With JOBS_RUN_INLINE, enqueued work runs in-process right after commit instead.
+JOBS_RUN_INLINE = False
+
 # File Upload Settings
-FILE_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50MB
-DATA_UPLOAD_MAX_MEMORY_SIZE = 50 * 1024 * 1024  # 50MB
+# Larger multipart uploads spool to a temp file instead of staying in RAM;
+# book and resource files go through the chunked upload endpoints (uploads app).
+FILE_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024  # 5MB
+DATA_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024  # 5MB
+CHUNKED_UPLOAD_DIR = BASE_DIR / 'uploads_tmp'  # part files, kept out of MEDIA_ROOT
+CHUNKED_UPLOAD_MAX_SIZE = 500 * 1024 * 1024  # 500MB
 
 # Message Framework
 from django.contrib.messages import constants as messages
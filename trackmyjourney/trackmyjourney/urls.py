@@ -3,6 +3,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from accounts.views import DashboardView
+from core.views import metrics_view
 from django.views.generic import TemplateView
 from trackmyjourney.admin import admin_site
 
@@ -24,6 +25,10 @@ urlpatterns = [
     path('books/', include('books.urls')),
     path('groups/', include('groups.urls')),
     path('community/', include('community.urls')),
+    path('uploads/', include('uploads.urls')),
+    path('api/', include('api.urls')),
+    path('live/', include('live.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import UploadSession
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'user', 'size', 'received', 'status', 'updated_at')
+    list_filter = ('status',)
+    search_fields = ('filename', 'user__username')
+    readonly_fields = ('token', 'sha256', 'created_at', 'updated_at')
@@ -0,0 +1,59 @@
+from django import forms
+from django.db import transaction
+from django.urls import reverse_lazy
+
+from .models import UploadSession
+
+
+class ChunkedUploadFormMixin:
+    """
+    Lets a ModelForm take its file from a finished chunked upload.
+
+    static/js/chunked-upload.js sends the file chosen in ``chunked_upload_field``
+    in chunks and puts the session token in the hidden ``upload_token`` field.
+    The view must pass ``user`` to the form. With ``commit=False`` the session
+    is only retired by ``save_m2m()``, after the caller has saved the instance.
+    """
+    chunked_upload_field = 'file'
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
+        self.upload_session = None
+        self.fields['upload_token'] = forms.UUIDField(required=False, widget=forms.HiddenInput)
+        self.fields[self.chunked_upload_field].widget.attrs.update({
+            'data-chunked-upload': reverse_lazy('uploads:start'),
+            'data-token-field': self.add_prefix('upload_token'),
+        })
+
+    def clean_upload_token(self):
+        token = self.cleaned_data.get('upload_token')
+        if not token:
+            return token
+        session = UploadSession.objects.filter(token=token, user=self.user, status='complete').first()
+        if session is None or self.user is None:
+            raise forms.ValidationError('The uploaded file has expired, please upload it again.')
+        self.upload_session = session
+        return token
+
+    def save(self, commit=True):
+        session = self.upload_session
+        if session is None:
+            return super().save(commit)
+        field_file = getattr(self.instance, self.chunked_upload_field)
+        if not commit:
+            session.attach(field_file)
+            instance = super().save(commit=False)
+            save_m2m = self.save_m2m
+
+            def save_m2m_and_retire_session():
+                save_m2m()
+                session.mark_attached()
+
+            self.save_m2m = save_m2m_and_retire_session
+            return instance
+        with transaction.atomic():
+            session.attach(field_file)
+            instance = super().save(commit=True)
+            transaction.on_commit(session.mark_attached)
+        return instance
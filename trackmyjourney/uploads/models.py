@@ -0,0 +1,101 @@
+import os
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.core.files import File
+from django.db import models
+from django.utils import timezone
+
+from core.storage import link_or_copy
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+
+
+def upload_dir():
+    return str(getattr(settings, 'CHUNKED_UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'chunked-uploads')))
+
+
+class AssembledFile(File):
+    """A finished upload; FileSystemStorage moves it into place instead of copying."""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+class UploadSession(models.Model):
+    """
+    A file sent in chunks with ``PUT /uploads/<token>/?offset=N``.
+
+    Chunks are appended to a part file under CHUNKED_UPLOAD_DIR, so a
+    dropped connection can resume from ``received`` instead of starting over.
+    """
+    STATUS_CHOICES = [
+        ('open', 'Receiving'),
+        ('complete', 'Complete'),
+        ('attached', 'Attached'),
+    ]
+
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField(default=DEFAULT_CHUNK_SIZE)
+    received = models.PositiveBigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True, help_text="Digest of the assembled file")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='open')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'updated_at'])]
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
+
+    @property
+    def path(self):
+        return os.path.join(upload_dir(), f'{self.token.hex}.part')
+
+    def as_json(self):
+        return {
+            'token': str(self.token),
+            'filename': self.filename,
+            'size': self.size,
+            'chunk_size': self.chunk_size,
+            'offset': self.received,
+            'status': self.status,
+        }
+
+    def attach(self, field_file):
+        """
+        Store the assembled file in ``field_file`` (without saving the model).
+
+        Storage moves a hard link of the part file into place, so the part stays
+        until mark_attached() and the session can be attached again if the
+        instance never gets saved.
+        """
+        linked = f'{self.path}.{uuid.uuid4().hex}'
+        link_or_copy(self.path, linked)
+        try:
+            with open(linked, 'rb') as fh:
+                field_file.save(self.filename, AssembledFile(fh, name=self.filename), save=False)
+        finally:
+            try:
+                os.remove(linked)
+            except FileNotFoundError:
+                pass
+
+    def mark_attached(self):
+        """Retire the session once the instance holding its file is saved."""
+        UploadSession.objects.filter(pk=self.pk).update(status='attached', updated_at=timezone.now())
+        self.status = 'attached'
+        self.discard_part()
+
+    def discard_part(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,18 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from jobs.registry import periodic_task
+from .models import UploadSession
+
+
+@periodic_task(every=timedelta(hours=1), priority=-10)
+def purge_stale_uploads():
+    """Delete sessions untouched for CHUNKED_UPLOAD_EXPIRY (default 1 day) along with their part files."""
+    expiry = getattr(settings, 'CHUNKED_UPLOAD_EXPIRY', timedelta(days=1))
+    stale = UploadSession.objects.exclude(status='attached').filter(updated_at__lt=timezone.now() - expiry)
+    for session in stale.iterator(chunk_size=200):
+        session.discard_part()
+    stale.delete()
+    UploadSession.objects.filter(status='attached', updated_at__lt=timezone.now() - expiry).delete()
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from books.forms import BookForm
+from books.models import Book
+from core import counters
+from .models import UploadSession
+
+User = get_user_model()
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class ChunkedUploadTests(TestCase):
+    data = bytes(range(256)) * 40  # 10240 bytes, four chunks of 3000 and a short last one
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('uploader', password='x')
+
+    def setUp(self):
+        temporary = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temporary, ignore_errors=True)
+        settings_override = override_settings(
+            CHUNKED_UPLOAD_DIR=os.path.join(temporary, 'parts'), MEDIA_ROOT=os.path.join(temporary, 'media'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client.force_login(self.user)
+
+    def start(self, size=None, chunk_size=3000):
+        response = self.client.post(
+            reverse('uploads:start'),
+            json.dumps({'filename': '../notes.pdf', 'size': size or len(self.data), 'chunk_size': chunk_size}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def put(self, token, offset, chunk, checksum=None):
+        return self.client.put(
+            f"{reverse('uploads:session', args=[token])}?offset={offset}", chunk,
+            content_type='application/octet-stream', HTTP_X_CHUNK_SHA256=checksum or sha256(chunk),
+        )
+
+    def send_all(self, token, start=0):
+        for offset in range(start, len(self.data), 3000):
+            response = self.put(token, offset, self.data[offset:offset + 3000])
+            self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def complete(self, token, checksum=None):
+        headers = {'HTTP_X_FILE_SHA256': checksum} if checksum else {}
+        return self.client.post(reverse('uploads:complete', args=[token]), **headers)
+
+    def test_chunks_assemble_into_the_file(self):
+        session = self.start()
+        self.assertEqual((session['filename'], session['offset']), ('notes.pdf', 0))
+        self.assertEqual(self.send_all(session['token']).json()['offset'], len(self.data))
+
+        response = self.complete(session['token'], sha256(self.data))
+        self.assertEqual(response.json()['status'], 'complete')
+        upload = UploadSession.objects.get()
+        self.assertEqual(upload.sha256, sha256(self.data))
+        with open(upload.path, 'rb') as part:
+            self.assertEqual(part.read(), self.data)
+
+    def test_interrupted_upload_resumes_from_the_reported_offset(self):
+        token = self.start()['token']
+        self.put(token, 0, self.data[:3000])
+        self.put(token, 3000, self.data[3000:6000])
+
+        resumed = self.client.get(reverse('uploads:session', args=[token])).json()['offset']
+        self.assertEqual(resumed, 6000)
+        self.send_all(token, start=resumed)
+        self.assertEqual(self.complete(token).json()['status'], 'complete')
+
+    def test_corrupt_chunk_leaves_the_offset_for_a_resend(self):
+        token = self.start()['token']
+        self.put(token, 0, self.data[:3000])
+
+        corrupted = b'\0' * 3000
+        response = self.put(token, 3000, corrupted, checksum=sha256(self.data[3000:6000]))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['offset'], 3000)
+
+        self.send_all(token, start=3000)
+        self.assertEqual(self.complete(token, sha256(self.data)).json()['status'], 'complete')
+
+    def test_chunk_at_the_wrong_offset_is_refused(self):
+        token = self.start()['token']
+        self.put(token, 0, self.data[:3000])
+
+        for offset in (0, 6000):
+            response = self.put(token, offset, self.data[offset:offset + 3000])
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(response.json()['offset'], 3000)
+
+    def test_chunks_longer_than_agreed_are_refused(self):
+        token = self.start()['token']
+        self.assertEqual(self.put(token, 0, self.data[:3001]).status_code, 400)
+
+    def test_incomplete_or_mismatched_files_are_not_completed(self):
+        token = self.start()['token']
+        self.put(token, 0, self.data[:3000])
+        self.assertEqual(self.complete(token).status_code, 409)
+
+        self.send_all(token, start=3000)
+        self.assertEqual(self.complete(token, sha256(b'something else')).status_code, 400)
+        self.assertEqual(UploadSession.objects.get().status, 'open')
+
+    def test_sessions_belong_to_their_user(self):
+        token = self.start()['token']
+        self.client.force_login(User.objects.create_user('other', 'other@example.com', 'x'))
+        self.assertEqual(self.put(token, 0, self.data[:3000]).status_code, 404)
+
+    def test_chunk_whose_offset_was_claimed_meanwhile_is_not_written(self):
+        token = self.start()['token']
+        part = UploadSession.objects.get().path
+
+        # Another request sending the same chunk claims the offset first
+        with mock.patch.object(QuerySet, 'update', return_value=0):
+            response = self.put(token, 0, b'\1' * 3000)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(os.path.getsize(part), 0)
+
+    def uploaded(self):
+        token = self.start()['token']
+        self.send_all(token)
+        self.complete(token)
+        return token
+
+    def book_form(self, token):
+        data = {'title': 'Notes', 'author': 'Me', 'description': 'd', 'format': 'pdf', 'language': 'en',
+                'upload_token': token}
+        form = BookForm(data, user=self.user)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.instance.uploaded_by = self.user
+        return form
+
+    def test_completed_upload_attaches_to_a_model(self):
+        form = self.book_form(self.uploaded())
+        with self.captureOnCommitCallbacks(execute=True):
+            book = form.save()
+
+        upload = UploadSession.objects.get()
+        self.assertEqual(upload.status, 'attached')
+        self.assertFalse(os.path.exists(upload.path))
+        with book.file.open() as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_upload_survives_a_failed_save(self):
+        token = self.uploaded()
+        with mock.patch.object(Book, 'save', side_effect=RuntimeError('database went away')):
+            with self.captureOnCommitCallbacks(execute=True), self.assertRaises(RuntimeError):
+                self.book_form(token).save()
+
+        upload = UploadSession.objects.get()
+        self.assertEqual(upload.status, 'complete')
+        with open(upload.path, 'rb') as part:
+            self.assertEqual(part.read(), self.data)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book = self.book_form(token).save()
+        with book.file.open() as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_uncommitted_form_keeps_the_session_until_save_m2m(self):
+        form = self.book_form(self.uploaded())
+        book = form.save(commit=False)
+        self.assertEqual(UploadSession.objects.get().status, 'complete')
+
+        book.save()
+        form.save_m2m()
+        self.assertEqual(UploadSession.objects.get().status, 'attached')
+
+    def test_downloads_are_streamed_from_the_file(self):
+        form = self.book_form(self.uploaded())
+        form.instance.allow_download = True
+        with self.captureOnCommitCallbacks(execute=True):
+            book = form.save()
+
+        self.addCleanup(counters._pending.clear)
+        with mock.patch.object(counters.threading, 'Timer'):
+            response = self.client.get(reverse('books:download', args=[book.slug]))
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+        response.close()
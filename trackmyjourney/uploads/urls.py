@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+app_name = 'uploads'
+
+urlpatterns = [
+    path('', views.start_upload, name='start'),
+    path('<uuid:token>/', views.upload_session, name='session'),
+    path('<uuid:token>/complete/', views.complete_upload, name='complete'),
+]
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.db.models import F
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.views.decorators.http import require_http_methods, require_POST
+
+from core.metrics import UPLOAD_BYTES
+from .models import DEFAULT_CHUNK_SIZE, MAX_CHUNK_SIZE, UploadSession, upload_dir
+
+READ_BLOCK = 64 * 1024
+# Chunks are held in memory up to this size while they are checked, then spill to disk
+SPOOL_SIZE = 1024 * 1024
+
+
+def max_upload_size():
+    return getattr(settings, 'CHUNKED_UPLOAD_MAX_SIZE', 500 * 1024 * 1024)
+
+
+def _error(message, status=400, **extra):
+    return JsonResponse({'status': 'error', 'error': message, **extra}, status=status)
+
+
+@login_required
+@require_POST
+def start_upload(request):
+    """Open a session: ``{"filename", "size", "content_type"?, "chunk_size"?}`` -> token and chunk size."""
+    try:
+        data = json.loads(request.body or b'{}') if request.content_type == 'application/json' else request.POST
+        filename = os.path.basename(str(data.get('filename', '')).replace('\\', '/'))[:255]
+        size = int(data.get('size'))
+        chunk_size = min(int(data.get('chunk_size') or DEFAULT_CHUNK_SIZE), MAX_CHUNK_SIZE)
+    except (TypeError, ValueError):
+        return _error('filename and size are required')
+    if not filename or size <= 0 or chunk_size <= 0:
+        return _error('filename and size are required')
+    if size > max_upload_size():
+        return _error('File is too large', status=413, max_size=max_upload_size())
+
+    session = UploadSession.objects.create(
+        user=request.user,
+        filename=filename,
+        content_type=str(data.get('content_type', ''))[:100],
+        size=size,
+        chunk_size=chunk_size,
+    )
+    os.makedirs(upload_dir(), exist_ok=True)
+    open(session.path, 'wb').close()
+    return JsonResponse(session.as_json(), status=201)
+
+
+@login_required
+@require_http_methods(['GET', 'PUT', 'DELETE'])
+def upload_session(request, token):
+    """
+    GET reports the resume offset, DELETE aborts, and PUT appends one chunk.
+
+    A chunk is the raw request body sent to ``?offset=<bytes received>``
+    with its hex SHA-256 in the ``X-Chunk-SHA256`` header. Bad checksums and
+    short bodies leave the offset unchanged so the chunk can be resent.
+    """
+    session = get_object_or_404(UploadSession, token=token, user=request.user)
+    if request.method == 'GET':
+        return JsonResponse(session.as_json())
+    if request.method == 'DELETE':
+        session.discard_part()
+        session.delete()
+        return JsonResponse({'status': 'success'})
+
+    if session.status != 'open':
+        return _error('Upload is already complete', status=409, **session.as_json())
+    try:
+        offset = int(request.GET['offset'])
+        length = int(request.META['CONTENT_LENGTH'])
+    except (KeyError, ValueError):
+        return _error('offset and Content-Length are required')
+    expected = request.headers.get('X-Chunk-SHA256', '').strip().lower()
+    if not expected:
+        return _error('X-Chunk-SHA256 header is required')
+    if offset != session.received:
+        return _error('Offset does not match the bytes received', status=409, offset=session.received)
+    if length <= 0 or length > session.chunk_size or offset + length > session.size:
+        return _error('Chunk length is out of range', offset=session.received)
+
+    digest = hashlib.sha256()
+    written = 0
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE, dir=upload_dir()) as chunk:
+        while written < length:
+            block = request.read(min(READ_BLOCK, length - written))
+            if not block:
+                break
+            chunk.write(block)
+            digest.update(block)
+            written += len(block)
+
+        if written != length:
+            return _error('Chunk was truncated', offset=session.received)
+        if digest.hexdigest() != expected:
+            return _error('Chunk checksum mismatch', offset=session.received)
+
+        # Claim the offset before touching the part file, so of two requests sending the same
+        # chunk only one writes it; the claim is undone if the write fails
+        with transaction.atomic():
+            advanced = UploadSession.objects.filter(pk=session.pk, status='open', received=offset).update(
+                received=F('received') + length, updated_at=timezone.now()
+            )
+            if advanced:
+                chunk.seek(0)
+                with open(session.path, 'r+b') as part:
+                    part.seek(offset)
+                    shutil.copyfileobj(chunk, part, READ_BLOCK)
+                    part.truncate()
+    if not advanced:
+        session.refresh_from_db()
+        return _error('Offset does not match the bytes received', status=409, offset=session.received)
+    session.received = offset + length
+    UPLOAD_BYTES.inc(length)
+    return JsonResponse(session.as_json())
+
+
+@login_required
+@require_POST
+def complete_upload(request, token):
+    """Verify the assembled file and make its token attachable to a form."""
+    session = get_object_or_404(UploadSession, token=token, user=request.user)
+    if session.status != 'open':
+        return JsonResponse(session.as_json())
+    if session.received != session.size or os.path.getsize(session.path) != session.size:
+        return _error('Upload is incomplete', status=409, offset=session.received)
+
+    digest = hashlib.sha256()
+    with open(session.path, 'rb') as part:
+        for block in iter(lambda: part.read(1024 * 1024), b''):
+            digest.update(block)
+    expected = request.headers.get('X-File-SHA256', '').strip().lower()
+    if expected and expected != digest.hexdigest():
+        return _error('File checksum mismatch')
+
+    session.sha256 = digest.hexdigest()
+    session.status = 'complete'
+    session.save(update_fields=['sha256', 'status', 'updated_at'])
+    return JsonResponse(session.as_json())